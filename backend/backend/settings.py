@@ -11,6 +11,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -83,10 +85,102 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Part of the SQLite profile (see settings_production.py): fetch pool
+        # threads store gamelogs concurrently, in dev too. Write transactions
+        # take the lock up front, so they queue for it (up to the timeout)
+        # instead of failing with "database is locked" on upgrade
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 20},
+        # The test database is a file for the same reason: the shared in-memory
+        # one fails concurrent writers with "table is locked" instead of making
+        # them wait. It lives in the temp dir, out of the working tree
+        'TEST': {'NAME': Path(tempfile.gettempdir()) / 'h2h_test_db.sqlite3'},
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Shared across workers, sits behind the in-process LRU in h2hapi/cache.py
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    }
+}
+
+# Seconds before current season upstream data is re-fetched
+H2H_CURRENT_SEASON_TTL = 300
+
+# Seconds past that TTL an entry is still served, marked stale, while it's refreshed
+H2H_STALE_TTL = 86400
+
+# Entries kept in each worker's in-process LRU
+H2H_LOCAL_CACHE_ENTRIES = 256
+
+# Seconds a worker holds the shared lock for an in-flight upstream fetch. With
+# the file cache the locks live in H2H_FETCH_LOCK_DB (the rate limiter's file
+# unless set), other backends lock with their own atomic add()
+H2H_FETCH_LOCK_TIMEOUT = 30
+
+# Shared stats.nba.com budget, enforced across workers by h2hapi/ratelimit.py
+H2H_RATE_LIMIT_DB = BASE_DIR / 'ratelimit.sqlite3'
+H2H_RATE_LIMIT_PER_SECOND = 0.9
+H2H_RATE_LIMIT_BURST = 4
+
+# Threads per worker for concurrent upstream fetches
+H2H_FETCH_WORKERS = 8
+
+# Threads per worker for refreshing stale cache entries in the background
+H2H_REFRESH_WORKERS = 4
+
+# stats.nba.com session, see h2hapi/upstream.py
+H2H_UPSTREAM_CONNECT_TIMEOUT = 3.05
+H2H_UPSTREAM_READ_TIMEOUT = 20
+H2H_UPSTREAM_RETRIES = 3
+H2H_UPSTREAM_BACKOFF = 0.5 # Seconds, doubled on every retry and jittered
+H2H_UPSTREAM_MAX_BACKOFF = 8.0
+H2H_NBA_STATS_URL = os.environ.get('H2H_NBA_STATS_URL') # e.g. http://127.0.0.1:8010/stats for run_stub_upstream
+
+# Circuit breaker around stats.nba.com, see h2hapi/circuit.py
+H2H_CIRCUIT_WINDOW = 30 # Seconds of calls the error rate is measured over
+H2H_CIRCUIT_MIN_CALLS = 5
+H2H_CIRCUIT_ERROR_RATE = 0.5 # Share of failed calls that opens the circuit
+H2H_CIRCUIT_COOLDOWN = 30 # Seconds to fail fast before trying upstream again
+
+# Seconds team changes seen by compares wait before being written together
+H2H_TEAM_FLUSH_DELAY = 2.0
+
+# Memory-mapped NumPy gamelog files, see h2hapi/columnar.py
+H2H_COLUMNAR_DIR = BASE_DIR / 'gamelog_store'
+
+# Compare job queue (mode=async), see h2hapi/jobs.py. Jobs are run by
+# `python manage.py run_compare_jobs`. H2H_JOB_THREADS > 0 also runs them on
+# threads inside each web worker, e.g. for a single-process dev server
+H2H_JOB_THREADS = 0
+H2H_JOB_TIMEOUT = 120 # Seconds before a running job is handed to another worker
+H2H_JOB_RETENTION = 3600 # Seconds finished jobs are kept for polling
+
+# Sampled log of compared pairs that warm_cache replays after a deploy or flush
+H2H_REQUEST_LOG = BASE_DIR / 'request_keys.log'
+H2H_REQUEST_LOG_SAMPLE = 0.1 # Fraction of compare requests recorded
+
+# One JSON line per compare request with its stage timings, see h2hapi/metrics.py
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'h2hapi.timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
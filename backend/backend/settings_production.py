@@ -0,0 +1,38 @@
+"""
+Production settings for backend project.
+
+Run with DJANGO_SETTINGS_MODULE=backend.settings_production. Everything not
+overridden here comes from settings.py.
+"""
+
+from .settings import *
+
+DEBUG = False
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', SECRET_KEY)
+
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
+
+
+# Database
+# Keep connections open between requests and let readers and the sync jobs'
+# writer work at the same time (WAL), see benchmark_db for the numbers. The
+# IMMEDIATE transactions and lock timeout come from settings.py
+
+DATABASES = {
+    'default': {
+        **DATABASES['default'],
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Applied to every new connection by h2hapi/database.py
+H2H_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL', # Readers never block the writer or each other
+    'synchronous': 'NORMAL', # Safe with WAL, only skips an fsync per commit
+    'busy_timeout': 20000, # Milliseconds
+    'mmap_size': 268435456, # 256 MiB of the file read through the page cache
+    'cache_size': -65536, # 64 MiB per connection
+    'temp_store': 'MEMORY',
+}
@@ -0,0 +1,286 @@
+import numpy as np
+import pandas as pd
+
+AVG_COLS = [
+    'MIN', 'FGM', 'FGA', 'FG3M', 'FG3A', 'FTM',
+    'FTA', 'OREB', 'DREB', 'REB', 'AST', 'STL',
+    'BLK', 'TOV', 'PF', 'PTS'
+]
+
+
+class GamelogArrays:
+    # A gamelog as sorted game IDs plus one float matrix of its numeric columns
+    # (one row per column, games in gamelog order), built once and reused for
+    # every pair the player is part of
+
+    def __init__(self, gamelog):
+        self.columns = list(gamelog.select_dtypes('number').columns)
+        self.integer_columns = integer_columns(gamelog)
+        self.empty = gamelog.empty or 'Game_ID' not in gamelog
+        if self.empty:
+            # Failed fetches come back as a bare pd.DataFrame()
+            self.game_ids = np.array([], dtype=str)
+            self.order = np.array([], dtype=int)
+            self.values = np.zeros((len(self.columns), 0))
+            return
+        game_ids = gamelog['Game_ID'].to_numpy().astype(str)
+        self.order = np.argsort(game_ids, kind='stable') # Sorted position -> gamelog row
+        self.game_ids = game_ids[self.order]
+        # Blank cells count as 0, as in pandas' sum() and the stored gamelogs
+        self.values = np.ascontiguousarray(np.nan_to_num(gamelog[self.columns].to_numpy(dtype='float64')).T)
+
+    def sum_rows(self, positions):
+        # Column totals over the games at these sorted positions. Summed in
+        # gamelog order along contiguous rows, so float columns add up exactly
+        # like the pandas sum() of the same games
+        return np.take(self.values, np.sort(self.order[positions]), axis=1).sum(axis=1)
+
+
+def integer_columns(gamelog):
+    # Columns whose totals are reported as ints, like pandas sums them
+    return tuple(gamelog.select_dtypes('integer').columns)
+
+
+def summarize(totals, game_counts, columns, integers=()):
+    # Turns per-row totals (n x columns) into the aggregate_stats_from_df shape,
+    # with every derived stat computed for all n rows at once. Totals are summed
+    # as floats, the integers among the columns are handed back as ints
+    totals = np.atleast_2d(totals)
+    game_counts = np.asarray(game_counts, dtype='float64').reshape(-1)
+    index = {name: position for position, name in enumerate(columns)}
+
+    fgm, fg3m, fga = totals[:, index['FGM']], totals[:, index['FG3M']], totals[:, index['FGA']]
+    pts, fta = totals[:, index['PTS']], totals[:, index['FTA']]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        efg_pct = np.where(fga > 0, (fgm + 0.5 * fg3m) / fga, 0)
+        ts_attempts = 2 * (fga + 0.44 * fta)
+        tsp_pct = np.where(ts_attempts > 0, pts / ts_attempts, 0)
+        averages = np.where(
+            game_counts[:, None] > 0,
+            totals[:, [index[name] for name in AVG_COLS]] / game_counts[:, None],
+            0,
+        )
+    averages = np.round(averages, 1).tolist()
+    efg_pct = np.round(efg_pct, 3).tolist()
+    tsp_pct = np.round(tsp_pct, 3).tolist()
+    total_rows = totals.tolist()
+    integer_positions = [index[name] for name in integers]
+    if integer_positions and total_rows:
+        integer_rows = np.rint(totals[:, integer_positions]).astype('int64').tolist()
+        for row, row_integers in zip(total_rows, integer_rows):
+            for position, value in zip(integer_positions, row_integers):
+                row[position] = value
+
+    return [
+        {
+            "game_count": int(game_counts[row]),
+            "avg_stats": dict(zip(AVG_COLS, averages[row])),
+            "advanced_stats": {
+                "efg_pct": efg_pct[row],
+                "tsp_pct": tsp_pct[row],
+            },
+            "total_stats": dict(zip(columns, total_rows[row])),
+        }
+        for row in range(len(total_rows))
+    ]
+
+
+def shared_totals(arrays_a, arrays_b):
+    # Intersects the sorted game IDs once and sums both sides over the shared games
+    _, rows_a, rows_b = np.intersect1d(
+        arrays_a.game_ids, arrays_b.game_ids, assume_unique=True, return_indices=True
+    )
+    return len(rows_a), arrays_a.sum_rows(rows_a), arrays_b.sum_rows(rows_b)
+
+
+def compute_pairs(arrays, pairs):
+    # H2H stats for many (player_a_id, player_b_id) pairs at once.
+    # arrays maps player ID -> GamelogArrays; returns {pair: {"player_a", "player_b"}}
+    empty_stats = {"game_count": 0, "error": "No H2H Games Found."}
+    results = {}
+    found = []
+    totals_a = []
+    totals_b = []
+    counts = []
+
+    for pair in pairs:
+        arrays_a, arrays_b = arrays[pair[0]], arrays[pair[1]]
+        if arrays_a.empty or arrays_b.empty:
+            results[pair] = {"player_a": empty_stats, "player_b": empty_stats}
+            continue
+        game_count, total_a, total_b = shared_totals(arrays_a, arrays_b)
+        if not game_count:
+            results[pair] = {"player_a": empty_stats, "player_b": empty_stats}
+            continue
+        found.append(pair)
+        counts.append(game_count)
+        totals_a.append((arrays_a, total_a))
+        totals_b.append((arrays_b, total_b))
+
+    # Summarize every pair in one vectorized pass per distinct column layout
+    # (normally just one, since every gamelog comes back with the same columns)
+    summaries_a = summarize_grouped(totals_a, counts)
+    summaries_b = summarize_grouped(totals_b, counts)
+    for position, pair in enumerate(found):
+        results[pair] = {"player_a": summaries_a[position], "player_b": summaries_b[position]}
+    return results
+
+
+def summarize_grouped(array_totals, counts):
+    # array_totals holds (GamelogArrays, totals) for each pair's side
+    summaries = [None] * len(array_totals)
+    groups = {}
+    for position, (arrays, _) in enumerate(array_totals):
+        groups.setdefault((tuple(arrays.columns), arrays.integer_columns), []).append(position)
+    for (columns, integers), positions in groups.items():
+        totals = np.vstack([array_totals[position][1] for position in positions])
+        group_counts = [counts[position] for position in positions]
+        for position, summary in zip(positions, summarize(totals, group_counts, list(columns), integers)):
+            summaries[position] = summary
+    return summaries
+
+
+def compute_h2h(gamelog_a, gamelog_b):
+    # Single pair convenience wrapper used by ComparePlayersView
+    if gamelog_a.empty or gamelog_b.empty:
+        empty_stats = {"game_count": 0, "error": "No H2H Games Found."}
+        return {"player_a": empty_stats, "player_b": empty_stats}
+    return compute_pairs({'a': GamelogArrays(gamelog_a), 'b': GamelogArrays(gamelog_b)}, [('a', 'b')])[('a', 'b')]
+
+
+def aggregate_gamelog(gamelog):
+    # Totals, averages and shooting percentages over every game in one gamelog
+    if gamelog.empty:
+        return {"game_count": 0, "error": "No games to aggregate."}
+    arrays = GamelogArrays(gamelog)
+    return summarize(arrays.values.sum(axis=1), [len(arrays.game_ids)], arrays.columns, arrays.integer_columns)[0]
+
+
+class H2HTimeline:
+    # The games two players shared, oldest first, with cumulative sums of both
+    # sides' stats. Building it is one O(n) pass, after which the totals over
+    # any run of meetings, overall or within a split, are two subtractions.
+    # Home/away and wins/losses are from player A's side of the MATCHUP and WL
+
+    SPLITS = ('home', 'away', 'wins', 'losses')
+
+    def __init__(self, gamelog_a, gamelog_b):
+        self.columns_a = list(gamelog_a.select_dtypes('number').columns)
+        self.columns_b = list(gamelog_b.select_dtypes('number').columns)
+        self.integer_columns_a = integer_columns(gamelog_a)
+        self.integer_columns_b = integer_columns(gamelog_b)
+        if gamelog_a.empty or gamelog_b.empty or 'Game_ID' not in gamelog_a or 'Game_ID' not in gamelog_b:
+            rows_a = rows_b = np.array([], dtype=int)
+        else:
+            _, rows_a, rows_b = np.intersect1d(
+                gamelog_a['Game_ID'].to_numpy().astype(str),
+                gamelog_b['Game_ID'].to_numpy().astype(str),
+                assume_unique=True, return_indices=True,
+            )
+        self.count = len(rows_a)
+        if not self.count:
+            return
+
+        games = gamelog_a.iloc[rows_a]
+        dates = pd.to_datetime(games['GAME_DATE'], format='mixed').to_numpy()
+        order = np.argsort(dates, kind='stable')
+        rows_a, rows_b = rows_a[order], rows_b[order]
+
+        self.game_ids = games['Game_ID'].to_numpy().astype(str)[order]
+        self.dates = pd.DatetimeIndex(dates[order])
+        self.matchups = games['MATCHUP'].to_numpy().astype(str)[order]
+        self.results = games['WL'].fillna('').to_numpy().astype(str)[order]
+        self.values_a = gamelog_a[self.columns_a].to_numpy(dtype='float64')[rows_a]
+        self.values_b = gamelog_b[self.columns_b].to_numpy(dtype='float64')[rows_b]
+
+        # split -> (game count, player A, player B) prefix sums, each with a
+        # leading zero row so the range [start, end) is prefix[end] - prefix[start]
+        home = np.char.find(self.matchups, ' vs. ') >= 0 # 'DEN vs. LAL' at home, 'DEN @ LAL' away
+        masks = {
+            None: np.ones(self.count, dtype=bool),
+            'home': home,
+            'away': ~home,
+            'wins': self.results == 'W',
+            'losses': self.results == 'L',
+        }
+        self.prefix = {split: self._prefix_sums(mask) for split, mask in masks.items()}
+
+    def _prefix_sums(self, mask):
+        def cumulative(values):
+            return np.concatenate([np.zeros((1,) + values.shape[1:]), np.cumsum(values, axis=0)])
+        weights = mask.astype('float64')
+        return (
+            cumulative(weights),
+            cumulative(self.values_a * weights[:, None]),
+            cumulative(self.values_b * weights[:, None]),
+        )
+
+    def totals(self, start, end, split=None):
+        # Game count and both sides' totals over meetings [start, end) in date
+        # order, only counting the split's games. Works on arrays of bounds too
+        counts, prefix_a, prefix_b = self.prefix[split]
+        return counts[end] - counts[start], prefix_a[end] - prefix_a[start], prefix_b[end] - prefix_b[start]
+
+    def rolling(self, window):
+        # Totals over the `window` meetings up to and including each game
+        ends = np.arange(1, self.count + 1)
+        return self.totals(np.maximum(ends - window, 0), ends)
+
+    def month_bounds(self):
+        # Games are in date order, so every month is one contiguous run
+        months = self.dates.strftime('%Y-%m').to_numpy()
+        labels, starts = np.unique(months, return_index=True)
+        ends = np.append(starts[1:], self.count)
+        return labels.tolist(), starts, ends
+
+    def summarize_pairs(self, counts, totals_a, totals_b):
+        # {"player_a", "player_b"} summaries for many ranges in one vectorized pass
+        empty_stats = {"game_count": 0, "error": "No H2H Games Found."}
+        summaries_a = summarize(totals_a, counts, self.columns_a, self.integer_columns_a)
+        summaries_b = summarize(totals_b, counts, self.columns_b, self.integer_columns_b)
+        return [
+            {"player_a": summary_a, "player_b": summary_b} if count else {"player_a": empty_stats, "player_b": empty_stats}
+            for count, summary_a, summary_b in zip(np.asarray(counts).tolist(), summaries_a, summaries_b)
+        ]
+
+    def to_dict(self, window=5):
+        # "meetings" rather than "game_count", which marks the flat stats blocks
+        if not self.count:
+            return {"meetings": 0, "error": "No H2H Games Found."}
+
+        # Every aggregate below is a prefix sum lookup, gathered into one batch
+        ranges = [self.totals(max(self.count - window, 0), self.count)]
+        ranges += [self.totals(0, self.count, split) for split in self.SPLITS]
+        months, starts, ends = self.month_bounds()
+        ranges += [self.totals(start, end) for start, end in zip(starts, ends)]
+        counts, totals_a, totals_b = (np.array(part) for part in zip(*ranges))
+        summaries = self.summarize_pairs(counts, totals_a, totals_b)
+        last, splits, by_month = summaries[0], summaries[1:1 + len(self.SPLITS)], summaries[1 + len(self.SPLITS):]
+
+        rolling = self.summarize_pairs(*self.rolling(window))
+        stats_a = self.values_a.tolist()
+        stats_b = self.values_b.tolist()
+        dates = self.dates.strftime('%Y-%m-%d').tolist()
+        game_ids, matchups, results = self.game_ids.tolist(), self.matchups.tolist(), self.results.tolist()
+
+        return {
+            "meetings": self.count,
+            "window": window,
+            "games": [
+                {
+                    "game_id": game_ids[row],
+                    "game_date": dates[row],
+                    "matchup": matchups[row],
+                    "wl": results[row],
+                    "player_a": dict(zip(self.columns_a, stats_a[row])),
+                    "player_b": dict(zip(self.columns_b, stats_b[row])),
+                    "rolling": rolling[row],
+                }
+                for row in range(self.count)
+            ],
+            "last": last,
+            "splits": {
+                **dict(zip(self.SPLITS, splits)),
+                "by_month": dict(zip(months, by_month)),
+            },
+        }
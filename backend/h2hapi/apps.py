@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class H2HapiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'h2hapi'
+
+    def ready(self):
+        from . import signals # Connects the roster change receivers
+        from . import database # Applies H2H_SQLITE_PRAGMAS to every new connection
+        from .upstream import install_session
+        install_session() # Pooled, retrying session for every nba_api call
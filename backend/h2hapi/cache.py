@@ -0,0 +1,339 @@
+from collections import OrderedDict, namedtuple
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+import copy
+import pandas as pd
+import sqlite3
+import threading
+import time
+
+from .concurrency import submit_refresh
+from .seasons import is_finished_season
+from .singleflight import SingleFlight
+
+# Sentinel so cached falsy values (empty dicts, 0) still count as hits
+MISSING = object()
+
+# How entries that can go stale are stored: the value plus the wall clock time
+# it stops being fresh. They are kept for the stale TTL after that
+Stamped = namedtuple('Stamped', 'value fresh_until')
+
+# How every value is stored in the shared tier: with the wall clock time it
+# expires (None for never), so a worker promoting it into its local tier keeps
+# it only as long as it has left
+Entry = namedtuple('Entry', 'value expires_at')
+
+
+def private_copy(value):
+    # Each caller gets its own copy of a cached value, so one that modifies it
+    # can't change what the next caller is served
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    if isinstance(value, Stamped):
+        return Stamped(private_copy(value.value), value.fresh_until)
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)
+    return value
+
+
+class FetchLocks:
+    # Cross-worker fetch locks in a small SQLite file (the rate limiter's by
+    # default). FileBasedCache.add() is a has_key() then a set(), so two workers
+    # can both take the same lock through it. A conditional INSERT inside an
+    # IMMEDIATE transaction can't be won twice
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fetch_locks ("
+                "key TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def acquire(self, key, timeout):
+        # True when the lock is ours. A lock left by a worker that died mid-fetch
+        # expires after timeout seconds, like the cache key it replaces did
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM fetch_locks WHERE key = ? AND expires_at <= ?", (key, now))
+            acquired = conn.execute(
+                "INSERT OR IGNORE INTO fetch_locks (key, expires_at) VALUES (?, ?)", (key, now + timeout)
+            ).rowcount == 1
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return acquired
+
+    def held(self, key):
+        row = self._connection().execute("SELECT expires_at FROM fetch_locks WHERE key = ?", (key,)).fetchone()
+        return row is not None and row[0] > time.time()
+
+    def release(self, key):
+        self._connection().execute("DELETE FROM fetch_locks WHERE key = ?", (key,))
+
+
+def season_timeout(season):
+    # Finished seasons never change, so they never expire
+    if is_finished_season(season):
+        return None
+    return getattr(settings, 'H2H_CURRENT_SEASON_TTL', 300)
+
+
+class TieredCache:
+    # Bounded in-process LRU in front of a shared Django cache backend. Values
+    # are copied on the way in and out of the local tier, see private_copy
+
+    def __init__(self, alias='default', max_entries=256, prefix='h2h'):
+        self.alias = alias
+        self.max_entries = max_entries
+        self.prefix = prefix
+        self._local = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.flight = SingleFlight()
+        self.lock_waits = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self._refreshing = set()
+        self.fetch_locks = FetchLocks(getattr(
+            settings, 'H2H_FETCH_LOCK_DB',
+            getattr(settings, 'H2H_RATE_LIMIT_DB', settings.BASE_DIR / 'ratelimit.sqlite3'),
+        ))
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def acquire_fetch_lock(self, lock_key, timeout):
+        # Backends with an atomic add() (Redis, Memcached, the database cache) lock
+        # in the shared cache itself, the file backend locks through FetchLocks
+        if isinstance(self.shared, FileBasedCache):
+            return self.fetch_locks.acquire(lock_key, timeout)
+        return self.shared.add(lock_key, 1, timeout)
+
+    def fetch_lock_held(self, lock_key):
+        if isinstance(self.shared, FileBasedCache):
+            return self.fetch_locks.held(lock_key)
+        return self.shared.has_key(lock_key)
+
+    def release_fetch_lock(self, lock_key):
+        if isinstance(self.shared, FileBasedCache):
+            self.fetch_locks.release(lock_key)
+        else:
+            self.shared.delete(lock_key)
+
+    def make_key(self, *parts):
+        return ":".join([self.prefix] + [str(part) for part in parts])
+
+    def get(self, key):
+        # The cached value, stale or not
+        return self.lookup(key)[0]
+
+    def lookup(self, key):
+        # (value, stale), (MISSING, False) when nothing is cached
+        stored = self._get(key)
+        if isinstance(stored, Stamped):
+            return stored.value, stored.fresh_until <= time.time()
+        return stored, False
+
+    def _get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > now:
+                    self._local.move_to_end(key)
+                    self.local_hits += 1
+                    return private_copy(value)
+                del self._local[key]
+
+        value = self._get_shared(key)
+        if value is MISSING:
+            with self._lock:
+                self.misses += 1
+            return MISSING
+        with self._lock:
+            self.shared_hits += 1
+        return value
+
+    def _get_shared(self, key):
+        # Reads the shared tier and promotes a hit into the local tier for the
+        # time it has left there
+        stored = self.shared.get(key, MISSING)
+        if stored is MISSING:
+            return MISSING
+        if isinstance(stored, Entry):
+            value = stored.value
+            timeout = None if stored.expires_at is None else stored.expires_at - time.time()
+            if timeout is not None and timeout <= 0:
+                return MISSING # Backends may keep an entry for up to a second longer
+        else:
+            # Stored before entries carried their expiry, keep it locally for the
+            # default TTL at most
+            value = stored
+            timeout = getattr(settings, 'H2H_CURRENT_SEASON_TTL', 300)
+        self._set_local(key, value, timeout)
+        return private_copy(value)
+
+    def set(self, key, value, timeout=None, stale_ttl=0):
+        # timeout=None means never expire. With a stale_ttl the entry is kept that
+        # much longer, to be served stale while it's refreshed
+        if timeout is not None and stale_ttl:
+            value = Stamped(value, time.time() + timeout)
+            timeout += stale_ttl
+        expires_at = None if timeout is None else time.time() + timeout
+        self.shared.set(key, Entry(value, expires_at), timeout)
+        self._set_local(key, private_copy(value), timeout)
+
+    def delete(self, key):
+        self.shared.delete(key)
+        with self._lock:
+            self._local.pop(key, None)
+
+    def get_or_set(self, key, fetch, timeout=None, cache_if=None, stale_ttl=None, on_stale=None):
+        # Returns the cached value, or calls fetch() and stores the result.
+        # cache_if lets callers skip caching error results. Entries past their
+        # timeout are still returned for stale_ttl seconds (H2H_STALE_TTL by
+        # default) while fetch() refreshes them in the background, and
+        # on_stale(key) is called so the caller can say the data is stale
+        if stale_ttl is None:
+            stale_ttl = getattr(settings, 'H2H_STALE_TTL', 86400)
+        value, stale = self.lookup(key)
+        if value is not MISSING:
+            if stale:
+                self.refresh(key, fetch, timeout, cache_if, stale_ttl)
+                if on_stale is not None:
+                    on_stale(key)
+            return value
+
+        # Concurrent misses for the same key in this worker share one fetch
+        return self.flight.do(key, lambda: self._fetch_and_set(key, fetch, timeout, cache_if, stale_ttl))
+
+    def refresh(self, key, fetch, timeout=None, cache_if=None, stale_ttl=0):
+        # Re-fetches a stale entry on the refresh pool, once at a time per key
+        with self._lock:
+            self.stale_hits += 1
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        submit_refresh(self._refresh, key, fetch, timeout, cache_if, stale_ttl)
+
+    def _refresh(self, key, fetch, timeout, cache_if, stale_ttl):
+        try:
+            refreshed = self._refetch(key, fetch, timeout, cache_if, stale_ttl)
+        except Exception as e:
+            print(f"Error refreshing {key}: {e}")
+            refreshed = False
+        with self._lock:
+            self._refreshing.discard(key)
+            if refreshed:
+                self.refreshes += 1
+            elif refreshed is False:
+                self.refresh_failures += 1
+
+    def _refetch(self, key, fetch, timeout, cache_if, stale_ttl):
+        # True when refreshed, False when the fetch failed (the stale entry stays)
+        # and None when it was left to another worker
+        stored = self._get_shared(key)
+        if isinstance(stored, Stamped) and stored.fresh_until > time.time():
+            return None # Another worker refreshed it already
+
+        # Unlike a miss nobody is waiting on this, so if another worker holds the
+        # fetch lock it's left to them
+        lock_key = f"{key}:lock"
+        if not self.acquire_fetch_lock(lock_key, getattr(settings, 'H2H_FETCH_LOCK_TIMEOUT', 30)):
+            return None
+        try:
+            value = fetch()
+        finally:
+            self.release_fetch_lock(lock_key)
+        if cache_if is not None and not cache_if(value):
+            return False
+        self.set(key, value, timeout, stale_ttl)
+        return True
+
+    def _fetch_and_set(self, key, fetch, timeout, cache_if, stale_ttl):
+        # Another worker may hold the fetch lock, in which case wait for its result
+        lock_key = f"{key}:lock"
+        lock_timeout = getattr(settings, 'H2H_FETCH_LOCK_TIMEOUT', 30)
+        have_lock = self.acquire_fetch_lock(lock_key, lock_timeout)
+
+        if not have_lock:
+            with self._lock:
+                self.lock_waits += 1
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                value = self._get_shared(key)
+                if value is not MISSING:
+                    return self.unwrap(value)
+                if not self.fetch_lock_held(lock_key):
+                    break # The other worker gave up without caching, fetch it ourselves
+
+        try:
+            if have_lock:
+                # Another worker may have finished the same fetch just before we locked
+                value = self._get_shared(key)
+                if value is not MISSING:
+                    return self.unwrap(value)
+            value = fetch()
+            if cache_if is None or cache_if(value):
+                self.set(key, value, timeout, stale_ttl)
+            return value
+        finally:
+            if have_lock:
+                self.release_fetch_lock(lock_key)
+
+    def unwrap(self, stored):
+        return stored.value if isinstance(stored, Stamped) else stored
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.local_hits + self.shared_hits + self.misses
+            hits = self.local_hits + self.shared_hits
+            return {
+                "local_hits": self.local_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0,
+                "local_entries": len(self._local),
+                "lock_waits": self.lock_waits,
+                "stale_hits": self.stale_hits,
+                "refreshes": self.refreshes,
+                "refresh_failures": self.refresh_failures,
+                **self.flight.stats(),
+            }
+
+    def _set_local(self, key, value, timeout):
+        expires_at = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._local[key] = (expires_at, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+
+# Shared by every view in the worker
+upstream_cache = TieredCache(
+    alias=getattr(settings, 'H2H_CACHE_ALIAS', 'default'),
+    max_entries=getattr(settings, 'H2H_LOCAL_CACHE_ENTRIES', 256),
+)
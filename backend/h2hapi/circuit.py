@@ -0,0 +1,95 @@
+from collections import deque
+from django.conf import settings
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    # Stops calling upstream once too many recent calls failed. After a
+    # cooldown one trial call is let through (half open): success closes the
+    # circuit again, failure re-opens it. State is per worker process
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, window=30.0, min_calls=5, error_rate=0.5, cooldown=30.0):
+        self.name = name
+        self.window = window # Seconds of calls the error rate is measured over
+        self.min_calls = min_calls # Fewer calls than this never open the circuit
+        self.error_rate = error_rate
+        self.cooldown = cooldown # Seconds to fail fast before the trial call
+        self._lock = threading.Lock()
+        self._calls = deque() # (finished_at, ok)
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_running = False
+        self.opened = 0
+        self.rejected = 0
+
+    def before_call(self):
+        # Raises CircuitOpenError instead of letting a call through while open
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self.cooldown - (time.monotonic() - self._opened_at)
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(
+                        f"{self.name} is failing, not calling it for another {remaining:.0f}s"
+                    )
+                self.state = self.HALF_OPEN
+
+            if self.state == self.HALF_OPEN:
+                if self._trial_running:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.name} is failing, waiting on a trial call")
+                self._trial_running = True
+
+    def record(self, ok):
+        now = time.monotonic()
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_running = False
+                if ok:
+                    self.state = self.CLOSED
+                    self._calls.clear()
+                else:
+                    self._open(now)
+                return
+
+            self._calls.append((now, ok))
+            while self._calls and now - self._calls[0][0] > self.window:
+                self._calls.popleft()
+            failures = sum(1 for _, call_ok in self._calls if not call_ok)
+            if self.state == self.CLOSED and len(self._calls) >= self.min_calls \
+                    and failures / len(self._calls) >= self.error_rate:
+                print(f"Opening circuit for {self.name}: {failures}/{len(self._calls)} calls failed")
+                self._open(now)
+
+    def _open(self, now):
+        self.state = self.OPEN
+        self._opened_at = now
+        self._calls.clear()
+        self.opened += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "open": int(self.state != self.CLOSED),
+                "opened_total": self.opened,
+                "rejected_total": self.rejected,
+            }
+
+
+# Wraps every stats.nba.com call, see upstream.upstream_request
+nba_circuit = CircuitBreaker(
+    'stats.nba.com',
+    window=getattr(settings, 'H2H_CIRCUIT_WINDOW', 30.0),
+    min_calls=getattr(settings, 'H2H_CIRCUIT_MIN_CALLS', 5),
+    error_rate=getattr(settings, 'H2H_CIRCUIT_ERROR_RATE', 0.5),
+    cooldown=getattr(settings, 'H2H_CIRCUIT_COOLDOWN', 30.0),
+)
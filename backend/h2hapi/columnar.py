@@ -0,0 +1,340 @@
+from django.conf import settings
+from pathlib import Path
+import numpy as np
+import os
+import pandas as pd
+import shutil
+import threading
+import time
+import uuid
+
+from .gamelogs import CURRENT_SEASON_MAX_AGE
+from .seasons import is_finished_season
+
+# Bump when the layout changes. Files from older versions are upgraded on read
+SCHEMA_VERSION = 2
+
+# PlayerGameLog columns and their on-disk dtypes, in upstream column order.
+# Columns added later are read back as zeros/empty strings from older files
+SCHEMA = [
+    ('SEASON_ID', 'U5'),
+    ('Player_ID', 'i8'),
+    ('Game_ID', 'U10'),
+    ('GAME_DATE', 'U12'),
+    ('MATCHUP', 'U12'),
+    ('WL', 'U1'),
+    ('MIN', 'i8'),
+    ('FGM', 'i8'),
+    ('FGA', 'i8'),
+    ('FG_PCT', 'f8'),
+    ('FG3M', 'i8'),
+    ('FG3A', 'i8'),
+    ('FG3_PCT', 'f8'),
+    ('FTM', 'i8'),
+    ('FTA', 'i8'),
+    ('FT_PCT', 'f8'),
+    ('OREB', 'i8'),
+    ('DREB', 'i8'),
+    ('REB', 'i8'),
+    ('AST', 'i8'),
+    ('STL', 'i8'),
+    ('BLK', 'i8'),
+    ('TOV', 'i8'),
+    ('PF', 'i8'),
+    ('PTS', 'i8'),
+    ('PLUS_MINUS', 'i8'),
+    ('VIDEO_AVAILABLE', 'i8'),
+]
+
+COLUMN_DTYPES = dict(SCHEMA)
+
+# What compares read: every numeric column (GamelogArrays sums them all into
+# total_stats) plus the game ID, date, matchup and result H2HTimeline needs
+H2H_COLUMNS = [column for column, _ in SCHEMA if column != 'SEASON_ID']
+
+INDEX_DTYPE = np.dtype([('player_id', 'i8'), ('start', 'i8'), ('stop', 'i8')])
+
+# Generations nobody points to are left by writers that raced each other, and
+# are swept by compaction once they are this old (seconds)
+ORPHAN_AGE = 60
+
+_compact_lock = threading.Lock()
+
+# Layout under H2H_COLUMNAR_DIR/v2/<season>/: every gamelog is a "generation"
+# directory with one .npy file per column, so reading a column only touches
+# that column's pages. A small "<name>.current" pointer file names the live
+# generation and is swapped with os.replace, so readers never mix columns of
+# two writes. <name> is the player ID, or "packed" for the compacted season
+# (one file per column for every player, plus index.npy with their offsets)
+
+
+def store_root(version=SCHEMA_VERSION):
+    root = getattr(settings, 'H2H_COLUMNAR_DIR', settings.BASE_DIR / 'gamelog_store')
+    return Path(root) / f"v{version}"
+
+
+def season_dir(season):
+    return store_root() / season
+
+
+def _pointer(directory, name):
+    return directory / f"{name}.current"
+
+
+def _current(directory, name):
+    # (live generation, when it was written), or (None, None)
+    pointer = _pointer(directory, name)
+    try:
+        return pointer.read_text(encoding='utf-8'), pointer.stat().st_mtime
+    except FileNotFoundError:
+        return None, None
+
+
+def _publish(directory, name, write):
+    # Writes a new generation with write(path), then points readers at it
+    generation = f"{name}.{uuid.uuid4().hex}"
+    path = directory / generation
+    path.mkdir(parents=True)
+    write(path)
+
+    previous, _ = _current(directory, name)
+    temp_pointer = directory / f".{generation}.tmp"
+    temp_pointer.write_text(generation, encoding='utf-8')
+    os.replace(temp_pointer, _pointer(directory, name))
+    if previous:
+        # Readers that already mapped its files keep them, the rest re-read
+        shutil.rmtree(directory / previous, ignore_errors=True)
+    return generation
+
+
+def _write_columns(path, arrays):
+    for column, array in arrays.items():
+        np.save(path / f"{column}.npy", array)
+
+
+def _load(path, mmap=True):
+    # Memory-mapped by default, so nothing is read until it's used
+    if not mmap:
+        return np.load(path)
+    try:
+        return np.load(path, mmap_mode='r')
+    except ValueError:
+        return np.load(path) # Zero-length arrays can't be mapped
+
+
+def _load_columns(path, columns, rows=slice(None), mmap=True):
+    # {column: array} for one generation, None if it was replaced meanwhile
+    arrays = {}
+    for column in columns:
+        try:
+            arrays[column] = _load(path / f"{column}.npy", mmap)[rows]
+        except FileNotFoundError:
+            if not path.exists():
+                return None
+    if not arrays:
+        return None
+    length = len(next(iter(arrays.values())))
+    return {
+        column: arrays[column] if column in arrays else np.zeros(length, dtype=COLUMN_DTYPES[column])
+        for column in columns
+    }
+
+
+def to_columns(gamelog):
+    # One array per SCHEMA column from a PlayerGameLog DataFrame
+    arrays = {}
+    for column, dtype in SCHEMA:
+        if column not in gamelog:
+            arrays[column] = np.zeros(len(gamelog), dtype=dtype)
+            continue
+        values = gamelog[column]
+        if dtype.startswith('U'):
+            values = values.fillna('').astype(str)
+        else:
+            values = values.fillna(0)
+        arrays[column] = values.to_numpy().astype(dtype)
+    return arrays
+
+
+def to_frame(arrays, columns):
+    # The numeric columns stay views of the mapped files, no copies
+    return pd.DataFrame(arrays, columns=columns, copy=False)
+
+
+def write_gamelog(player_id, season, gamelog):
+    arrays = to_columns(gamelog)
+    _publish(season_dir(season), player_id, lambda path: _write_columns(path, arrays))
+
+
+def _read_columns(player_id, season, columns):
+    # Per-player generations are newer than the packed season, so check them first
+    directory = season_dir(season)
+    generation, modified_at = _current(directory, player_id)
+    if generation is not None:
+        arrays = _load_columns(directory / generation, columns)
+        if arrays is not None:
+            return arrays, modified_at
+
+    generation, modified_at = _current(directory, 'packed')
+    if generation is None:
+        return None, None
+    try:
+        index = np.load(directory / generation / 'index.npy')
+    except FileNotFoundError:
+        return None, None # Re-packed meanwhile, the caller falls back to the GameLog table
+    position = np.searchsorted(index['player_id'], player_id)
+    if position >= len(index) or index['player_id'][position] != player_id:
+        return None, None
+    entry = index[position]
+    return _load_columns(directory / generation, columns, slice(entry['start'], entry['stop'])), modified_at
+
+
+def _read_v1(player_id, season):
+    # Version 1 stored each gamelog as one structured (row-major) array
+    root = store_root(1)
+    path = root / season / f"{player_id}.npy"
+    if path.exists():
+        return np.load(path), path.stat().st_mtime
+
+    data_path, index_path = root / f"{season}.npy", root / f"{season}.index.npy"
+    if not index_path.exists():
+        return None, None
+    index = np.load(index_path)
+    position = np.searchsorted(index['player_id'], player_id)
+    if position >= len(index) or index['player_id'][position] != player_id:
+        return None, None
+    entry = index[position]
+    return np.load(data_path, mmap_mode='r')[entry['start']:entry['stop']], index_path.stat().st_mtime
+
+
+def read_gamelog(player_id, season, columns=None):
+    # Returns the stored gamelog as a DataFrame of the given columns (all of
+    # them by default), or None when it isn't stored or is stale
+    columns = list(columns or COLUMN_DTYPES)
+    arrays, modified_at = _read_columns(player_id, season, columns)
+    upgrade = None
+    if arrays is None:
+        upgrade, modified_at = _read_v1(player_id, season)
+        if upgrade is None:
+            return None
+
+    # The current season is only trusted for as long as the other local stores
+    if not is_finished_season(season) and time.time() - modified_at > CURRENT_SEASON_MAX_AGE.total_seconds():
+        return None
+
+    if upgrade is not None:
+        arrays = {
+            column: np.asarray(upgrade[column]) if column in upgrade.dtype.names else np.zeros(len(upgrade), dtype=dtype)
+            for column, dtype in SCHEMA
+        }
+        _publish(season_dir(season), player_id, lambda path: _write_columns(path, arrays))
+        arrays = {column: arrays[column] for column in columns}
+    return to_frame(arrays, columns)
+
+
+def _retire(directory, player_id, generation):
+    # Drops a per-player generation once it's packed, unless it was rewritten
+    # since. The pointer is claimed with a rename first, so a write that lands in
+    # between is never deleted: its pointer is put back (or, if an even newer
+    # one exists already, only its files are removed)
+    name = str(player_id)
+    current, _ = _current(directory, name)
+    if current != generation:
+        return
+    claimed = directory / f".{name}.{uuid.uuid4().hex}.retiring"
+    try:
+        os.rename(_pointer(directory, name), claimed)
+    except FileNotFoundError:
+        return
+    current = claimed.read_text(encoding='utf-8')
+    if current == generation:
+        shutil.rmtree(directory / generation, ignore_errors=True)
+    else:
+        try:
+            os.link(claimed, _pointer(directory, name))
+        except FileExistsError:
+            shutil.rmtree(directory / current, ignore_errors=True)
+    claimed.unlink()
+
+
+def _sweep(directory):
+    # Removes generations no pointer names any more, once they're old enough
+    # that no write can still be about to publish them
+    live = {path.read_text(encoding='utf-8') for path in directory.glob('*.current')}
+    cutoff = time.time() - ORPHAN_AGE
+    for path in directory.iterdir():
+        if path.name in live or path.name.endswith('.current'):
+            continue
+        try:
+            if path.stat().st_mtime > cutoff:
+                continue
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink() # A pointer a crashed writer or compaction left behind
+        except FileNotFoundError:
+            continue
+
+
+def compact_season(season):
+    # Packs every per-player generation of a season into one packed generation,
+    # merged with what an earlier compaction already packed
+    with _compact_lock:
+        directory = season_dir(season)
+        if not directory.exists():
+            return 0
+        columns = list(COLUMN_DTYPES)
+        gamelogs = {}
+
+        generation, _ = _current(directory, 'packed')
+        if generation is not None:
+            index = np.load(directory / generation / 'index.npy')
+            packed = _load_columns(directory / generation, columns, mmap=False)
+            for entry in index:
+                gamelogs[int(entry['player_id'])] = {
+                    column: packed[column][entry['start']:entry['stop']] for column in columns
+                }
+
+        # Only the generations actually read are retired afterwards
+        packed_generations = {}
+        for pointer in directory.glob('*.current'):
+            name = pointer.name[:-len('.current')]
+            if name == 'packed':
+                continue
+            generation, _ = _current(directory, name)
+            arrays = _load_columns(directory / generation, columns, mmap=False) if generation else None
+            if arrays is None:
+                continue
+            gamelogs[int(name)] = arrays
+            packed_generations[int(name)] = generation
+
+        if not gamelogs:
+            return 0
+
+        player_ids = sorted(gamelogs)
+        index = np.zeros(len(player_ids), dtype=INDEX_DTYPE)
+        start = 0
+        for position, player_id in enumerate(player_ids):
+            stop = start + len(gamelogs[player_id]['Game_ID'])
+            index[position] = (player_id, start, stop)
+            start = stop
+
+        def write(path):
+            _write_columns(path, {
+                column: np.concatenate([gamelogs[player_id][column] for player_id in player_ids]).astype(dtype)
+                for column, dtype in SCHEMA
+            })
+            np.save(path / 'index.npy', index)
+
+        _publish(directory, 'packed', write)
+        for player_id, generation in packed_generations.items():
+            _retire(directory, player_id, generation)
+        _sweep(directory)
+        return len(player_ids)
+
+
+def stored_seasons():
+    root = store_root()
+    if not root.exists():
+        return []
+    return sorted(path.name for path in root.iterdir() if path.is_dir())
@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import Context, copy_context
+from django.conf import settings
+from django.db import connection
+
+# Bounded pool for upstream fetches, shared by every request in the worker.
+# The rate limiter still decides how fast calls actually leave the process
+fetch_pool = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'H2H_FETCH_WORKERS', 8),
+    thread_name_prefix='h2h-fetch',
+)
+
+# Background refreshes of stale cache entries run on their own threads. A
+# refreshed compare fans out to fetch_pool and waits on it, so running it on
+# fetch_pool would deadlock once every fetch thread was a waiting compare
+refresh_pool = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'H2H_REFRESH_WORKERS', 4),
+    thread_name_prefix='h2h-refresh',
+)
+
+
+def _run(fn, args, kwargs):
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        # Pool threads outlive the request, so don't leave their DB connection open
+        connection.close()
+
+
+def submit(fn, *args, **kwargs):
+    # Runs fn on the fetch pool and returns its Future. fn sees the caller's
+    # context, so e.g. its spans count toward the caller's request
+    return fetch_pool.submit(copy_context().run, _run, fn, args, kwargs)
+
+
+def submit_refresh(fn, *args, **kwargs):
+    # Runs fn on the refresh pool. fn may submit() and wait, but nothing on
+    # fetch_pool may wait on it. It starts from an empty context: the request
+    # that noticed the stale entry has answered by the time fn runs
+    return refresh_pool.submit(Context().run, _run, fn, args, kwargs)
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Pragmas H2H_SQLITE_PRAGMAS may set, with the keywords each accepts besides
+# integers. PRAGMA takes no parameters, so the name and value are formatted
+# into the statement and nothing else gets through
+SQLITE_PRAGMAS = {
+    'journal_mode': {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'},
+    'synchronous': {'OFF', 'NORMAL', 'FULL', 'EXTRA'},
+    'temp_store': {'DEFAULT', 'FILE', 'MEMORY'},
+    'busy_timeout': set(),
+    'cache_size': set(),
+    'mmap_size': set(),
+    'wal_autocheckpoint': set(),
+}
+
+
+def pragma_statement(name, value):
+    keywords = SQLITE_PRAGMAS.get(name)
+    if keywords is None:
+        raise ImproperlyConfigured(f"H2H_SQLITE_PRAGMAS: unsupported pragma {name!r}")
+    if isinstance(value, int) and not isinstance(value, bool):
+        return f"PRAGMA {name} = {value}"
+    if isinstance(value, str) and value.upper() in keywords:
+        return f"PRAGMA {name} = {value.upper()}"
+    raise ImproperlyConfigured(f"H2H_SQLITE_PRAGMAS: invalid value {value!r} for {name}")
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    # H2H_SQLITE_PRAGMAS (see settings_production.py) on every new SQLite connection
+    pragmas = getattr(settings, 'H2H_SQLITE_PRAGMAS', None)
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(pragma_statement(name, value))
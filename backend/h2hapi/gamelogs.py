@@ -0,0 +1,162 @@
+from datetime import datetime, timedelta
+from django.db import transaction
+from django.utils import timezone
+from nba_api.stats.endpoints import playergamelog
+import pandas as pd
+
+from .models import GameLog, GameLogIngest
+from .seasons import is_finished_season
+from .upstream import upstream_request
+
+# Current season rows are re-fetched once they are older than this
+CURRENT_SEASON_MAX_AGE = timedelta(hours=6)
+
+# PlayerGameLog column -> GameLog field, in upstream column order
+GAMELOG_FIELDS = {
+    'Game_ID': 'game_id',
+    'GAME_DATE': 'game_date',
+    'MATCHUP': 'matchup',
+    'WL': 'wl',
+    'MIN': 'minutes',
+    'FGM': 'fgm',
+    'FGA': 'fga',
+    'FG_PCT': 'fg_pct',
+    'FG3M': 'fg3m',
+    'FG3A': 'fg3a',
+    'FG3_PCT': 'fg3_pct',
+    'FTM': 'ftm',
+    'FTA': 'fta',
+    'FT_PCT': 'ft_pct',
+    'OREB': 'oreb',
+    'DREB': 'dreb',
+    'REB': 'reb',
+    'AST': 'ast',
+    'STL': 'stl',
+    'BLK': 'blk',
+    'TOV': 'tov',
+    'PF': 'pf',
+    'PTS': 'pts',
+    'PLUS_MINUS': 'plus_minus',
+    'VIDEO_AVAILABLE': 'video_available',
+}
+
+# GameLog fields that can be NULL. Blank upstream cells in any other stat are
+# stored as 0, like the live path fills them (see columnar.to_columns)
+NULLABLE_FIELDS = {'fg_pct', 'fg3_pct', 'ft_pct'}
+TEXT_FIELDS = {'game_id', 'game_date', 'matchup', 'wl'}
+
+UPSTREAM_DATE_FORMAT = "%b %d, %Y" # e.g. 'APR 13, 2025'
+
+
+def fetch_gamelog(player_id, season):
+    # Fetches a player's regular season gamelog from stats.nba.com
+    with upstream_request('PlayerGameLog'):
+        gamelog_endpoint = playergamelog.PlayerGameLog(
+            player_id=player_id,
+            season=season,
+            season_type_all_star="Regular Season"
+        )
+        return gamelog_endpoint.get_data_frames()[0]
+
+
+def gamelog_failed(gamelog):
+    # Failed fetches come back as a bare pd.DataFrame(). A player without games
+    # still gets the upstream (or stored) columns, just no rows
+    return 'Game_ID' not in gamelog
+
+
+def parse_game_date(value):
+    # PlayerGameLog returns 'APR 13, 2025', LeagueGameLog returns '2025-04-13'
+    if hasattr(value, 'year'):
+        return value
+    for date_format in (UPSTREAM_DATE_FORMAT, "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value.title(), date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized game date: {value}")
+
+
+def rows_from_gamelog(player_id, season, gamelog):
+    # Converts an upstream gamelog DataFrame into unsaved GameLog rows
+    rows = []
+    for record in gamelog.to_dict('records'):
+        fields = {}
+        for column, field in GAMELOG_FIELDS.items():
+            value = record.get(column)
+            if pd.isna(value):
+                value = None if field in NULLABLE_FIELDS or field in TEXT_FIELDS else 0
+            elif field not in NULLABLE_FIELDS and field not in TEXT_FIELDS:
+                value = int(value) # A blank cell elsewhere in the column makes it float
+            fields[field] = value
+        fields['game_date'] = parse_game_date(fields['game_date'])
+        fields['matchup'] = fields['matchup'] or ''
+        fields['wl'] = fields['wl'] or ''
+        rows.append(GameLog(player_id=player_id, season=season, **fields))
+    return rows
+
+
+def upsert_gamelog_rows(rows):
+    # Inserts new games and overwrites ones we already have
+    update_fields = [field for field in GAMELOG_FIELDS.values() if field != 'game_id']
+    GameLog.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['player_id', 'season', 'game_id'],
+        update_fields=update_fields,
+        batch_size=500,
+    )
+
+
+def store_gamelog(player_id, season, gamelog):
+    # Upserts a player's gamelog and marks the season as ingested for them
+    rows = rows_from_gamelog(player_id, season, gamelog)
+
+    with transaction.atomic():
+        if rows:
+            upsert_gamelog_rows(rows)
+        GameLogIngest.objects.update_or_create(
+            player_id=player_id,
+            season=season,
+            defaults={'game_count': len(rows)},
+        )
+    return len(rows)
+
+
+def gamelog_from_rows(player_id, season, rows):
+    # Rebuilds a DataFrame shaped exactly like the PlayerGameLog result set
+    columns = ['SEASON_ID', 'Player_ID'] + list(GAMELOG_FIELDS)
+    records = []
+    for row in rows:
+        record = {
+            'SEASON_ID': f"2{season[:4]}",
+            'Player_ID': player_id,
+        }
+        for column, field in GAMELOG_FIELDS.items():
+            record[column] = row[field]
+        record['GAME_DATE'] = record['GAME_DATE'].strftime(UPSTREAM_DATE_FORMAT).upper()
+        records.append(record)
+    gamelog = pd.DataFrame.from_records(records, columns=columns)
+    # Upstream sends the percentages as floats even when every one is blank
+    nullable = [column for column, field in GAMELOG_FIELDS.items() if field in NULLABLE_FIELDS]
+    gamelog[nullable] = gamelog[nullable].astype('float64')
+    return gamelog
+
+
+def load_gamelog(player_id, season):
+    # Returns the locally stored gamelog, or None when it has to come from upstream
+    ingest = GameLogIngest.objects.filter(player_id=player_id, season=season).first()
+    if ingest is None:
+        return None
+
+    # Finished seasons never change, the current one is refreshed periodically
+    if not is_finished_season(season) and timezone.now() - ingest.fetched_at > CURRENT_SEASON_MAX_AGE:
+        return None
+
+    rows = (
+        GameLog.objects
+        .filter(player_id=player_id, season=season)
+        .order_by('-game_date')
+        .values(*GAMELOG_FIELDS.values())
+    )
+    return gamelog_from_rows(player_id, season, rows)
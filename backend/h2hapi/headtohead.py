@@ -0,0 +1,109 @@
+from django.db import transaction
+from django.utils import timezone
+import pandas as pd
+
+from .aggregation import summarize
+from .gamelogs import CURRENT_SEASON_MAX_AGE, GAMELOG_FIELDS, NULLABLE_FIELDS
+from .models import GameLog, GameLogIngest, HeadToHead, HeadToHeadBuild
+from .seasons import is_finished_season
+
+# Numeric PlayerGameLog columns, in the order aggregate_stats_from_df reports them.
+# GamelogArrays picks up the same columns from a live or stored gamelog, so matrix
+# rows carry the same total_stats as a compare computed from the gamelogs
+TOTAL_COLS = ['Player_ID'] + [
+    column for column in GAMELOG_FIELDS
+    if column not in ('Game_ID', 'GAME_DATE', 'MATCHUP', 'WL')
+]
+
+# Stored as integers, so a gamelog read back from GameLog reports them as ints
+INTEGER_COLS = tuple(column for column in TOTAL_COLS if GAMELOG_FIELDS.get(column) not in NULLABLE_FIELDS)
+
+
+def season_frame(season):
+    # Every stored gamelog row for a season, with upstream column names
+    numeric_fields = {GAMELOG_FIELDS[column]: column for column in TOTAL_COLS if column != 'Player_ID'}
+    rows = GameLog.objects.filter(season=season).values('player_id', 'game_id', *numeric_fields)
+    frame = pd.DataFrame.from_records(rows, columns=['player_id', 'game_id', *numeric_fields])
+    frame = frame.rename(columns=numeric_fields)
+    frame['Player_ID'] = frame['player_id']
+    frame[TOTAL_COLS] = frame[TOTAL_COLS].astype('float64').fillna(0)
+    return frame
+
+
+def pair_totals(frame):
+    # Sums each player's box score over the games shared with every other player,
+    # one row per ordered (player_id, opponent_id) pair
+    players = frame[['game_id', 'player_id']]
+    pairs = players.merge(players, on='game_id', suffixes=('', '_opponent'))
+    pairs = pairs[pairs['player_id'] != pairs['player_id_opponent']]
+    pairs = pairs.merge(frame, on=['game_id', 'player_id'])
+
+    grouped = pairs.groupby(['player_id', 'player_id_opponent'], sort=False)
+    totals = grouped[TOTAL_COLS].sum()
+    totals['game_count'] = grouped.size()
+    return totals
+
+
+def summarize_pairs(totals):
+    # Same shape as aggregate_stats_from_df, computed column-wise for every pair
+    summaries = summarize(totals[TOTAL_COLS].to_numpy(), totals['game_count'].to_numpy(), TOTAL_COLS, INTEGER_COLS)
+    return dict(zip(totals.index, summaries))
+
+
+def build_h2h_matrix(season):
+    # Rebuilds every HeadToHead row for a season from the stored gamelogs, and
+    # records which players' gamelogs it covered
+    player_ids = sorted(GameLogIngest.objects.filter(season=season).values_list('player_id', flat=True))
+    frame = season_frame(season)
+    if frame.empty:
+        return 0
+
+    summaries = summarize_pairs(pair_totals(frame))
+    rows = []
+    for (player_id, opponent_id), stats in summaries.items():
+        if player_id > opponent_id:
+            continue # Each unordered pair is stored once, lower ID as player A
+        rows.append(HeadToHead(
+            season=season,
+            player_a_id=player_id,
+            player_b_id=opponent_id,
+            game_count=stats["game_count"],
+            stats={"player_a": stats, "player_b": summaries[(opponent_id, player_id)]},
+        ))
+
+    with transaction.atomic():
+        HeadToHead.objects.filter(season=season).delete()
+        HeadToHead.objects.bulk_create(rows, batch_size=1000)
+        HeadToHeadBuild.objects.update_or_create(
+            season=season,
+            defaults={'player_ids': player_ids, 'pair_count': len(rows)},
+        )
+    return len(rows)
+
+
+def load_h2h(player_a_id, player_b_id, season):
+    # Returns the precomputed h2h_stats for a pair, or None to compute it live
+    low_id, high_id = sorted((player_a_id, player_b_id))
+    row = HeadToHead.objects.filter(season=season, player_a_id=low_id, player_b_id=high_id).first()
+    if row is None:
+        return no_meetings(low_id, high_id, season)
+
+    # The current season's matrix goes stale as new games are played
+    if not is_finished_season(season) and timezone.now() - row.built_at > CURRENT_SEASON_MAX_AGE:
+        return None
+
+    if player_a_id == low_id:
+        return row.stats
+    return {"player_a": row.stats["player_b"], "player_b": row.stats["player_a"]}
+
+
+def no_meetings(low_id, high_id, season):
+    # Pairs who never shared a game have no row. That is only a definite answer
+    # when the matrix was built from both players' gamelogs
+    build = HeadToHeadBuild.objects.filter(season=season).first()
+    if build is None or low_id not in build.player_ids or high_id not in build.player_ids:
+        return None
+    if not is_finished_season(season) and timezone.now() - build.built_at > CURRENT_SEASON_MAX_AGE:
+        return None
+    empty_stats = {"game_count": 0, "error": "No H2H Games Found."}
+    return {"player_a": empty_stats, "player_b": empty_stats}
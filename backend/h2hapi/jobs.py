@@ -0,0 +1,117 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import F, Q
+from django.utils import timezone
+import threading
+import time
+
+from .models import CompareJob
+
+# How long an idle worker sleeps between polls of the queue, in seconds
+POLL_INTERVAL = 0.5
+
+# How often idle workers delete old finished jobs, in seconds
+PURGE_INTERVAL = 60
+
+_wake = threading.Event()
+_start_lock = threading.Lock()
+_threads = []
+_purged_at = 0.0
+
+
+def job_timeout():
+    # A running job older than this is assumed to belong to a dead worker
+    return timedelta(seconds=getattr(settings, 'H2H_JOB_TIMEOUT', 120))
+
+
+def enqueue(player_a_id, player_b_id, season):
+    # Returns the queued job for this compare, reusing one that is already waiting.
+    # A-vs-B and B-vs-A are one compare, so jobs are kept lower player ID first
+    low_id, high_id = sorted((player_a_id, player_b_id))
+    job = CompareJob.objects.filter(
+        player_a_id=low_id,
+        player_b_id=high_id,
+        season=season,
+        status__in=[CompareJob.PENDING, CompareJob.RUNNING],
+    ).first()
+    if job is None:
+        job = CompareJob.objects.create(player_a_id=low_id, player_b_id=high_id, season=season)
+    start_workers()
+    _wake.set()
+    return job
+
+
+def claim_next():
+    # Takes the oldest pending (or abandoned) job. The conditional UPDATE is the
+    # claim, so two workers, even in different processes, never run the same job
+    now = timezone.now()
+    claimable = Q(status=CompareJob.PENDING) | Q(status=CompareJob.RUNNING, started_at__lt=now - job_timeout())
+    for job_id in CompareJob.objects.filter(claimable).order_by('created_at').values_list('id', flat=True)[:5]:
+        claimed = CompareJob.objects.filter(claimable, id=job_id).update(
+            status=CompareJob.RUNNING,
+            started_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return CompareJob.objects.get(id=job_id)
+    return None
+
+
+def run_job(job):
+    from .views import ComparePlayersView # views enqueues jobs, so import it late
+
+    try:
+        entry = ComparePlayersView().get_comparison(job.player_a_id, job.player_b_id, job.season)
+    except Exception as e:
+        print(f"Error in compare job {job.id}: {e}")
+        job.status = CompareJob.FAILED
+        job.error = str(e)
+    else:
+        job.status = CompareJob.DONE
+        job.result = entry
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+
+
+def purge_finished():
+    # Finished jobs only need to live long enough for the client to poll them
+    retention = timedelta(seconds=getattr(settings, 'H2H_JOB_RETENTION', 3600))
+    return CompareJob.objects.filter(
+        status__in=[CompareJob.DONE, CompareJob.FAILED],
+        finished_at__lt=timezone.now() - retention,
+    ).delete()[0]
+
+
+def work(stop=None):
+    # Worker loop: run jobs until the queue is empty, then sleep until woken or polled
+    global _purged_at
+    while stop is None or not stop.is_set():
+        close_old_connections()
+        try:
+            job = claim_next()
+            if job is not None:
+                run_job(job)
+                continue
+            if time.monotonic() - _purged_at > PURGE_INTERVAL:
+                _purged_at = time.monotonic()
+                purge_finished()
+        except Exception as e:
+            print(f"Error in compare job worker: {e}")
+
+        _wake.wait(POLL_INTERVAL)
+        _wake.clear()
+    connection.close()
+
+
+def start_workers(count=None):
+    # Starts this process's job threads once. Jobs are left to run_compare_jobs
+    # processes unless H2H_JOB_THREADS asks for threads in the web workers too
+    count = getattr(settings, 'H2H_JOB_THREADS', 0) if count is None else count
+    with _start_lock:
+        if _threads or count <= 0:
+            return
+        for number in range(count):
+            thread = threading.Thread(target=work, name=f'h2h-job-{number}', daemon=True)
+            thread.start()
+            _threads.append(thread)
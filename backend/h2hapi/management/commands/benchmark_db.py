@@ -0,0 +1,203 @@
+from backend import settings_production
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from h2hapi.models import GameLog, Player
+import datetime
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+# A season no real data uses, so the synthetic rows never mix with real ones
+BENCH_SEASON = '2099-00'
+
+# Indexes added for the list, search and game-log queries, dropped for the baseline
+NEW_INDEXES = ['player_name', 'gamelog_season_date']
+
+# Python's sqlite3 default, which is what the development settings use
+DEFAULT_TIMEOUT = 5
+
+
+def placeholder_value(field):
+    # Something valid for a GameLog column, by its Django field type
+    kind = field.get_internal_type()
+    if kind == 'DateField':
+        return '2099-01-01'
+    if kind in ('CharField', 'TextField'):
+        return ''
+    return 0
+
+
+class Command(BaseCommand):
+    help = 'Compares read throughput under a concurrent sync writer: default SQLite vs the production profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5, help="How long each profile runs")
+        parser.add_argument('--readers', type=int, default=4, help="Concurrent reader threads")
+        parser.add_argument('--players', type=int, default=500, help="Synthetic players when the roster is smaller")
+        parser.add_argument('--games', type=int, default=60, help="Synthetic games per player")
+
+    def handle(self, *args, **options):
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for profile in ('default', 'production'):
+                path = os.path.join(directory, f"{profile}.sqlite3")
+                self.prepare(path, profile, options)
+                self.stdout.write(f"Running {profile} for {options['seconds']:.0f}s with {options['readers']} readers + 1 writer...")
+                results[profile] = self.run(path, profile, options)
+
+        self.stdout.write(self.style.SUCCESS("Benchmark finished."))
+        for profile, result in results.items():
+            self.stdout.write(
+                f"{profile:>10}: {result['reads_per_second']:8.0f} reads/s, "
+                f"{result['writes_per_second']:6.0f} rows written/s, "
+                f"{result['errors']} 'database is locked' errors"
+            )
+        if results['default']['reads_per_second']:
+            speedup = results['production']['reads_per_second'] / results['default']['reads_per_second']
+            self.stdout.write(f"Read throughput: {speedup:.1f}x")
+
+    def prepare(self, path, profile, options):
+        # A copy of the current database (schema and data), plus synthetic rows
+        source = sqlite3.connect(settings.DATABASES['default']['NAME'])
+        target = sqlite3.connect(path)
+        source.backup(target)
+        source.close()
+
+        if profile == 'default':
+            for index in NEW_INDEXES:
+                target.execute(f"DROP INDEX IF EXISTS {index}")
+            target.execute("PRAGMA journal_mode = DELETE")
+        else:
+            self.apply_pragmas(target)
+
+        player_table = Player._meta.db_table
+        roster_size = target.execute(f"SELECT COUNT(*) FROM {player_table}").fetchone()[0]
+        if roster_size < options['players']:
+            target.executemany(
+                f"INSERT INTO {player_table} (api_id, first_name, last_name, team_api_id, team_name, team_abbreviation) "
+                "VALUES (?, ?, ?, NULL, '', '')",
+                [(9_000_000 + number, f"First{number}", f"Last{random.randrange(10_000):04d}")
+                 for number in range(options['players'] - roster_size)],
+            )
+
+        player_ids = [row[0] for row in target.execute(f"SELECT api_id FROM {player_table}")]
+        rows = [
+            self.gamelog_row(player_id, game, datetime.date(2099, 1, 1) + datetime.timedelta(days=game))
+            for player_id in player_ids for game in range(options['games'])
+        ]
+        target.executemany(self.gamelog_insert(), rows)
+        target.commit()
+        target.close()
+
+    def apply_pragmas(self, conn):
+        for name, value in settings_production.H2H_SQLITE_PRAGMAS.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+
+    def gamelog_fields(self):
+        return [field for field in GameLog._meta.concrete_fields if not field.primary_key]
+
+    def gamelog_insert(self):
+        columns = [field.column for field in self.gamelog_fields()]
+        return (
+            f"INSERT INTO {GameLog._meta.db_table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})"
+        )
+
+    def gamelog_row(self, player_id, game, game_date):
+        values = {field.name: placeholder_value(field) for field in self.gamelog_fields()}
+        values.update(
+            player_id=player_id,
+            season=BENCH_SEASON,
+            game_id=f"B{game:07d}",
+            game_date=game_date.isoformat(),
+            pts=random.randrange(40),
+        )
+        return [values[field.name] for field in self.gamelog_fields()]
+
+    def connect(self, path, profile):
+        conn = sqlite3.connect(
+            path,
+            timeout=DEFAULT_TIMEOUT if profile == 'default' else settings_production.DATABASES['default']['OPTIONS']['timeout'],
+            check_same_thread=False,
+        )
+        if profile == 'production':
+            self.apply_pragmas(conn)
+        return conn
+
+    def run(self, path, profile, options):
+        stop = threading.Event()
+        lock = threading.Lock()
+        totals = {'reads': 0, 'writes': 0, 'errors': 0}
+        player_table = Player._meta.db_table
+        gamelog_table = GameLog._meta.db_table
+        conn = sqlite3.connect(path)
+        player_ids = [row[0] for row in conn.execute(f"SELECT api_id FROM {player_table}")]
+        conn.close()
+
+        def reader():
+            # The queries behind the roster list, a compare's stored gamelog and the
+            # sync's date window. Development settings open a connection per request
+            # (CONN_MAX_AGE=0), production keeps one
+            reads = errors = 0
+            conn = self.connect(path, profile) if profile == 'production' else None
+            while not stop.is_set():
+                request_conn = conn or self.connect(path, profile)
+                try:
+                    request_conn.execute(
+                        f"SELECT api_id, first_name, last_name FROM {player_table} ORDER BY last_name, first_name"
+                    ).fetchall()
+                    request_conn.execute(
+                        f"SELECT game_id, pts FROM {gamelog_table} WHERE player_id = ? AND season = ?",
+                        (random.choice(player_ids), BENCH_SEASON),
+                    ).fetchall()
+                    request_conn.execute(
+                        f"SELECT COUNT(*) FROM {gamelog_table} WHERE season = ? AND game_date >= ?",
+                        (BENCH_SEASON, '2099-02-01'),
+                    ).fetchone()
+                    reads += 1
+                except sqlite3.OperationalError:
+                    errors += 1
+                finally:
+                    if conn is None:
+                        request_conn.close()
+            with lock:
+                totals['reads'] += reads
+                totals['errors'] += errors
+
+        def writer():
+            # Like sync_games: batches of new rows, each batch in one transaction
+            conn = self.connect(path, profile)
+            batch = 0
+            while not stop.is_set():
+                game_date = datetime.date(2099, 6, 1) + datetime.timedelta(days=batch)
+                rows = [self.gamelog_row(player_id, 100_000 + batch, game_date) for player_id in player_ids[:200]]
+                try:
+                    with conn:
+                        conn.executemany(self.gamelog_insert(), rows)
+                    with lock:
+                        totals['writes'] += len(rows)
+                except sqlite3.OperationalError:
+                    with lock:
+                        totals['errors'] += 1
+                batch += 1
+            conn.close()
+
+        threads = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        threads.append(threading.Thread(target=writer))
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        return {
+            'reads_per_second': totals['reads'] / elapsed,
+            'writes_per_second': totals['writes'] / elapsed,
+            'errors': totals['errors'],
+        }
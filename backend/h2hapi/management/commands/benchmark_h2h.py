@@ -0,0 +1,97 @@
+from django.core.management.base import BaseCommand
+from h2hapi.aggregation import AVG_COLS, GamelogArrays, compute_h2h, compute_pairs
+from h2hapi.gamelogs import GAMELOG_FIELDS
+from itertools import combinations
+import numpy as np
+import pandas as pd
+import time
+
+def legacy_aggregate(stats_df):
+    # The merge + isin + per-column loop implementation this engine replaced
+    game_count = len(stats_df)
+    total_stats = stats_df.sum(numeric_only=True)
+    efg_pct = (total_stats['FGM'] + 0.5 * total_stats['FG3M']) / total_stats['FGA']
+    tsp_pct = total_stats['PTS'] / (2 * (total_stats['FGA'] + 0.44 * total_stats['FTA']))
+    avg_stats = {}
+    for col in AVG_COLS:
+        avg_stats[col] = round(pd.to_numeric(total_stats[col]) / game_count, 1)
+    return {
+        "game_count": int(game_count),
+        "avg_stats": avg_stats,
+        "advanced_stats": {"efg_pct": round(efg_pct, 3), "tsp_pct": round(tsp_pct, 3)},
+        "total_stats": total_stats.to_dict()
+    }
+
+
+def legacy_h2h(gamelog_a, gamelog_b):
+    common_game_ids = pd.merge(gamelog_a, gamelog_b, on='Game_ID', suffixes=('_a', '_b'))['Game_ID']
+    h2h_games_a = gamelog_a[gamelog_a['Game_ID'].isin(common_game_ids)]
+    h2h_games_b = gamelog_b[gamelog_b['Game_ID'].isin(common_game_ids)]
+    return {"player_a": legacy_aggregate(h2h_games_a), "player_b": legacy_aggregate(h2h_games_b)}
+
+
+def synthetic_gamelog(player_id, rng, games=82, season_games=1230):
+    # A PlayerGameLog-shaped frame with random box scores
+    columns = ['SEASON_ID', 'Player_ID'] + list(GAMELOG_FIELDS)
+    game_numbers = np.sort(rng.choice(season_games, size=games, replace=False))
+    frame = pd.DataFrame({column: rng.integers(0, 40, size=games) for column in columns})
+    frame['SEASON_ID'] = '22024'
+    frame['Player_ID'] = player_id
+    frame['Game_ID'] = [f"00224{number:05d}" for number in game_numbers]
+    frame['GAME_DATE'] = 'APR 13, 2025'
+    frame['MATCHUP'] = 'DEN vs. SAS'
+    frame['WL'] = 'W'
+    for column in ('FG_PCT', 'FG3_PCT', 'FT_PCT'):
+        frame[column] = rng.random(games)
+    return frame
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmarks the H2H aggregation engine against the previous pandas implementation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200, help="Single-pair iterations")
+        parser.add_argument('--players', type=int, default=20, help="Players in the all-pairs batch")
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        # Dense schedule so every pair shares games, like a season of division rivals
+        gamelogs = {
+            player_id: synthetic_gamelog(player_id, rng, season_games=120)
+            for player_id in range(1, options['players'] + 1)
+        }
+        gamelog_a, gamelog_b = gamelogs[1], gamelogs[2]
+
+        repeat = options['repeat']
+        legacy_single = self.time_it(lambda: legacy_h2h(gamelog_a, gamelog_b), repeat)
+        engine_single = self.time_it(lambda: compute_h2h(gamelog_a, gamelog_b), repeat)
+
+        pairs = list(combinations(gamelogs, 2))
+        legacy_batch = self.time_it(
+            lambda: [legacy_h2h(gamelogs[a], gamelogs[b]) for a, b in pairs], 3
+        )
+        engine_batch = self.time_it(
+            lambda: compute_pairs({player_id: GamelogArrays(frame) for player_id, frame in gamelogs.items()}, pairs), 3
+        )
+
+        # Both implementations must agree before the numbers mean anything
+        legacy = legacy_h2h(gamelog_a, gamelog_b)
+        engine = compute_h2h(gamelog_a, gamelog_b)
+        assert legacy == engine
+
+        self.stdout.write(f"Single pair ({repeat} runs):")
+        self.report(legacy_single, engine_single)
+        self.stdout.write(f"All pairs of {len(gamelogs)} players ({len(pairs)} pairs):")
+        self.report(legacy_batch, engine_batch)
+
+    def time_it(self, fn, repeat):
+        fn() # Warm up
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - started) / repeat
+
+    def report(self, legacy, engine):
+        self.stdout.write(f"  pandas merge/isin/loop: {legacy * 1000:.3f} ms")
+        self.stdout.write(f"  numpy engine:           {engine * 1000:.3f} ms")
+        self.stdout.write(self.style.SUCCESS(f"  speedup:                {legacy / engine:.1f}x"))
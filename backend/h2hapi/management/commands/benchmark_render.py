@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand
+from h2hapi.aggregation import compute_h2h
+from h2hapi.management.commands.benchmark_h2h import synthetic_gamelog
+from h2hapi.renderers import FastJSONRenderer, orjson
+from h2hapi.responses import select_fields
+from h2hapi.views import ComparePlayersView
+from nba_api.stats.endpoints import playercareerstats
+from rest_framework.renderers import JSONRenderer
+import numpy as np
+import pandas as pd
+import time
+
+
+def synthetic_season_row(player_id, rng):
+    # One PlayerCareerStats season row, mixed dtypes like the real frame
+    columns = playercareerstats.PlayerCareerStats.expected_data['SeasonTotalsRegularSeason']
+    frame = pd.DataFrame([{column: int(rng.integers(1, 2000)) for column in columns}], columns=columns)
+    frame['PLAYER_ID'] = player_id
+    frame['SEASON_ID'] = '2024-25'
+    frame['LEAGUE_ID'] = '00'
+    frame['TEAM_ABBREVIATION'] = 'DEN'
+    for column in ('FG_PCT', 'FG3_PCT', 'FT_PCT'):
+        frame[column] = rng.random()
+    return frame.iloc[0]
+
+
+class Command(BaseCommand):
+    help = 'Compares DRF\'s JSON renderer with FastJSONRenderer on a compare payload, full and compact'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=2000, help="Renders per variant")
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        view = ComparePlayersView()
+        gamelog_a = synthetic_gamelog(1, rng)
+        gamelog_b = synthetic_gamelog(2, rng)
+        season_stats = {
+            "player_a": view.summarize_season_stats(synthetic_season_row(1, rng)),
+            "player_b": view.summarize_season_stats(synthetic_season_row(2, rng)),
+        }
+        payload = {
+            "player_a_id": 1,
+            "player_b_id": 2,
+            "season": "2024-25",
+            "player_a_details": {"first_name": "A", "last_name": "Player", "team_id": 1610612743, "team_abbreviation": "DEN"},
+            "player_b_details": {"first_name": "B", "last_name": "Player", "team_id": 1610612759, "team_abbreviation": "SAS"},
+            "season_stats": season_stats,
+            "h2h_stats": compute_h2h(gamelog_a, gamelog_b),
+        }
+
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson isn't installed, FastJSONRenderer falls back to DRF's encoder."))
+
+        variants = [
+            ("DRF JSONRenderer, full", JSONRenderer(), payload),
+            ("FastJSONRenderer, full", FastJSONRenderer(), payload),
+            ("DRF JSONRenderer, ?compact=1", JSONRenderer(), None),
+            ("FastJSONRenderer, ?compact=1", FastJSONRenderer(), None),
+        ]
+        results = []
+        for label, renderer, data in variants:
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                # Field selection runs per request, so it's part of the cost
+                body = renderer.render(data if data is not None else select_fields(payload, compact=True))
+            elapsed = (time.perf_counter() - started) / options['repeat']
+            results.append((label, elapsed, len(body)))
+
+        baseline_time, baseline_size = results[0][1], results[0][2]
+        for label, elapsed, size in results:
+            self.stdout.write(
+                f"{label:<30} {elapsed * 1e6:8.1f} us/render  {size:6d} bytes  "
+                f"({baseline_time / elapsed:4.1f}x faster, {1 - size / baseline_size:4.0%} smaller)"
+            )
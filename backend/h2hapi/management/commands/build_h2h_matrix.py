@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from h2hapi.headtohead import build_h2h_matrix
+from h2hapi.seasons import CURRENT_SEASON
+import time
+
+class Command(BaseCommand):
+    help = 'Precomputes H2H stats for every pair of players from the stored gamelogs'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--season', default=CURRENT_SEASON, help="Season in 'YYYY-YY' format")
+    
+    def handle(self, *args, **options):
+        season = options['season']
+        self.stdout.write(f"Building H2H matrix for {season}...")
+        
+        started = time.perf_counter()
+        pair_count = build_h2h_matrix(season)
+        elapsed = time.perf_counter() - started
+        
+        if not pair_count:
+            self.stderr.write(self.style.ERROR(
+                f"No gamelogs stored for {season}. Run ingest_gamelogs first."
+            ))
+            return
+        
+        self.stdout.write(self.style.SUCCESS(f"Finished building H2H matrix for {season}."))
+        self.stdout.write(f"Pairs Stored: {pair_count}")
+        self.stdout.write(f"Time: {elapsed:.1f}s")
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from h2hapi.columnar import compact_season, stored_seasons
+import time
+
+class Command(BaseCommand):
+    help = 'Packs the per-player columnar gamelogs of each season into one set of column files'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--season', nargs='*', help="Seasons in 'YYYY-YY' format (defaults to every stored season)")
+    
+    def handle(self, *args, **options):
+        seasons = options['season'] or stored_seasons()
+        if not seasons:
+            self.stdout.write("Nothing stored yet.")
+            return
+        
+        for season in seasons:
+            started = time.perf_counter()
+            player_count = compact_season(season)
+            self.stdout.write(self.style.SUCCESS(
+                f"Compacted {season}: {player_count} players in {time.perf_counter() - started:.2f}s"
+            ))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from h2hapi.models import Player, GameLogIngest
+from h2hapi.gamelogs import fetch_gamelog, store_gamelog
+from h2hapi.seasons import CURRENT_SEASON
+
+class Command(BaseCommand):
+    help = 'Stores player gamelogs for a season in the local GameLog table'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--season', default=CURRENT_SEASON, help="Season in 'YYYY-YY' format")
+        parser.add_argument('--players', nargs='*', type=int, help="Player API IDs (defaults to every active player)")
+        parser.add_argument('--force', action='store_true', help="Re-fetch players that are already stored")
+    
+    def handle(self, *args, **options):
+        season = options['season']
+        player_ids = options['players'] or list(Player.objects.values_list('api_id', flat=True))
+        
+        if not options['force']:
+            # Skip players we already have for this season
+            done = set(
+                GameLogIngest.objects.filter(season=season, player_id__in=player_ids)
+                .values_list('player_id', flat=True)
+            )
+            player_ids = [player_id for player_id in player_ids if player_id not in done]
+        
+        self.stdout.write(f"Ingesting {len(player_ids)} gamelogs for {season}...")
+        
+        games_stored = 0
+        failures = 0
+        for index, player_id in enumerate(player_ids, start=1):
+            try:
+                gamelog = fetch_gamelog(player_id, season)
+                games_stored += store_gamelog(player_id, season, gamelog)
+            except Exception as e:
+                failures += 1
+                self.stderr.write(self.style.ERROR(f"Failed to ingest {player_id}: {e}"))
+                continue
+            
+            if index % 25 == 0:
+                self.stdout.write(f"  {index}/{len(player_ids)} players done")
+        
+        self.stdout.write(self.style.SUCCESS(f"Finished ingesting gamelogs for {season}."))
+        self.stdout.write(f"Games Stored: {games_stored}")
+        self.stdout.write(f"Failures: {failures}")
@@ -1,49 +1,85 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from h2hapi.models import Player
+from h2hapi.signals import roster_changed
 from nba_api.stats.static import players
+import time
 
 class Command(BaseCommand):
     help = 'Populates the database with NBA players using nba-api'
-    
-    def handle(self, *args, **kwargs):
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-retired',
+            action='store_true',
+            help="Leave players who are no longer active in the database"
+        )
+
+    def handle(self, *args, **options):
         self.stdout.write("Starting player population...")
+        started = time.perf_counter()
 
         try:
             # This function call gets ALL players (active and historic)
             all_players = players.get_players()
-            
+
             if not all_players:
                 self.stderr.write(self.style.ERROR("Could not fetch any players from nba-api."))
                 return
-            
-            players_added_count = 0
-            players_updated_count = 0
-            
+
+            # Everyone we already have, in one query
+            existing = {player.api_id: player for player in Player.objects.all()}
+
+            to_create = []
+            to_update = []
+            active_ids = set()
+
             for player_data in all_players:
                 if not player_data['is_active']:
                     continue # Skip players that aren't active
-                
-                obj, created = Player.objects.update_or_create(
-                    api_id=player_data['id'],
-                    defaults={
-                        'first_name': player_data['first_name'],
-                        'last_name': player_data['last_name'],
-                    }
-                )
-                
-                if created:
-                    players_added_count += 1
-                else:
-                    players_updated_count += 1
-                    
+
+                api_id = player_data['id']
+                active_ids.add(api_id)
+                player = existing.get(api_id)
+
+                if player is None:
+                    to_create.append(Player(
+                        api_id=api_id,
+                        first_name=player_data['first_name'],
+                        last_name=player_data['last_name'],
+                    ))
+                elif (player.first_name, player.last_name) != (player_data['first_name'], player_data['last_name']):
+                    # Only write rows whose names actually changed
+                    player.first_name = player_data['first_name']
+                    player.last_name = player_data['last_name']
+                    to_update.append(player)
+
+            # Player only holds active players, so retired ones are removed
+            retired_ids = [] if options['keep_retired'] else [
+                api_id for api_id in existing if api_id not in active_ids
+            ]
+
+            with transaction.atomic():
+                Player.objects.bulk_create(to_create, batch_size=500)
+                Player.objects.bulk_update(to_update, ['first_name', 'last_name'], batch_size=500)
+                if retired_ids:
+                    Player.objects.filter(api_id__in=retired_ids).delete()
+
+            # Bulk writes skip post_save, so tell the search index and roster cache ourselves
+            if to_create or to_update or retired_ids:
+                roster_changed.send(sender=Player)
+
             self.stdout.write(self.style.SUCCESS(
                 f"Successfully finished populating active players."
             ))
-            self.stdout.write(f"Players Added: {players_added_count}")
-            self.stdout.write(f"Players Updated: {players_updated_count}")
-            
+            self.stdout.write(f"Players Added: {len(to_create)}")
+            self.stdout.write(f"Players Updated: {len(to_update)}")
+            self.stdout.write(f"Players Removed: {len(retired_ids)}")
+            self.stdout.write(f"Players Unchanged: {len(active_ids) - len(to_create) - len(to_update)}")
+            self.stdout.write(f"Time: {time.perf_counter() - started:.2f}s")
+
         except Exception as e:
             self.stderr.write(self.style.ERROR(f"An error occurred: {e}"))
             self.stderr.write(
                 "This might be a temporary connection issue to stats.nba.com."
-            )
\ No newline at end of file
+            )
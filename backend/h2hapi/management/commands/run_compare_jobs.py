@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from h2hapi.jobs import work
+import threading
+
+class Command(BaseCommand):
+    help = 'Runs queued compare jobs, so web workers can leave them all to this process'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help="Jobs to run at the same time")
+    
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=work, args=(stop,), name=f'h2h-job-{number}', daemon=True)
+            for number in range(options['threads'])
+        ]
+        for thread in threads:
+            thread.start()
+        
+        self.stdout.write(f"Running compare jobs on {len(threads)} threads, Ctrl+C to stop...")
+        try:
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            stop.set()
+            self.stdout.write("Stopping...")
@@ -0,0 +1,136 @@
+from collections import Counter
+from django.core.management.base import BaseCommand
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from nba_api.stats.endpoints import leaguedashplayerstats, leaguegamelog, playercareerstats, playergamelog
+from urllib.parse import parse_qs, urlparse
+import datetime
+import json
+import random
+import threading
+import time
+
+# Endpoints the stub can answer, by the lowercase name in the request path
+ENDPOINTS = {
+    'playergamelog': playergamelog.PlayerGameLog,
+    'playercareerstats': playercareerstats.PlayerCareerStats,
+    'leaguegamelog': leaguegamelog.LeagueGameLog,
+    'leaguedashplayerstats': leaguedashplayerstats.LeagueDashPlayerStats,
+}
+
+# The result set stats.nba.com sends first (get_data_frames()[0]), when it
+# isn't the only one
+FIRST_RESULT_SET = {
+    'playercareerstats': 'SeasonTotalsRegularSeason',
+}
+
+
+def fake_value(header, row, params):
+    # Plausible values for the columns our parsers look at, small ints elsewhere
+    player_id = int(params.get('PlayerID', 0) or 0) or 1000 + row
+    if params.get('Season'):
+        season = params['Season']
+        season_id = '2' + season[:4]
+    else:
+        # Career tables: one row per season, counting back from this one
+        year = 2025 - row
+        season = season_id = f"{year}-{str(year + 1)[-2:]}"
+    game_date = datetime.date(int(season[:4]), 10, 22) + datetime.timedelta(days=2 * row)
+    values = {
+        'PLAYER_ID': player_id,
+        'SEASON_ID': season_id,
+        'GAME_ID': f"002{season[2:4]}{row + 1:05d}",
+        'GAME_DATE': game_date.isoformat() if 'PlayerOrTeam' in params else game_date.strftime('%b %d, %Y').upper(),
+        'MATCHUP': 'DEN vs. LAL' if row % 2 else 'DEN @ LAL',
+        'WL': 'W' if row % 3 else 'L',
+        'TEAM_ID': 1610612743,
+        'TEAM_ABBREVIATION': 'DEN',
+        'PLAYER_NAME': f"Stub Player {player_id}",
+    }
+    key = header.upper()
+    if key in values:
+        return values[key]
+    if key.endswith('_PCT'):
+        return round(random.random(), 3)
+    return random.randint(0, 30)
+
+
+def fake_payload(endpoint, params, rows):
+    endpoint_class = ENDPOINTS[endpoint]
+    first = FIRST_RESULT_SET.get(endpoint, next(iter(endpoint_class.expected_data)))
+    names = [first] + [name for name in endpoint_class.expected_data if name != first]
+    result_sets = []
+    for name in names:
+        headers = endpoint_class.expected_data[name]
+        row_count = rows if name == first else 0 # Only the first result set matters to us
+        result_sets.append({
+            "name": name,
+            "headers": headers,
+            "rowSet": [[fake_value(header, row, params) for header in headers] for row in range(row_count)],
+        })
+    return {"resource": endpoint_class.endpoint, "parameters": params, "resultSets": result_sets}
+
+
+def stub_server(options, stdout):
+    # The stand-in server, not started yet. options are the command's; port 0
+    # picks a free port (see server.server_port), e.g. for tests
+    seen = Counter()
+    seen_lock = threading.Lock()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1' # Keep-alive, like the real thing
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            endpoint = url.path.rstrip('/').rsplit('/', 1)[-1].lower()
+            params = {key: values[0] for key, values in parse_qs(url.query, keep_blank_values=True).items()}
+            with seen_lock:
+                seen[self.path] += 1
+                attempt = seen[self.path]
+
+            if options['delay']:
+                time.sleep(options['delay'])
+
+            if endpoint not in ENDPOINTS:
+                return self.reply(404, {"message": f"Unknown endpoint {endpoint}"})
+            if attempt <= options['fail_first'] or random.random() < options['fail_rate']:
+                return self.reply(options['fail_status'], {"message": "Stub failure"})
+            self.reply(200, fake_payload(endpoint, params, options['rows']))
+
+        def reply(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            if status != 200 and options['retry_after'] is not None:
+                self.send_header('Retry-After', str(options['retry_after']))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            stdout.write(f"{self.address_string()} {format % args}")
+
+    return ThreadingHTTPServer(('127.0.0.1', options['port']), StubHandler)
+
+
+class Command(BaseCommand):
+    help = 'Runs a local stand-in for stats.nba.com that can be slow or fail, for testing the upstream session'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8010)
+        parser.add_argument('--delay', type=float, default=0.0, help="Seconds to wait before every response")
+        parser.add_argument('--fail-rate', type=float, default=0.0, help="Fraction of requests answered with --fail-status")
+        parser.add_argument('--fail-first', type=int, default=0, help="Fail the first N requests for each distinct URL")
+        parser.add_argument('--fail-status', type=int, default=503, help="Status code of failed responses, e.g. 429 or 503")
+        parser.add_argument('--retry-after', type=int, help="Retry-After seconds sent with failed responses")
+        parser.add_argument('--rows', type=int, default=40, help="Rows in each generated result set")
+
+    def handle(self, *args, **options):
+        server = stub_server(options, self.stdout)
+        self.stdout.write(
+            f"Stub stats.nba.com on http://127.0.0.1:{options['port']}/stats, run the app with "
+            f"H2H_NBA_STATS_URL=http://127.0.0.1:{options['port']}/stats. Ctrl+C to stop..."
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
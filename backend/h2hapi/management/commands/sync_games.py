@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from h2hapi.headtohead import build_h2h_matrix
+from h2hapi.models import SyncState
+from h2hapi.seasons import CURRENT_SEASON
+from h2hapi.sync import fetch_league_gamelog, league_gamelog_from_json, sync_league_gamelog
+import time
+
+class Command(BaseCommand):
+    help = 'Syncs new games for a season from the league-wide game log'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--season', default=CURRENT_SEASON, help="Season in 'YYYY-YY' format")
+        parser.add_argument('--full', action='store_true', help="Ignore the high-water mark and re-read the whole season")
+        parser.add_argument('--fixture', help="Read a recorded LeagueGameLog response instead of calling stats.nba.com")
+        parser.add_argument('--record', help="Save the LeagueGameLog response to this file for offline runs")
+        parser.add_argument('--build-matrix', action='store_true', help="Rebuild the H2H matrix afterwards")
+    
+    def handle(self, *args, **options):
+        season = options['season']
+        started = time.perf_counter()
+        
+        if options['full']:
+            SyncState.objects.filter(season=season).update(last_game_date=None)
+        state = SyncState.objects.filter(season=season).first()
+        date_from = state.last_game_date if state else None
+        
+        try:
+            if options['fixture']:
+                self.stdout.write(f"Reading recorded game log from {options['fixture']}...")
+                with open(options['fixture'], encoding='utf-8') as fixture:
+                    league_gamelog = league_gamelog_from_json(fixture.read())
+            else:
+                self.stdout.write(f"Fetching {season} game log from {date_from or 'the start of the season'}...")
+                league_gamelog, raw_response = fetch_league_gamelog(season, date_from)
+                if options['record']:
+                    with open(options['record'], 'w', encoding='utf-8') as record:
+                        record.write(raw_response)
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"An error occurred: {e}"))
+            self.stderr.write(
+                "This might be a temporary connection issue to stats.nba.com."
+            )
+            return
+        
+        games_added, players_touched, high_water_mark = sync_league_gamelog(season, league_gamelog)
+        
+        self.stdout.write(self.style.SUCCESS(f"Successfully synced {season}."))
+        self.stdout.write(f"Games Added: {games_added}")
+        self.stdout.write(f"Players Updated: {players_touched}")
+        self.stdout.write(f"Synced Through: {high_water_mark}")
+        
+        if options['build_matrix'] and games_added:
+            pair_count = build_h2h_matrix(season)
+            self.stdout.write(f"H2H Pairs Rebuilt: {pair_count}")
+        
+        self.stdout.write(f"Time: {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from h2hapi.seasonstats import fetch_league_season_stats, store_season_stats
+from h2hapi.seasons import CURRENT_SEASON
+from h2hapi.teams import apply_season_teams
+import time
+
+class Command(BaseCommand):
+    help = 'Loads every player\'s season stats from the league dashboard in one request'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--season', nargs='+', default=[CURRENT_SEASON], help="Seasons in 'YYYY-YY' format")
+    
+    def handle(self, *args, **options):
+        for season in options['season']:
+            self.stdout.write(f"Fetching league season stats for {season}...")
+            started = time.perf_counter()
+            
+            try:
+                league_stats = fetch_league_season_stats(season)
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f"An error occurred: {e}"))
+                self.stderr.write(
+                    "This might be a temporary connection issue to stats.nba.com."
+                )
+                continue
+            
+            player_count = store_season_stats(season, league_stats)
+            self.stdout.write(self.style.SUCCESS(f"Stored season stats for {season}."))
+            self.stdout.write(f"Players: {player_count}")
+            if season == CURRENT_SEASON:
+                # The snapshot has everyone's current team, so sync them all in one go
+                self.stdout.write(f"Teams Updated: {apply_season_teams(season)}")
+            self.stdout.write(f"Time: {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,92 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from h2hapi.cache import MISSING, upstream_cache
+from h2hapi.concurrency import submit
+from h2hapi.ratelimit import nba_rate_limiter
+from h2hapi.requestlog import read_request_counts, trim_request_log
+from h2hapi.views import ComparePlayersView
+import time
+
+class Command(BaseCommand):
+    help = 'Pre-fetches the most requested compares from the sampled request log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=200, help="Number of most requested pairs to warm")
+        parser.add_argument('--days', type=float, default=7, help="Only count requests from the last N days")
+        parser.add_argument('--season', help="Only warm pairs from this season")
+        parser.add_argument('--workers', type=int, default=4, help="Compares to build at once")
+        parser.add_argument('--trim', action='store_true', help="Drop log lines older than --days afterwards")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        max_age = options['days'] * 86400
+        counts = read_request_counts(max_age=max_age, season=options['season'])
+        total_requests = sum(counts.values())
+
+        if not counts:
+            self.stdout.write("No compare requests logged yet, nothing to warm.")
+            return
+
+        top = counts.most_common(options['top'])
+        warmed_requests = sum(count for _, count in top)
+        view = ComparePlayersView()
+
+        # Hits the cache could already serve before warming
+        already_cached = sum(
+            count for (season, low_id, high_id), count in top
+            if upstream_cache.get(view.comparison_key(low_id, high_id, season)) is not MISSING
+        )
+
+        # Every player's gamelog first, each fetched once no matter how many pairs
+        # it's in. The fetches still go through the rate limiter, so this can't
+        # crowd out live traffic's upstream budget
+        gamelog_keys = sorted({(player_id, season) for (season, low_id, high_id), _ in top for player_id in (low_id, high_id)})
+        self.stdout.write(f"Warming {len(gamelog_keys)} gamelogs for the top {len(top)} of {len(counts)} pairs...")
+        futures = [submit(view.get_player_gamelog, player_id, season) for player_id, season in gamelog_keys]
+        failed = 0
+        for done, future in enumerate(as_completed(futures), start=1):
+            if future.result().empty:
+                failed += 1
+            self.report_progress("Gamelogs", done, len(futures))
+
+        # Then the compares themselves (season stats and the assembled payload).
+        # These wait on their own fetches, so they can't run on the fetch pool
+        self.stdout.write(f"Warming {len(top)} compares...")
+        incomplete = 0
+        with ThreadPoolExecutor(max_workers=options['workers'], thread_name_prefix='h2h-warm') as executor:
+            futures = [executor.submit(view.get_comparison, low_id, high_id, season) for (season, low_id, high_id), _ in top]
+            for done, future in enumerate(as_completed(futures), start=1):
+                try:
+                    if not future.result()["complete"]:
+                        incomplete += 1
+                except Exception as e:
+                    self.stderr.write(f"Error warming compare: {e}")
+                    incomplete += 1
+                self.report_progress("Compares", done, len(futures))
+
+        if options['trim']:
+            kept = trim_request_log(max_age)
+            self.stdout.write(f"Request Log Lines Kept: {kept}")
+
+        limiter = nba_rate_limiter.stats()
+        self.stdout.write(self.style.SUCCESS("Successfully warmed the cache."))
+        self.stdout.write(f"Logged Requests: {total_requests} ({len(counts)} pairs)")
+        self.stdout.write(f"Gamelogs Empty or Failed: {failed}")
+        self.stdout.write(f"Compares Not Cached (upstream errors): {incomplete}")
+        self.stdout.write(f"Upstream Calls: {limiter['acquired']} (rate limited for {limiter['wait_seconds']:.1f}s)")
+        self.stdout.write(f"Hit Rate Before: {already_cached / total_requests:.1%}")
+        # Pairs outside the top N, or left uncached by errors, are still cold
+        projected = (warmed_requests - self.incomplete_requests(top, view)) / total_requests
+        self.stdout.write(f"Projected Hit Rate: {projected:.1%}")
+        self.stdout.write(f"Time: {time.perf_counter() - started:.1f}s")
+
+    def incomplete_requests(self, top, view):
+        return sum(
+            count for (season, low_id, high_id), count in top
+            if upstream_cache.get(view.comparison_key(low_id, high_id, season)) is MISSING
+        )
+
+    def report_progress(self, label, done, total):
+        # Roughly every 10%, and always at the end
+        if done == total or done % max(1, total // 10) == 0:
+            self.stdout.write(f"  {label}: {done}/{total}")
@@ -0,0 +1,191 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+import json
+import logging
+import threading
+import time
+
+from .cache import upstream_cache
+from .circuit import nba_circuit
+from .ratelimit import nba_rate_limiter
+
+logger = logging.getLogger('h2hapi.timing')
+
+# Upper bounds in seconds, from a local cache hit to a slow upstream call
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    # Cumulative Prometheus-style histogram, one series per label value
+
+    def __init__(self, name, help_text, label, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {} # label value -> [bucket counts..., sum, count]
+
+    def observe(self, label_value, seconds):
+        position = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.setdefault(label_value, [0] * (len(self.buckets) + 2))
+            if position < len(self.buckets):
+                series[position] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {value: list(counts) for value, counts in self._series.items()}
+        for value, counts in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{self.label}="{value}",le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{self.label}="{value}",le="+Inf"}} {counts[-1]}')
+            lines.append(f'{self.name}_sum{{{self.label}="{value}"}} {counts[-2]:.6f}')
+            lines.append(f'{self.name}_count{{{self.label}="{value}"}} {counts[-1]}')
+        return lines
+
+
+class Counter:
+
+    def __init__(self, name, help_text, label):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, label_value, amount=1):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for value, total in sorted(values.items()):
+            lines.append(f'{self.name}{{{self.label}="{value}"}} {total}')
+        return lines
+
+
+# Every metric is per worker process, Prometheus sums them across workers
+stage_seconds = Histogram('h2h_stage_seconds', "Time spent in each stage of a compare request.", 'stage')
+request_seconds = Histogram('h2h_request_seconds', "Total time to answer a request.", 'view')
+upstream_seconds = Histogram('h2h_upstream_seconds', "Duration of stats.nba.com calls.", 'endpoint')
+upstream_calls = Counter('h2h_upstream_calls_total', "Calls made to stats.nba.com.", 'endpoint')
+upstream_errors = Counter('h2h_upstream_errors_total', "stats.nba.com calls that raised.", 'endpoint')
+upstream_retries = Counter('h2h_upstream_retries_total', "stats.nba.com requests retried, by status or error.", 'reason')
+
+
+# The Timings of the request being served. Fetch pool tasks run in a copy of
+# their submitter's context (see concurrency.submit), so their spans count
+# toward the request waiting on them
+current_timings = ContextVar('h2h_timings', default=None)
+
+
+class Timings:
+    # Stage spans for one request, emitted as Server-Timing and a structured log line
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+
+    def activate(self):
+        # Makes span() record here, returns the token for deactivate
+        return current_timings.set(self)
+
+    def deactivate(self, token):
+        current_timings.reset(token)
+
+    @contextmanager
+    def span(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.spans.append((stage, elapsed))
+            stage_seconds.observe(stage, elapsed)
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        # Stages that ran more than once (e.g. per season) are reported once, summed
+        totals = {}
+        for stage, elapsed in self.spans:
+            totals[stage] = totals.get(stage, 0.0) + elapsed
+        entries = [f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in totals.items()]
+        entries.append(f"total;dur={self.total() * 1000:.1f}")
+        return ", ".join(entries)
+
+    def log(self, view, path, status):
+        total = self.total()
+        request_seconds.observe(view, total)
+        logger.info(json.dumps({
+            "event": "request_timing",
+            "view": view,
+            "path": path,
+            "status": status,
+            "total_ms": round(total * 1000, 1),
+            "spans": [{"stage": stage, "ms": round(elapsed * 1000, 1)} for stage, elapsed in self.spans],
+        }))
+
+
+@contextmanager
+def span(stage):
+    # Times a stage of the current request. Outside one (background refreshes,
+    # jobs, management commands) only the stage histogram sees it
+    timings = current_timings.get()
+    if timings is not None:
+        with timings.span(stage):
+            yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(stage, time.perf_counter() - started)
+
+
+@contextmanager
+def upstream_call(endpoint):
+    # Wraps one stats.nba.com request (after the rate limiter let it through)
+    upstream_calls.inc(endpoint)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        upstream_errors.inc(endpoint)
+        raise
+    finally:
+        upstream_seconds.observe(endpoint, time.perf_counter() - started)
+
+
+def _gauges(prefix, help_text, values, metric_type='gauge'):
+    lines = []
+    for key, value in values.items():
+        name = f"{prefix}_{key}"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}", f"{name} {value}"]
+    return lines
+
+
+def render_metrics():
+    # Prometheus text exposition format (version 0.0.4)
+    lines = []
+    for metric in (stage_seconds, request_seconds, upstream_seconds, upstream_calls, upstream_errors, upstream_retries):
+        lines += metric.render()
+    lines += _gauges('h2h_cache', "Tiered upstream cache statistics.", upstream_cache.stats())
+    limiter = nba_rate_limiter.stats()
+    lines += _gauges('h2h_rate_limiter', "Upstream rate limiter totals.", {
+        "acquired_total": limiter["acquired"],
+        "waits_total": limiter["waits"],
+        "wait_seconds_total": limiter["wait_seconds"],
+    }, metric_type='counter')
+    lines += _gauges('h2h_circuit', "stats.nba.com circuit breaker: open (1) or closed (0), and totals.", nba_circuit.stats())
+    return "\n".join(lines) + "\n"
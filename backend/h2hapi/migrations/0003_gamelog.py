@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('h2hapi', '0002_alter_player_team_abbreviation_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('player_id', models.IntegerField()),
+                ('season', models.CharField(max_length=7)),
+                ('game_id', models.CharField(max_length=10)),
+                ('game_date', models.DateField()),
+                ('matchup', models.CharField(blank=True, default='', max_length=20)),
+                ('wl', models.CharField(blank=True, default='', max_length=1)),
+                ('minutes', models.IntegerField(default=0)),
+                ('fgm', models.IntegerField(default=0)),
+                ('fga', models.IntegerField(default=0)),
+                ('fg_pct', models.FloatField(blank=True, null=True)),
+                ('fg3m', models.IntegerField(default=0)),
+                ('fg3a', models.IntegerField(default=0)),
+                ('fg3_pct', models.FloatField(blank=True, null=True)),
+                ('ftm', models.IntegerField(default=0)),
+                ('fta', models.IntegerField(default=0)),
+                ('ft_pct', models.FloatField(blank=True, null=True)),
+                ('oreb', models.IntegerField(default=0)),
+                ('dreb', models.IntegerField(default=0)),
+                ('reb', models.IntegerField(default=0)),
+                ('ast', models.IntegerField(default=0)),
+                ('stl', models.IntegerField(default=0)),
+                ('blk', models.IntegerField(default=0)),
+                ('tov', models.IntegerField(default=0)),
+                ('pf', models.IntegerField(default=0)),
+                ('pts', models.IntegerField(default=0)),
+                ('plus_minus', models.IntegerField(default=0)),
+                ('video_available', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('player_id', 'season', 'game_id'), name='gamelog_player_season_game')],
+            },
+        ),
+        migrations.CreateModel(
+            name='GameLogIngest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('player_id', models.IntegerField()),
+                ('season', models.CharField(max_length=7)),
+                ('game_count', models.IntegerField(default=0)),
+                ('fetched_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('player_id', 'season'), name='gamelogingest_player_season')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('h2hapi', '0003_gamelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeadToHead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.CharField(max_length=7)),
+                ('player_a_id', models.IntegerField()),
+                ('player_b_id', models.IntegerField()),
+                ('game_count', models.IntegerField(default=0)),
+                ('stats', models.JSONField()),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('season', 'player_a_id', 'player_b_id'), name='headtohead_season_pair')],
+            },
+        ),
+    ]
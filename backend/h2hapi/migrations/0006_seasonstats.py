@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('h2hapi', '0005_syncstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeasonStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.CharField(max_length=7)),
+                ('player_id', models.IntegerField()),
+                ('team_id', models.IntegerField(blank=True, null=True)),
+                ('team_abbreviation', models.CharField(blank=True, default='', max_length=10)),
+                ('games_played', models.IntegerField(default=0)),
+                ('totals', models.JSONField()),
+                ('fetched_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('season', 'player_id'), name='seasonstats_season_player')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:33
+
+import rest_framework.utils.encoders
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('h2hapi', '0006_seasonstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompareJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('player_a_id', models.IntegerField()),
+                ('player_b_id', models.IntegerField()),
+                ('season', models.CharField(max_length=7)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('result', models.JSONField(blank=True, encoder=rest_framework.utils.encoders.JSONEncoder, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='comparejob_status_created')],
+            },
+        ),
+    ]
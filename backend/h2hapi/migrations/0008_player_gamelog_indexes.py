@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('h2hapi', '0007_comparejob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gamelog',
+            index=models.Index(fields=['season', 'game_date'], name='gamelog_season_date'),
+        ),
+        migrations.AddIndex(
+            model_name='player',
+            index=models.Index(fields=['last_name', 'first_name'], name='player_name'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('h2hapi', '0008_player_gamelog_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeadToHeadBuild',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.CharField(max_length=7, unique=True)),
+                ('player_ids', models.JSONField(default=list)),
+                ('pair_count', models.IntegerField(default=0)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
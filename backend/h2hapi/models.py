@@ -1,4 +1,6 @@
 from django.db import models
+from rest_framework.utils.encoders import JSONEncoder
+import uuid
 
 # Create your models here.
 
@@ -14,7 +16,180 @@ class Player(models.Model):
     team_name = models.CharField(max_length=100, default='', blank=True)
     team_abbreviation = models.CharField(max_length=10, default='', blank=True)
     
+    class Meta:
+        indexes = [
+            # The roster list and the search index both read players in name order
+            models.Index(fields=['last_name', 'first_name'], name='player_name'),
+        ]
+    
     def __str__(self):
         if self.team_abbreviation:
             return f"{self.first_name} {self.last_name} ({self.team_abbreviation})"
-        return f"{self.first_name} {self.last_name}"
\ No newline at end of file
+        return f"{self.first_name} {self.last_name}"
+
+class GameLog(models.Model):
+    # One row per player per game, mirrors the PlayerGameLog result set
+    player_id = models.IntegerField()
+    season = models.CharField(max_length=7) # 'YYYY-YY'
+    game_id = models.CharField(max_length=10)
+    game_date = models.DateField()
+    matchup = models.CharField(max_length=20, default='', blank=True)
+    wl = models.CharField(max_length=1, default='', blank=True)
+    
+    # Box score
+    minutes = models.IntegerField(default=0)
+    fgm = models.IntegerField(default=0)
+    fga = models.IntegerField(default=0)
+    fg_pct = models.FloatField(null=True, blank=True)
+    fg3m = models.IntegerField(default=0)
+    fg3a = models.IntegerField(default=0)
+    fg3_pct = models.FloatField(null=True, blank=True)
+    ftm = models.IntegerField(default=0)
+    fta = models.IntegerField(default=0)
+    ft_pct = models.FloatField(null=True, blank=True)
+    oreb = models.IntegerField(default=0)
+    dreb = models.IntegerField(default=0)
+    reb = models.IntegerField(default=0)
+    ast = models.IntegerField(default=0)
+    stl = models.IntegerField(default=0)
+    blk = models.IntegerField(default=0)
+    tov = models.IntegerField(default=0)
+    pf = models.IntegerField(default=0)
+    pts = models.IntegerField(default=0)
+    plus_minus = models.IntegerField(default=0)
+    video_available = models.IntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['player_id', 'season', 'game_id'],
+                name='gamelog_player_season_game',
+            ),
+        ]
+        indexes = [
+            # Season-wide reads: the H2H matrix build and the sync's date window
+            models.Index(fields=['season', 'game_date'], name='gamelog_season_date'),
+        ]
+    
+    def __str__(self):
+        return f"{self.player_id} {self.game_id} ({self.matchup})"
+
+
+class GameLogIngest(models.Model):
+    # Records that a player's full gamelog for a season has been stored locally,
+    # so players with zero games in a season don't send us upstream every time
+    player_id = models.IntegerField()
+    season = models.CharField(max_length=7)
+    game_count = models.IntegerField(default=0)
+    fetched_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['player_id', 'season'],
+                name='gamelogingest_player_season',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.player_id} {self.season} ({self.game_count} games)"
+
+
+class HeadToHead(models.Model):
+    # Precomputed H2H aggregates for every pair of players who shared a game in a season.
+    # Each unordered pair is stored once with the lower API ID as player A
+    season = models.CharField(max_length=7)
+    player_a_id = models.IntegerField()
+    player_b_id = models.IntegerField()
+    game_count = models.IntegerField(default=0)
+    stats = models.JSONField() # {"player_a": {...}, "player_b": {...}} like compute_h2h_stats
+    built_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['season', 'player_a_id', 'player_b_id'],
+                name='headtohead_season_pair',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.player_a_id} vs {self.player_b_id} ({self.season})"
+
+
+class HeadToHeadBuild(models.Model):
+    # Records that a season's HeadToHead matrix was built, and from which players'
+    # gamelogs, so a pair of them without a row is known to have never met
+    season = models.CharField(max_length=7, unique=True)
+    player_ids = models.JSONField(default=list)
+    pair_count = models.IntegerField(default=0)
+    built_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.season} H2H matrix ({self.pair_count} pairs)"
+
+
+class SyncState(models.Model):
+    # High-water mark for the league-wide gamelog sync of a season
+    season = models.CharField(max_length=7, unique=True)
+    last_game_date = models.DateField(null=True, blank=True)
+    synced_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.season} synced through {self.last_game_date}"
+
+
+class SeasonStats(models.Model):
+    # One player's season totals from the league dashboard snapshot
+    season = models.CharField(max_length=7)
+    player_id = models.IntegerField()
+    team_id = models.IntegerField(null=True, blank=True)
+    team_abbreviation = models.CharField(max_length=10, default='', blank=True)
+    games_played = models.IntegerField(default=0)
+    totals = models.JSONField() # Keyed like a PlayerCareerStats season row
+    fetched_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['season', 'player_id'],
+                name='seasonstats_season_player',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.player_id} {self.season} ({self.games_played} GP)"
+
+
+class CompareJob(models.Model):
+    # A queued compare, run off the request path by the job workers (see jobs.py)
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    player_a_id = models.IntegerField()
+    player_b_id = models.IntegerField()
+    season = models.CharField(max_length=7)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    result = models.JSONField(null=True, blank=True, encoder=JSONEncoder) # The compare payload
+    error = models.TextField(default='', blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='comparejob_status_created'),
+        ]
+    
+    def __str__(self):
+        return f"{self.player_a_id} vs {self.player_b_id} ({self.season}) {self.status}"
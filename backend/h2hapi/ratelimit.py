@@ -0,0 +1,91 @@
+from django.conf import settings
+import sqlite3
+import threading
+import time
+
+
+class TokenBucket:
+    # Token bucket shared by every worker process through a small SQLite file.
+    # Each acquire reserves a token in one IMMEDIATE transaction (tokens may go
+    # negative), then sleeps only for the deficit, so callers wait in turn and
+    # nobody waits while the shared budget still has tokens left
+
+    def __init__(self, path, rate, capacity, name='nba_api'):
+        self.path = str(path)
+        self.rate = float(rate) # tokens per second
+        self.capacity = float(capacity) # largest burst allowed
+        self.name = name
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.acquired = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def reserve(self, tokens=1):
+        # Takes tokens from the shared bucket and returns how long to wait for them
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated FROM buckets WHERE name = ?", (self.name,)
+            ).fetchone()
+            if row is None:
+                available = self.capacity
+            else:
+                available, updated = row
+                available = min(self.capacity, available + max(0.0, now - updated) * self.rate)
+
+            available -= tokens
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                (self.name, available, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if available >= 0:
+            return 0.0
+        return -available / self.rate
+
+    def acquire(self, tokens=1):
+        # Blocks until the tokens are ours, returns the seconds spent waiting
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+        with self._stats_lock:
+            self.acquired += tokens
+            if wait > 0:
+                self.waits += 1
+                self.wait_seconds += wait
+        return wait
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "acquired": self.acquired,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
+
+
+# Every stats.nba.com call goes through this bucket
+nba_rate_limiter = TokenBucket(
+    path=getattr(settings, 'H2H_RATE_LIMIT_DB', settings.BASE_DIR / 'ratelimit.sqlite3'),
+    rate=getattr(settings, 'H2H_RATE_LIMIT_PER_SECOND', 0.9),
+    capacity=getattr(settings, 'H2H_RATE_LIMIT_BURST', 4),
+)
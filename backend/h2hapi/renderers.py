@@ -0,0 +1,68 @@
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+import json
+import math
+import numpy as np
+
+try:
+    import orjson
+except ImportError: # Optional, the stdlib encoder is used without it
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # Anything orjson can't encode natively (Decimal, lazy strings, pandas
+    # objects...) goes through DRF's encoder, like it would without orjson
+    return _encoder.default(obj)
+
+
+def _finite(value):
+    # The stdlib encoder's view of a value as orjson writes it: NumPy values as
+    # plain Python ones and NaN/inf as None
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    if isinstance(value, (np.generic, np.ndarray)):
+        return _finite(value.tolist())
+    return value
+
+
+class _FiniteEncoder(JSONEncoder):
+    # What DRF's encoder falls back to (a Series' values, say) can hold NaN too
+    def default(self, obj):
+        return _finite(super().default(obj))
+
+
+def dumps(data, sort_keys=False):
+    # Compact JSON bytes. NumPy scalars and arrays are encoded natively, and
+    # NaN/inf become null instead of failing like DRF's strict encoder does
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(data, default=_default, option=option)
+    return json.dumps(
+        _finite(data), cls=_FiniteEncoder, sort_keys=sort_keys, separators=(',', ':'), allow_nan=False,
+    ).encode('utf-8')
+
+
+class FastJSONRenderer(JSONRenderer):
+    # JSONRenderer on orjson for the h2hapi views. Indented output (the
+    # browsable API, ?indent in Accept) still goes through DRF's own path,
+    # with the same NaN handling
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(_finite(data), accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+# renderer_classes of the h2hapi views. The project default stays DRF's own
+RENDERER_CLASSES = [FastJSONRenderer, BrowsableAPIRenderer]
@@ -0,0 +1,62 @@
+from collections import Counter
+from django.conf import settings
+import os
+import random
+import time
+
+
+def log_path():
+    return getattr(settings, 'H2H_REQUEST_LOG', settings.BASE_DIR / 'request_keys.log')
+
+
+def record_request(player_a_id, player_b_id, season):
+    # Appends a sampled 'timestamp season low_id high_id' line for warm_cache.
+    # Lines are far shorter than PIPE_BUF, so O_APPEND writes from several
+    # workers never interleave
+    if random.random() >= getattr(settings, 'H2H_REQUEST_LOG_SAMPLE', 0.1):
+        return
+    low_id, high_id = sorted((player_a_id, player_b_id))
+    line = f"{int(time.time())} {season} {low_id} {high_id}\n".encode()
+    try:
+        descriptor = os.open(log_path(), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(descriptor, line)
+        finally:
+            os.close(descriptor)
+    except OSError as e:
+        print(f"Error recording compare request: {e}")
+
+
+def read_request_counts(max_age=None, season=None):
+    # Counter of (season, low_id, high_id) -> sampled requests, newest max_age seconds only
+    counts = Counter()
+    path = log_path()
+    if not os.path.exists(path):
+        return counts
+    oldest = time.time() - max_age if max_age else 0
+    with open(path, encoding='utf-8') as log:
+        for line in log:
+            parts = line.split()
+            if len(parts) != 4:
+                continue # A line cut short by a crash
+            timestamp, line_season, low_id, high_id = parts
+            if int(timestamp) < oldest or (season and line_season != season):
+                continue
+            counts[(line_season, int(low_id), int(high_id))] += 1
+    return counts
+
+
+def trim_request_log(max_age):
+    # Drops lines older than max_age seconds, returns how many were kept.
+    # Lines appended while this runs can be lost, which a sample can afford
+    path = log_path()
+    if not os.path.exists(path):
+        return 0
+    oldest = time.time() - max_age
+    with open(path, encoding='utf-8') as log:
+        kept = [line for line in log if len(line.split()) == 4 and int(line.split()[0]) >= oldest]
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as log:
+        log.writelines(kept)
+    os.replace(temp_path, path)
+    return len(kept)
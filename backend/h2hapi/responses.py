@@ -0,0 +1,107 @@
+from django.conf import settings
+from django.utils.http import parse_etags, parse_http_date_safe
+import hashlib
+
+from .renderers import dumps
+from .seasons import is_finished_season
+
+# Sub-blocks of every stats block ({"game_count", "avg_stats", ...}) that ?fields= can pick
+STAT_BLOCKS = {'avg_stats', 'advanced_stats', 'total_stats'}
+
+# Top-level compare blocks that ?fields= can pick, the IDs and season are always sent
+PAYLOAD_BLOCKS = {
+    'player_a_details', 'player_b_details', 'season_stats', 'h2h_stats', 'by_season', 'h2h_timeline',
+    'player', # Batch compare player items
+}
+ALWAYS_SENT = {'player_a_id', 'player_b_id', 'player_id', 'season', 'seasons', 'error'}
+
+SELECTABLE_FIELDS = STAT_BLOCKS | PAYLOAD_BLOCKS
+
+
+def payload_etag(payload):
+    # Strong validator over the canonical JSON form of a payload
+    return hashlib.sha256(dumps(payload, sort_keys=True)).hexdigest()[:32]
+
+
+def etag_matches(request, etag):
+    # True when the client's If-None-Match already has this ETag
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag in etags
+
+
+def not_modified_since(request, modified_at):
+    # True when the client's If-Modified-Since is at or after modified_at (a timestamp)
+    if request.headers.get('If-None-Match'):
+        return False # ETags take precedence when both are sent
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return since is not None and modified_at <= since
+
+
+def season_cache_control(season):
+    # Finished seasons can be cached by browsers and CDNs for a long time
+    if is_finished_season(season):
+        return "public, max-age=86400"
+    return f"public, max-age={getattr(settings, 'H2H_CURRENT_SEASON_TTL', 300)}"
+
+
+def swap_sides(block):
+    # Swaps the player_a/player_b entries of one block of the payload
+    if not isinstance(block, dict):
+        return block
+    swapped = dict(block)
+    swapped['player_a'], swapped['player_b'] = block.get('player_b'), block.get('player_a')
+    return swapped
+
+
+def mirror_comparison(payload):
+    # Turns an A-vs-B compare payload into B-vs-A without recomputing anything
+    mirrored = dict(payload)
+    mirrored['player_a_id'] = payload['player_b_id']
+    mirrored['player_b_id'] = payload['player_a_id']
+    mirrored['player_a_details'] = payload['player_b_details']
+    mirrored['player_b_details'] = payload['player_a_details']
+    mirrored['season_stats'] = swap_sides(payload['season_stats'])
+    mirrored['h2h_stats'] = swap_sides(payload['h2h_stats'])
+    return mirrored
+
+
+def _prune_stats(value, stat_blocks):
+    # Drops the unwanted sub-blocks from every stats block, however deep
+    if isinstance(value, list):
+        return [_prune_stats(item, stat_blocks) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if 'game_count' in value:
+        # Stats blocks only hold flat sub-blocks, so there's nothing below to visit
+        return {key: item for key, item in value.items() if key not in STAT_BLOCKS or key in stat_blocks}
+    return {key: _prune_stats(item, stat_blocks) for key, item in value.items()}
+
+
+def select_fields(payload, fields=None, compact=False):
+    # Applies ?fields= and ?compact=1 to a compare payload (or batch item).
+    # Without either, the payload is returned as is
+    if not fields and not compact:
+        return payload
+    fields = fields or set()
+
+    blocks = fields & PAYLOAD_BLOCKS
+    if blocks:
+        payload = {key: value for key, value in payload.items() if key in blocks or key in ALWAYS_SENT}
+
+    stat_blocks = (fields & STAT_BLOCKS) or set(STAT_BLOCKS)
+    if compact:
+        stat_blocks = stat_blocks - {'total_stats'}
+    if stat_blocks != STAT_BLOCKS:
+        payload = _prune_stats(payload, stat_blocks)
+    return payload
+
+
+def selection_suffix(fields=None, compact=False):
+    # ETag suffix so each field selection of a payload gets its own validator
+    if not fields and not compact:
+        return ''
+    key = ','.join(sorted(fields or [])) + (':compact' if compact else '')
+    return '-' + hashlib.sha256(key.encode('utf-8')).hexdigest()[:8]
@@ -0,0 +1,106 @@
+from bisect import bisect_left
+import threading
+import time
+import unicodedata
+
+from .models import Player
+from .signals import get_roster_version
+
+# How often a worker checks whether the roster changed, in seconds
+VERSION_CHECK_INTERVAL = 1.0
+
+
+def normalize(text):
+    # Lowercase, accent-insensitive form used for matching ('Jokić' -> 'jokic')
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    cleaned = ''.join(char if char.isalnum() else ' ' for char in stripped.casefold())
+    return ' '.join(cleaned.split())
+
+
+class PlayerIndex:
+    # Sorted arrays of normalized name keys for prefix lookups with bisect.
+    # Every player is indexed under each word of their name and their full name,
+    # so 'jok', 'nik' and 'nikola jo' all find Nikola Jokic
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []
+        self._positions = []
+        self._players = []
+        self._words = []
+        self._version = None
+        self._checked_at = 0.0
+
+    def build(self, players):
+        entries = []
+        word_sets = []
+        for position, player in enumerate(players):
+            full_name = normalize(f"{player['first_name']} {player['last_name']}")
+            words = set(full_name.split())
+            word_sets.append(words)
+            for key in words | {full_name}:
+                entries.append((key, position))
+        entries.sort()
+
+        # Swap everything in at once so concurrent searches never see a half-built index
+        self._keys, self._positions, self._players, self._words = (
+            [key for key, _ in entries],
+            [position for _, position in entries],
+            list(players),
+            word_sets,
+        )
+
+    def refresh(self):
+        # Rebuilds from the Player table when another process changed the roster
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < VERSION_CHECK_INTERVAL:
+            return
+        version = get_roster_version()
+        with self._lock:
+            self._checked_at = now
+            if version == self._version:
+                return
+            players = list(
+                Player.objects.order_by('last_name', 'first_name')
+                .values('api_id', 'first_name', 'last_name')
+            )
+            self.build(players)
+            self._version = version
+
+    def search(self, query, limit=10):
+        terms = normalize(query).split()
+        if not terms:
+            return []
+
+        keys, positions, players, words = self._keys, self._positions, self._players, self._words
+
+        # The whole query as a prefix of a name or full name...
+        phrase = ' '.join(terms)
+        matches = set()
+        start = bisect_left(keys, phrase)
+        for index in range(start, len(keys)):
+            if not keys[index].startswith(phrase):
+                break
+            matches.add(positions[index])
+
+        # ...or every term as a prefix of some word in the name ('jok nik')
+        if len(terms) > 1:
+            start = bisect_left(keys, terms[0])
+            for index in range(start, len(keys)):
+                if not keys[index].startswith(terms[0]):
+                    break
+                position = positions[index]
+                if all(any(word.startswith(term) for word in words[position]) for term in terms[1:]):
+                    matches.add(position)
+
+        # Players are stored in roster order, so the lowest positions are the top results
+        return [players[position] for position in sorted(matches)[:limit]]
+
+
+player_index = PlayerIndex()
+
+
+def search_players(query, limit=10):
+    player_index.refresh()
+    return player_index.search(query, limit)
@@ -0,0 +1,21 @@
+# Season helpers shared by the views, the local stores and the management commands
+
+CURRENT_SEASON = "2025-26"
+
+
+def is_finished_season(season):
+    # Seasons are 'YYYY-YY' strings, so they sort chronologically as plain text
+    return season < CURRENT_SEASON
+
+
+def format_season(raw_season):
+    # Format the season from 2024-2025 to 2024-25
+    if len(raw_season) == 9 and raw_season[4] == '-':
+        return raw_season[:5] + raw_season[-2:]
+    return raw_season
+
+
+def season_range(first_season, last_season):
+    # Every season from first to last inclusive, e.g. 2023-24..2025-26
+    first_year, last_year = int(first_season[:4]), int(last_season[:4])
+    return [f"{year}-{str(year + 1)[-2:]}" for year in range(first_year, last_year + 1)]
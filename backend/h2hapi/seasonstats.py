@@ -0,0 +1,84 @@
+from django.db import transaction
+from django.utils import timezone
+from nba_api.stats.endpoints import leaguedashplayerstats
+import pandas as pd
+
+from .gamelogs import CURRENT_SEASON_MAX_AGE
+from .models import SeasonStats
+from .seasons import is_finished_season
+from .upstream import upstream_request
+
+# LeagueDashPlayerStats column -> PlayerCareerStats season row column
+SNAPSHOT_COLUMNS = {
+    'PLAYER_ID': 'PLAYER_ID',
+    'TEAM_ID': 'TEAM_ID',
+    'TEAM_ABBREVIATION': 'TEAM_ABBREVIATION',
+    'AGE': 'PLAYER_AGE',
+    'GP': 'GP',
+    'MIN': 'MIN',
+    'FGM': 'FGM',
+    'FGA': 'FGA',
+    'FG_PCT': 'FG_PCT',
+    'FG3M': 'FG3M',
+    'FG3A': 'FG3A',
+    'FG3_PCT': 'FG3_PCT',
+    'FTM': 'FTM',
+    'FTA': 'FTA',
+    'FT_PCT': 'FT_PCT',
+    'OREB': 'OREB',
+    'DREB': 'DREB',
+    'REB': 'REB',
+    'AST': 'AST',
+    'STL': 'STL',
+    'BLK': 'BLK',
+    'TOV': 'TOV',
+    'PF': 'PF',
+    'PTS': 'PTS',
+}
+
+
+def fetch_league_season_stats(season):
+    # Every player's regular season totals in one request
+    with upstream_request('LeagueDashPlayerStats'):
+        endpoint = leaguedashplayerstats.LeagueDashPlayerStats(
+            season=season,
+            season_type_all_star="Regular Season",
+            per_mode_detailed="Totals",
+        )
+        return endpoint.get_data_frames()[0]
+
+
+def store_season_stats(season, league_stats):
+    # Replaces the season's snapshot with the league dashboard rows
+    rows = []
+    for record in league_stats.to_dict('records'):
+        totals = {'SEASON_ID': season}
+        for column, career_column in SNAPSHOT_COLUMNS.items():
+            value = record.get(column)
+            totals[career_column] = None if pd.isna(value) else value
+        rows.append(SeasonStats(
+            season=season,
+            player_id=int(record['PLAYER_ID']),
+            team_id=int(record['TEAM_ID']) if record.get('TEAM_ID') else None,
+            team_abbreviation=record.get('TEAM_ABBREVIATION') or '',
+            games_played=int(record.get('GP') or 0),
+            totals=totals,
+        ))
+
+    with transaction.atomic():
+        SeasonStats.objects.filter(season=season).delete()
+        SeasonStats.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def load_season_stats(player_id, season):
+    # Returns the player's season totals as a Series, or None to use the career call
+    snapshot = SeasonStats.objects.filter(season=season, player_id=player_id).first()
+    if snapshot is None:
+        return None
+
+    # The current season's snapshot goes stale as new games are played
+    if not is_finished_season(season) and timezone.now() - snapshot.fetched_at > CURRENT_SEASON_MAX_AGE:
+        return None
+
+    return pd.Series(snapshot.totals)
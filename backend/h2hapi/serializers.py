@@ -1,13 +1,95 @@
 from rest_framework import serializers
 from .models import Player
+from .responses import SELECTABLE_FIELDS
+from .seasons import season_range
 from django.core.validators import RegexValidator
 
+# Largest number of players a single batch compare may fetch
+MAX_BATCH_PLAYERS = 30
+
+# Largest number of seasons a multi-season compare may fetch
+MAX_SEASONS = 25
+
+# Largest rolling window (in meetings) a timeline may ask for
+MAX_WINDOW = 82
+
+# Stops XSS/Script Injection
+season_validator = RegexValidator(
+    regex=r'^\d{4}-\d{2}(\d{2})?$',
+    message="Season must be in 'YYYY-YY' or 'YYYY-YYYY' format"
+)
+
+season_range_validator = RegexValidator(
+    regex=r'^\d{4}-\d{2}\.\.\d{4}-\d{2}$',
+    message="Seasons must be a range like '2018-19..2025-26'"
+)
+
+id_list_validator = RegexValidator(
+    regex=r'^\d+(,\d+)*$',
+    message="Must be a comma-separated list of player IDs"
+)
+
+field_list_validator = RegexValidator(
+    regex=r'^[a-z0-9_]+(,[a-z0-9_]+)*$',
+    message="Must be a comma-separated list of field names"
+)
+
 class PlayerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Player
         fields = ['api_id', 'first_name', 'last_name']
         
-class ComparisonRequestSerializer(serializers.Serializer):
+class PlayerSearchRequestSerializer(serializers.Serializer):
+    # Typeahead query for the player search box
+    
+    q = serializers.CharField(
+        required=True,
+        max_length=50,
+        help_text="Start of a player's first, last or full name"
+    )
+    
+    limit = serializers.IntegerField(
+        required=False,
+        default=10,
+        min_value=1,
+        max_value=25,
+        help_text="Most matches to return"
+    )
+        
+class FieldSelectionSerializer(serializers.Serializer):
+    # ?fields= and ?compact=1, shared by the compare endpoints
+    
+    fields = serializers.CharField(
+        required=False,
+        validators=[field_list_validator],
+        help_text="Comma-separated blocks to return, e.g. 'h2h_stats,avg_stats'"
+    )
+    
+    compact = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text="Leave out every total_stats block"
+    )
+    
+    def validate_fields(self, value):
+        fields = set(value.split(','))
+        unknown = fields - SELECTABLE_FIELDS
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown fields: {', '.join(sorted(unknown))}. Choose from {', '.join(sorted(SELECTABLE_FIELDS))}"
+            )
+        return fields
+
+class JobPollSerializer(FieldSelectionSerializer):
+    # Polling a queued compare. Jobs are stored lower player ID first
+    
+    mirrored = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text="Answer with the job's players swapped, for compares asked higher ID first"
+    )
+
+class ComparisonRequestSerializer(FieldSelectionSerializer):
     # Validated Input and Sanitizes Data
     
     player_a_id = serializers.IntegerField(
@@ -22,20 +104,113 @@ class ComparisonRequestSerializer(serializers.Serializer):
         help_text="NBA API ID for the second player"
     )
     
-    # Stops XSS/Script Injection
     season = serializers.CharField(
         required=False,
         default="2025-26",
-        validators=[
-            RegexValidator(
-                regex=r'^\d{4}-\d{2}(\d{2})?$',
-                message="Season must be in 'YYYY-YY' or 'YYYY-YYYY' format"
-            )
-        ]
+        validators=[season_validator]
+    )
+    
+    seasons = serializers.CharField(
+        required=False,
+        validators=[season_range_validator],
+        help_text="Range of seasons to compare across, e.g. '2018-19..2025-26'"
+    )
+    
+    career = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text="Compare across every season both players have played"
     )
     
+    mode = serializers.ChoiceField(
+        choices=['sync', 'async'],
+        required=False,
+        default='sync',
+        help_text="'async' queues uncached compares and answers 202 with a job ID"
+    )
+    
+    timeline = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text="Add every H2H game, rolling averages and home/away, win/loss and monthly splits"
+    )
+    
+    window = serializers.IntegerField(
+        min_value=1,
+        max_value=MAX_WINDOW,
+        required=False,
+        default=5,
+        help_text="Meetings in each rolling window of the timeline"
+    )
+    
+    def validate_seasons(self, value):
+        first_season, last_season = value.split('..')
+        seasons = season_range(first_season, last_season)
+        if not seasons:
+            raise serializers.ValidationError("The first season must not be after the last one")
+        if len(seasons) > MAX_SEASONS:
+            raise serializers.ValidationError(f"A multi-season compare is limited to {MAX_SEASONS} seasons")
+        return seasons
+    
     def validator(self, data):
         # Cross-Field validation
         if data['player_a_id'] == data['player_b_id']:
             raise serializers.ValidationError("Cannot compare a player to themselves")
-        return data
\ No newline at end of file
+        return data
+
+
+class BatchComparisonRequestSerializer(FieldSelectionSerializer):
+    # One anchor player against many opponents, or every pair in a list of players
+    
+    player_id = serializers.IntegerField(
+        min_value=1,
+        required=False,
+        help_text="NBA API ID for the anchor player"
+    )
+    
+    opponent_ids = serializers.CharField(
+        required=False,
+        validators=[id_list_validator],
+        help_text="Comma-separated NBA API IDs to compare the anchor player against"
+    )
+    
+    player_ids = serializers.CharField(
+        required=False,
+        validators=[id_list_validator],
+        help_text="Comma-separated NBA API IDs to compare every pair of"
+    )
+    
+    season = serializers.CharField(
+        required=False,
+        default="2025-26",
+        validators=[season_validator]
+    )
+    
+    stream = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text="Stream each result as newline-delimited JSON as soon as it's ready"
+    )
+    
+    def validate(self, data):
+        if 'player_id' in data and 'opponent_ids' in data:
+            opponent_ids = list(dict.fromkeys(int(i) for i in data['opponent_ids'].split(',')))
+            opponent_ids = [i for i in opponent_ids if i != data['player_id']]
+            if not opponent_ids:
+                raise serializers.ValidationError("Provide at least one opponent other than the anchor player")
+            data['opponent_ids'] = opponent_ids
+            data['all_ids'] = [data['player_id']] + opponent_ids
+        elif 'player_ids' in data:
+            player_ids = list(dict.fromkeys(int(i) for i in data['player_ids'].split(',')))
+            if len(player_ids) < 2:
+                raise serializers.ValidationError("Provide at least two distinct player IDs")
+            data['player_ids'] = player_ids
+            data['all_ids'] = player_ids
+        else:
+            raise serializers.ValidationError("Provide player_id with opponent_ids, or player_ids")
+        
+        if len(data['all_ids']) > MAX_BATCH_PLAYERS:
+            raise serializers.ValidationError(f"A batch compare is limited to {MAX_BATCH_PLAYERS} players")
+        if min(data['all_ids']) < 1:
+            raise serializers.ValidationError("Player IDs must be positive")
+        return data
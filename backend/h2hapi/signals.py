@@ -0,0 +1,33 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+import time
+
+from .models import Player
+
+# Sent after bulk changes to the Player table, which don't fire post_save
+roster_changed = Signal()
+
+ROSTER_VERSION_KEY = "h2h:roster_version"
+
+
+def get_roster_version():
+    # Shared through the cache so every worker sees changes made by other processes
+    version = cache.get(ROSTER_VERSION_KEY)
+    if version is None:
+        version = bump_roster_version()
+    return version
+
+
+def bump_roster_version():
+    version = str(time.time_ns())
+    cache.set(ROSTER_VERSION_KEY, version, None)
+    return version
+
+
+@receiver(post_save, sender=Player)
+@receiver(post_delete, sender=Player)
+@receiver(roster_changed)
+def on_roster_changed(sender, **kwargs):
+    bump_roster_version()
+
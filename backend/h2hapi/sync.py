@@ -0,0 +1,83 @@
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from nba_api.stats.endpoints import leaguegamelog
+import json
+import pandas as pd
+
+from .gamelogs import parse_game_date, rows_from_gamelog
+from .models import GameLog, GameLogIngest, SyncState
+from .upstream import upstream_request
+
+
+def fetch_league_gamelog(season, date_from=None):
+    # One request for every player's games in a season, optionally from a date on.
+    # Returns the frame and the raw response so it can be recorded as a fixture
+    with upstream_request('LeagueGameLog'):
+        endpoint = leaguegamelog.LeagueGameLog(
+            player_or_team_abbreviation='P',
+            season=season,
+            season_type_all_star="Regular Season",
+            date_from_nullable=date_from.strftime("%m/%d/%Y") if date_from else "",
+        )
+        return endpoint.get_data_frames()[0], endpoint.nba_response.get_response()
+
+
+def league_gamelog_from_json(raw):
+    # Parses a recorded LeagueGameLog response, for offline runs
+    data = json.loads(raw)
+    result = (data.get('resultSets') or [data.get('resultSet')])[0]
+    return pd.DataFrame(result['rowSet'], columns=result['headers'])
+
+
+def sync_league_gamelog(season, league_gamelog):
+    # Stores the games newer than the season's high-water mark.
+    # Returns (games added, players touched, new high-water mark)
+    state, _ = SyncState.objects.get_or_create(season=season)
+
+    frame = league_gamelog.rename(columns={'GAME_ID': 'Game_ID', 'PLAYER_ID': 'Player_ID'})
+    if frame.empty:
+        return 0, 0, state.last_game_date
+
+    frame = frame.assign(GAME_DATE=frame['GAME_DATE'].map(parse_game_date))
+    if state.last_game_date:
+        # The high-water date itself is re-read in case it was only partly synced
+        frame = frame[frame['GAME_DATE'] >= state.last_game_date]
+        if frame.empty:
+            # e.g. an older recorded response replayed, nothing in it is new
+            return 0, 0, state.last_game_date
+
+    # Skip games we already have
+    existing = set(
+        GameLog.objects.filter(season=season, game_date__gte=frame['GAME_DATE'].min())
+        .values_list('player_id', 'game_id')
+    )
+    rows = []
+    for player_id, games in frame.groupby('Player_ID'):
+        for row in rows_from_gamelog(int(player_id), season, games):
+            if (row.player_id, row.game_id) not in existing:
+                rows.append(row)
+
+    touched = {row.player_id for row in rows}
+    high_water_mark = frame['GAME_DATE'].max()
+
+    with transaction.atomic():
+        GameLog.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+
+        # A league-wide sync covers everyone, so every stored season is current again
+        counts = (
+            GameLog.objects.filter(season=season, player_id__in=touched)
+            .values('player_id').annotate(games=Count('id'))
+        )
+        for count in counts:
+            GameLogIngest.objects.update_or_create(
+                player_id=count['player_id'],
+                season=season,
+                defaults={'game_count': count['games']},
+            )
+        GameLogIngest.objects.filter(season=season).update(fetched_at=timezone.now())
+
+        state.last_game_date = high_water_mark
+        state.save()
+
+    return len(rows), len(touched), high_water_mark
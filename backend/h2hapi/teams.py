@@ -0,0 +1,114 @@
+from django.conf import settings
+from django.db import connection, transaction
+import atexit
+import threading
+import time
+
+from .models import Player, SeasonStats
+from .search import VERSION_CHECK_INTERVAL
+from .seasons import CURRENT_SEASON
+from .signals import get_roster_version
+
+
+class TeamUpdater:
+    # Write-behind team affiliations. Compares check against an in-memory
+    # snapshot of the Player table and only queue a write when a team actually
+    # changed; queued writes go out together in one transaction on a timer thread
+
+    def __init__(self, flush_delay=2.0):
+        self.flush_delay = flush_delay
+        self._lock = threading.Lock()
+        self._snapshot = {} # api_id -> (team_api_id, team_abbreviation)
+        self._pending = {}
+        self._version = None
+        self._checked_at = 0.0
+        self._timer = None
+        self.writes = 0
+        self.skipped = 0
+
+    def refresh(self):
+        # Reloads the snapshot after populate_players or another bulk change
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < VERSION_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        version = get_roster_version()
+        if version == self._version:
+            return
+        snapshot = {
+            api_id: (team_api_id, team_abbreviation)
+            for api_id, team_api_id, team_abbreviation
+            in Player.objects.values_list('api_id', 'team_api_id', 'team_abbreviation')
+        }
+        with self._lock:
+            self._snapshot = snapshot
+            self._snapshot.update(self._pending) # Queued writes are newer than the table
+            self._version = version
+
+    def record(self, player_id, team_id, team_abbreviation, flush=True):
+        # Queues a team change for player_id, returns True if anything changed
+        self.refresh()
+        with self._lock:
+            current = self._snapshot.get(player_id)
+            if current is None:
+                return False # Not an active player, there's no row to update
+            # Like the old per-request update, missing values keep what's stored
+            team = (team_id or current[0], team_abbreviation or current[1])
+            if team == current:
+                self.skipped += 1
+                return False
+            self._snapshot[player_id] = team
+            self._pending[player_id] = team
+            if flush and self._timer is None:
+                self._timer = threading.Timer(self.flush_delay, self._flush_later)
+                self._timer.daemon = True
+                self._timer.start()
+        return True
+
+    def flush(self):
+        # Writes every queued change in one transaction, returns how many rows
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._timer = None
+        if not pending:
+            return 0
+        players = [
+            Player(api_id=api_id, team_api_id=team_id, team_abbreviation=team_abbreviation)
+            for api_id, (team_id, team_abbreviation) in pending.items()
+        ]
+        try:
+            with transaction.atomic():
+                Player.objects.bulk_update(players, ['team_api_id', 'team_abbreviation'], batch_size=500)
+        except Exception:
+            with self._lock:
+                # Put them back unless something newer was queued meanwhile
+                for api_id, team in pending.items():
+                    self._pending.setdefault(api_id, team)
+            raise
+        with self._lock:
+            self.writes += len(players)
+        return len(players)
+
+    def _flush_later(self):
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Error flushing team updates: {e}")
+        finally:
+            connection.close() # Timer threads don't outlive their connection
+
+
+team_updater = TeamUpdater(flush_delay=getattr(settings, 'H2H_TEAM_FLUSH_DELAY', 2.0))
+
+# Don't drop changes still waiting on the timer when the worker exits
+atexit.register(team_updater._flush_later)
+
+
+def apply_season_teams(season=CURRENT_SEASON):
+    # Bulk path: every player's team from the league dashboard snapshot, written at once
+    team_updater.refresh()
+    for player_id, team_id, team_abbreviation in SeasonStats.objects.filter(season=season).values_list(
+        'player_id', 'team_id', 'team_abbreviation'
+    ):
+        team_updater.record(player_id, team_id, team_abbreviation, flush=False)
+    return team_updater.flush()
@@ -1,3 +1,1421 @@
-from django.test import TestCase
+from django.core.management import call_command
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.models import QuerySet
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from nba_api.stats.library.http import NBAStatsHTTP
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import date, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+import gzip
+import json
+import numpy as np
+import os
+import pandas as pd
+import tempfile
+import threading
+import time
 
-# Create your tests here.
+from . import columnar, concurrency
+from .cache import MISSING, FetchLocks, upstream_cache
+from .circuit import CircuitBreaker, CircuitOpenError
+from .columnar import compact_season, read_gamelog, write_gamelog
+from .concurrency import fetch_pool
+from .aggregation import GamelogArrays, H2HTimeline, compute_h2h, compute_pairs
+from .database import pragma_statement
+from .gamelogs import (
+    CURRENT_SEASON_MAX_AGE, GAMELOG_FIELDS, fetch_gamelog, gamelog_from_rows, load_gamelog, store_gamelog,
+)
+from .headtohead import build_h2h_matrix, load_h2h, pair_totals, season_frame
+from .management.commands.benchmark_h2h import legacy_h2h, synthetic_gamelog
+from .management.commands.run_stub_upstream import stub_server
+from .jobs import claim_next, enqueue, run_job
+from .models import CompareJob, GameLog, GameLogIngest, HeadToHead, HeadToHeadBuild, Player, SeasonStats, SyncState
+from .ratelimit import TokenBucket
+from .renderers import FastJSONRenderer, dumps
+from .responses import select_fields
+from .seasons import CURRENT_SEASON
+from .seasonstats import SNAPSHOT_COLUMNS, load_season_stats, store_season_stats
+from .search import normalize, search_players
+from .signals import bump_roster_version, get_roster_version
+from .teams import TeamUpdater, apply_season_teams
+from .singleflight import SingleFlight
+from .sync import league_gamelog_from_json, sync_league_gamelog
+from .upstream import UpstreamSession, upstream_request
+from .views import ComparePlayersView
+
+# Recorded LeagueGameLog responses (two players, 2024-25): the first one from
+# the start of the season, the next one from its last game date on
+TEST_DATA = Path(__file__).resolve().parent / 'test_data'
+FIRST_SYNC = TEST_DATA / 'leaguegamelog_2024-25_first.json'
+NEXT_SYNC = TEST_DATA / 'leaguegamelog_2024-25_next.json'
+
+
+class FetchLocksTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f"{directory.name}/locks.sqlite3"
+
+    def test_only_one_caller_gets_the_lock(self):
+        # Each thread has its own connection, like separate workers would
+        locks = FetchLocks(self.path)
+        barrier = threading.Barrier(8)
+
+        def take():
+            barrier.wait()
+            return locks.acquire("h2h:gamelog:1:2024-25:lock", 30)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: take(), range(8)))
+        self.assertEqual(results.count(True), 1)
+        self.assertTrue(locks.held("h2h:gamelog:1:2024-25:lock"))
+
+    def test_released_and_expired_locks_can_be_taken_again(self):
+        locks = FetchLocks(self.path)
+        self.assertTrue(locks.acquire("a", 30))
+        self.assertFalse(locks.acquire("a", 30))
+        locks.release("a")
+        self.assertFalse(locks.held("a"))
+        self.assertTrue(locks.acquire("a", 30))
+
+        self.assertTrue(locks.acquire("b", 0.05))
+        time.sleep(0.1)
+        self.assertFalse(locks.held("b"))
+        self.assertTrue(locks.acquire("b", 30))
+
+
+# Settings for tests that go through the compare views: a private in-memory
+# cache and columnar store, so nothing on disk is read or written
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+SEASON_STATS = {
+    "game_count": 60,
+    "team_id": 1610612743,
+    "team_abbreviation": "DEN",
+    "avg_stats": {},
+    "advanced_stats": {},
+    "total_stats": {},
+}
+
+
+def make_gamelog(player_id, season, games):
+    # A PlayerGameLog-shaped frame from {game number: points}, every other stat 1.
+    # Players share a game when they share a game number
+    start = date(int(season[:4]), 10, 20)
+    rows = [
+        {
+            **{field: 1 for field in GAMELOG_FIELDS.values()},
+            'game_id': f"002{season[2:4]}{number:05d}",
+            'game_date': start + timedelta(days=number),
+            'matchup': 'DEN vs. SAS',
+            'wl': 'W',
+            'pts': points,
+        }
+        for number, points in sorted(games.items(), reverse=True)
+    ]
+    return gamelog_from_rows(player_id, season, rows)
+
+
+class GamelogStoreTests(TestCase):
+
+    def upstream_gamelog(self):
+        # Two PlayerGameLog rows, the second with blank cells
+        columns = ['SEASON_ID', 'Player_ID'] + list(GAMELOG_FIELDS)
+        first = {column: 1 for column in columns}
+        first.update(Game_ID='0021900001', GAME_DATE='NOV 01, 2019', MATCHUP='DEN vs. SAS', WL='W', PTS=31, FG_PCT=0.5)
+        second = dict(first, Game_ID='0021900002', GAME_DATE='NOV 03, 2019', PTS=float('nan'),
+                      PLUS_MINUS=float('nan'), FG_PCT=float('nan'))
+        return pd.DataFrame([first, second], columns=columns)
+
+    def test_blank_cells_are_stored(self):
+        self.assertEqual(store_gamelog(1, '2019-20', self.upstream_gamelog()), 2)
+        blank = GameLog.objects.get(game_id='0021900002')
+        self.assertEqual((blank.pts, blank.plus_minus, blank.fg_pct), (0, 0, None))
+        self.assertEqual(GameLog.objects.get(game_id='0021900001').pts, 31)
+
+    def test_stored_gamelog_reads_back(self):
+        store_gamelog(1, '2019-20', self.upstream_gamelog())
+        gamelog = load_gamelog(1, '2019-20')
+        self.assertEqual(gamelog['Game_ID'].tolist(), ['0021900002', '0021900001']) # Newest first, like upstream
+        self.assertEqual(gamelog['PTS'].tolist(), [0, 31])
+        self.assertEqual(gamelog['GAME_DATE'].tolist(), ['NOV 03, 2019', 'NOV 01, 2019'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TieredCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        upstream_cache.shared.clear()
+        upstream_cache.clear_local()
+        self.addCleanup(upstream_cache.clear_local)
+
+    def promote(self, key):
+        # Another worker's entry: only in the shared tier, then read through this one
+        upstream_cache.clear_local()
+        return upstream_cache.get(key)
+
+    def test_promoted_entries_expire_with_the_shared_entry(self):
+        upstream_cache.set('tiered:soon', 'value', 1)
+        self.assertEqual(self.promote('tiered:soon'), 'value')
+        time.sleep(1.1)
+        self.assertIs(upstream_cache.get('tiered:soon'), MISSING)
+
+    def test_entries_that_never_expire_are_kept_locally_for_good(self):
+        upstream_cache.set('tiered:finished', 'value', None)
+        self.promote('tiered:finished')
+        expires_at, _ = upstream_cache._local['tiered:finished']
+        self.assertIsNone(expires_at)
+
+    def test_callers_get_their_own_copy(self):
+        upstream_cache.set('tiered:dict', {'stats': {'PTS': 31}}, None)
+        upstream_cache.set('tiered:frame', pd.DataFrame({'PTS': [31]}), None)
+        for read in (upstream_cache.get, self.promote):
+            served = read('tiered:dict')
+            served['stats']['PTS'] = 0
+            frame = read('tiered:frame')
+            frame.loc[0, 'PTS'] = 0
+            self.assertEqual(upstream_cache.get('tiered:dict'), {'stats': {'PTS': 31}})
+            self.assertEqual(upstream_cache.get('tiered:frame')['PTS'].tolist(), [31])
+
+
+class TokenBucketTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f"{directory.name}/ratelimit.sqlite3"
+
+    def test_burst_then_waits_in_turn(self):
+        bucket = TokenBucket(self.path, rate=10, capacity=2)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1, delta=0.02)
+        # Reserved tokens go negative, so the next caller queues behind
+        self.assertAlmostEqual(bucket.reserve(), 0.2, delta=0.02)
+
+    def test_workers_share_one_budget(self):
+        # Two buckets on one file stand in for two worker processes
+        first = TokenBucket(self.path, rate=10, capacity=2)
+        second = TokenBucket(self.path, rate=10, capacity=2)
+        first.reserve(2)
+        self.assertGreater(second.reserve(), 0)
+
+    def test_acquire_sleeps_for_the_deficit(self):
+        bucket = TokenBucket(self.path, rate=20, capacity=1)
+        bucket.acquire()
+        started = time.monotonic()
+        wait = bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, wait)
+        self.assertEqual(bucket.stats()["acquired"], 2)
+        self.assertEqual(bucket.stats()["waits"], 1)
+
+
+class SingleFlightTests(SimpleTestCase):
+
+    def run_concurrently(self, flight, fn, callers=5):
+        release = threading.Event()
+
+        def call():
+            return flight.do('key', lambda: (release.wait(5), fn())[1])
+
+        with ThreadPoolExecutor(max_workers=callers) as executor:
+            futures = [executor.submit(call) for _ in range(callers)]
+            deadline = time.monotonic() + 5
+            while flight.stats()["followers"] < callers - 1 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            release.set()
+        return futures
+
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        fetch = mock.Mock(return_value='value')
+        futures = self.run_concurrently(flight, fetch)
+        self.assertEqual([future.result() for future in futures], ['value'] * 5)
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(flight.stats(), {"leaders": 1, "followers": 4, "in_flight": 0})
+
+    def test_followers_get_the_error(self):
+        flight = SingleFlight()
+        futures = self.run_concurrently(flight, mock.Mock(side_effect=ConnectionError("down")))
+        for future in futures:
+            self.assertIsInstance(future.exception(), ConnectionError)
+        # Nothing is remembered, the next call runs again
+        self.assertEqual(flight.do('key', lambda: 'again'), 'again')
+
+
+class CompareViewTestCase(TransactionTestCase):
+    # The compare views fetch on the shared thread pool, whose threads use their
+    # own DB connections, so these tests commit instead of rolling back
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        overrides = override_settings(
+            CACHES=LOCMEM_CACHES,
+            H2H_COLUMNAR_DIR=self.directory / 'gamelog_store',
+            H2H_REQUEST_LOG=self.directory / 'request_keys.log',
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # Every LocMem cache with the same location shares its entries
+        upstream_cache.shared.clear()
+        upstream_cache.clear_local()
+        self.addCleanup(upstream_cache.clear_local)
+
+
+class CompareCompletenessTests(CompareViewTestCase):
+
+    def get_comparison(self, gamelog_patch, season='2019-20'):
+        with mock.patch.object(ComparePlayersView, 'fetch_season_stats', return_value=SEASON_STATS), \
+                mock.patch('h2hapi.views.fetch_gamelog', **gamelog_patch):
+            return ComparePlayersView().get_comparison(1, 2, season)
+
+    def test_failed_gamelog_fetch_is_not_cached(self):
+        # Finished seasons are cached forever, so a failed fetch must not be
+        entry = self.get_comparison({'side_effect': ConnectionError("Read timed out")})
+        self.assertFalse(entry["complete"])
+        self.assertIs(upstream_cache.get(ComparePlayersView().comparison_key(1, 2, '2019-20')), MISSING)
+
+    def test_player_without_games_is_cached(self):
+        entry = self.get_comparison({'return_value': gamelog_from_rows(1, '2019-20', [])})
+        self.assertTrue(entry["complete"])
+        self.assertEqual(entry["payload"]["h2h_stats"]["player_a"]["game_count"], 0)
+        self.assertIsNot(upstream_cache.get(ComparePlayersView().comparison_key(1, 2, '2019-20')), MISSING)
+
+
+class StaleRefreshTests(CompareViewTestCase):
+
+    def test_refreshing_more_compares_than_fetch_workers(self):
+        # Each refresh waits on its own fetches, which must still get a thread
+        view = ComparePlayersView()
+        refreshed = upstream_cache.stats()["refreshes"]
+        pairs = [(player_id, player_id + 100) for player_id in range(1, fetch_pool._max_workers + 3)]
+        for low_id, high_id in pairs:
+            upstream_cache.set(view.comparison_key(low_id, high_id, CURRENT_SEASON), {"stale": False}, 0, 3600)
+
+        def fetch_gamelog(player_id, season):
+            time.sleep(0.01)
+            return gamelog_from_rows(player_id, season, [])
+
+        # Not waited for on the way out, so a deadlock fails the test instead of hanging it
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown, wait=False)
+        with mock.patch.object(ComparePlayersView, 'fetch_season_stats', return_value=SEASON_STATS), \
+                mock.patch('h2hapi.views.fetch_gamelog', side_effect=fetch_gamelog):
+            for low_id, high_id in pairs:
+                self.assertEqual(view.get_comparison(low_id, high_id, CURRENT_SEASON), {"stale": False})
+            # A cold compare isn't stuck behind them either
+            cold = executor.submit(view.get_comparison, 500, 600, CURRENT_SEASON).result(timeout=10)
+            self.assertTrue(cold["complete"])
+
+            deadline = time.monotonic() + 10
+            while upstream_cache.stats()["refreshes"] - refreshed < len(pairs) and time.monotonic() < deadline:
+                time.sleep(0.05)
+        for low_id, high_id in pairs:
+            self.assertTrue(upstream_cache.get(view.comparison_key(low_id, high_id, CURRENT_SEASON))["complete"])
+
+
+class WarmCacheTests(CompareViewTestCase):
+
+    def test_warming_more_compares_than_fetch_workers(self):
+        log = self.directory / 'request_keys.log'
+        pairs = [(player_id, player_id + 100) for player_id in range(1, fetch_pool._max_workers + 3)]
+        log.write_text(''.join(f"{int(time.time())} 2019-20 {low_id} {high_id}\n" for low_id, high_id in pairs))
+
+        out = StringIO()
+        command = threading.Thread(target=call_command, args=('warm_cache',), kwargs={'stdout': out}, daemon=True)
+        with mock.patch.object(ComparePlayersView, 'fetch_season_stats', return_value=SEASON_STATS), \
+                mock.patch('h2hapi.views.fetch_gamelog', side_effect=lambda player_id, season: gamelog_from_rows(player_id, season, [])):
+            command.start()
+            command.join(timeout=20)
+        self.assertFalse(command.is_alive(), "warm_cache deadlocked")
+        self.assertIn("Compares Not Cached (upstream errors): 0", out.getvalue())
+        view = ComparePlayersView()
+        for low_id, high_id in pairs:
+            self.assertIsNot(upstream_cache.get(view.comparison_key(low_id, high_id, '2019-20')), MISSING)
+
+
+class TimingTests(CompareViewTestCase):
+
+    def server_timing(self, response):
+        stages = {}
+        for entry in response['Server-Timing'].split(', '):
+            stage, duration = entry.split(';dur=')
+            stages[stage] = float(duration)
+        return stages
+
+    def test_spans_time_the_fetches_on_the_pool_threads(self):
+        def fetch_season_stats(view, player_id, season):
+            with upstream_request('PlayerCareerStats'):
+                time.sleep(0.05)
+            return SEASON_STATS
+
+        # One token, so the second call waits about 50ms for the next
+        limiter = TokenBucket(self.directory / 'ratelimit.sqlite3', rate=20, capacity=1)
+        with mock.patch.object(ComparePlayersView, 'fetch_season_stats', fetch_season_stats), \
+                mock.patch('h2hapi.upstream.nba_rate_limiter', limiter), \
+                mock.patch('h2hapi.views.fetch_gamelog', side_effect=lambda player_id, season: gamelog_from_rows(player_id, season, [])):
+            response = Client().get('/api/compare/', {'player_a_id': 1, 'player_b_id': 2, 'season': '2019-20'})
+
+        self.assertEqual(response.status_code, 200)
+        stages = self.server_timing(response)
+        # Both fetches, summed, including the wait for a token
+        self.assertGreaterEqual(stages['season_stats'], 140)
+        self.assertGreaterEqual(stages['ratelimit'], 30)
+        self.assertIn('gamelog', stages)
+
+    def test_background_refresh_adds_no_spans_to_the_request(self):
+        view = ComparePlayersView()
+        refreshed = upstream_cache.stats()["refreshes"]
+        upstream_cache.set(view.comparison_key(1, 2, CURRENT_SEASON), {"stale": False}, 0, 3600)
+        token = view.timings.activate()
+        with mock.patch.object(ComparePlayersView, 'fetch_season_stats', return_value=SEASON_STATS), \
+                mock.patch('h2hapi.views.fetch_gamelog', side_effect=lambda player_id, season: gamelog_from_rows(player_id, season, [])):
+            view.get_comparison(1, 2, CURRENT_SEASON)
+            view.timings.deactivate(token)
+            deadline = time.monotonic() + 10
+            while upstream_cache.stats()["refreshes"] == refreshed and time.monotonic() < deadline:
+                time.sleep(0.05)
+        self.assertEqual(upstream_cache.stats()["refreshes"], refreshed + 1)
+        self.assertEqual(view.timings.spans, [])
+
+
+class LeagueSyncTests(TestCase):
+
+    def sync(self, fixture):
+        return sync_league_gamelog('2024-25', league_gamelog_from_json(fixture.read_text(encoding='utf-8')))
+
+    def test_first_sync(self):
+        out = StringIO()
+        call_command('sync_games', '--season', '2024-25', '--fixture', str(FIRST_SYNC), stdout=out)
+        self.assertIn("Games Added: 4", out.getvalue())
+        self.assertEqual(GameLog.objects.filter(season='2024-25').count(), 4)
+        self.assertEqual(SyncState.objects.get(season='2024-25').last_game_date, date(2024, 10, 24))
+        self.assertEqual(
+            sorted(GameLogIngest.objects.values_list('player_id', 'game_count')),
+            [(203999, 2), (1641705, 2)],
+        )
+
+    def test_incremental_sync_skips_games_already_stored(self):
+        self.sync(FIRST_SYNC)
+        # The high-water date is re-read, only its new games are added
+        self.assertEqual(self.sync(NEXT_SYNC), (2, 2, date(2024, 10, 26)))
+        self.assertEqual(GameLog.objects.filter(season='2024-25').count(), 6)
+        self.assertEqual(GameLogIngest.objects.get(player_id=203999).game_count, 3)
+
+    def test_replaying_a_fixture_changes_nothing(self):
+        self.sync(FIRST_SYNC)
+        self.sync(NEXT_SYNC)
+        self.assertEqual(self.sync(NEXT_SYNC), (0, 0, date(2024, 10, 26)))
+        # Everything in the older response is before the high-water mark
+        self.assertEqual(self.sync(FIRST_SYNC), (0, 0, date(2024, 10, 26)))
+        self.assertEqual(GameLog.objects.filter(season='2024-25').count(), 6)
+        self.assertEqual(SyncState.objects.get(season='2024-25').last_game_date, date(2024, 10, 26))
+
+
+class ColumnarStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        overrides = override_settings(H2H_COLUMNAR_DIR=directory.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def gamelog(self, player_id, points):
+        rows = [
+            {
+                'game_id': f"00219000{number:02d}", 'game_date': date(2019, 11, number + 1),
+                'matchup': 'DEN vs. SAS', 'wl': 'W', 'pts': pts,
+                **{field: 1 for field in GAMELOG_FIELDS.values() if field not in ('game_id', 'game_date', 'matchup', 'wl', 'pts')},
+            }
+            for number, pts in enumerate(points)
+        ]
+        return gamelog_from_rows(player_id, '2019-20', rows)
+
+    def test_round_trip(self):
+        gamelog = self.gamelog(1, [10, 20, 30])
+        write_gamelog(1, '2019-20', gamelog)
+        stored = read_gamelog(1, '2019-20')
+        self.assertEqual(list(stored.columns), list(columnar.COLUMN_DTYPES))
+        self.assertEqual(stored.to_dict('list'), gamelog.to_dict('list'))
+
+    def test_reads_only_the_requested_columns_without_copying(self):
+        write_gamelog(1, '2019-20', self.gamelog(1, [10, 20, 30]))
+        stored = read_gamelog(1, '2019-20', ['Game_ID', 'PTS'])
+        self.assertEqual(list(stored.columns), ['Game_ID', 'PTS'])
+        points = stored['PTS'].to_numpy()
+        bases = []
+        while points is not None:
+            bases.append(type(points))
+            points = getattr(points, 'base', None)
+        self.assertIn(np.memmap, bases)
+        points = stored['PTS'].to_numpy()
+        self.assertEqual(points.tolist(), [10, 20, 30])
+
+    def test_rewrite_replaces_the_previous_generation(self):
+        write_gamelog(1, '2019-20', self.gamelog(1, [10]))
+        write_gamelog(1, '2019-20', self.gamelog(1, [10, 20]))
+        self.assertEqual(read_gamelog(1, '2019-20')['PTS'].tolist(), [10, 20])
+        generations = [path for path in columnar.season_dir('2019-20').iterdir() if path.is_dir()]
+        self.assertEqual(len(generations), 1)
+
+    def test_compaction_keeps_every_player(self):
+        for player_id in (3, 1, 2):
+            write_gamelog(player_id, '2019-20', self.gamelog(player_id, [player_id] * player_id))
+        self.assertEqual(compact_season('2019-20'), 3)
+        self.assertEqual({path.name for path in columnar.season_dir('2019-20').iterdir()}, {
+            'packed.current', columnar._current(columnar.season_dir('2019-20'), 'packed')[0],
+        })
+        for player_id in (1, 2, 3):
+            self.assertEqual(read_gamelog(player_id, '2019-20', ['PTS'])['PTS'].tolist(), [player_id] * player_id)
+        self.assertIsNone(read_gamelog(4, '2019-20'))
+
+    def test_compaction_keeps_a_gamelog_rewritten_while_packing(self):
+        write_gamelog(1, '2019-20', self.gamelog(1, [10]))
+        publish = columnar._publish
+
+        def rewrite_then_publish(directory, name, write):
+            # A compare stores a newer gamelog after compaction read the old one
+            if name == 'packed':
+                write_gamelog(1, '2019-20', self.gamelog(1, [10, 20]))
+            return publish(directory, name, write)
+
+        with mock.patch.object(columnar, '_publish', side_effect=rewrite_then_publish):
+            compact_season('2019-20')
+        self.assertEqual(read_gamelog(1, '2019-20')['PTS'].tolist(), [10, 20])
+
+    def test_version_1_files_are_upgraded(self):
+        legacy = np.zeros(2, dtype=[('Game_ID', 'U10'), ('PTS', 'i8')])
+        legacy['Game_ID'] = ['0021900001', '0021900002']
+        legacy['PTS'] = [12, 34]
+        path = columnar.store_root(1) / '2019-20' / '1.npy'
+        path.parent.mkdir(parents=True)
+        np.save(path, legacy)
+
+        stored = read_gamelog(1, '2019-20', ['Game_ID', 'PTS', 'REB'])
+        self.assertEqual(stored['PTS'].tolist(), [12, 34])
+        self.assertEqual(stored['REB'].tolist(), [0, 0]) # Not in version 1 files
+        self.assertIsNotNone(columnar._current(columnar.season_dir('2019-20'), 1)[0])
+
+    def test_stale_current_season_is_not_served(self):
+        write_gamelog(1, CURRENT_SEASON, self.gamelog(1, [10]))
+        self.assertIsNotNone(read_gamelog(1, CURRENT_SEASON))
+        pointer = columnar.season_dir(CURRENT_SEASON) / '1.current'
+        old = time.time() - CURRENT_SEASON_MAX_AGE.total_seconds() - 60
+        os.utime(pointer, (old, old))
+        self.assertIsNone(read_gamelog(1, CURRENT_SEASON))
+
+
+class UpstreamSessionTests(SimpleTestCase):
+    # nba_api endpoints against run_stub_upstream's server, through our session,
+    # circuit breaker and a rate limiter of their own
+
+    def start_stub(self, **options):
+        self.stub_log = StringIO()
+        server = stub_server({
+            'port': 0, 'delay': 0.0, 'fail_rate': 0.0, 'fail_first': 0,
+            'fail_status': 503, 'retry_after': None, 'rows': 5, **options,
+        }, self.stub_log)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        base_url = mock.patch.object(NBAStatsHTTP, 'base_url', f"http://127.0.0.1:{server.server_port}/stats/{{endpoint}}")
+        base_url.start()
+        self.addCleanup(base_url.stop)
+
+    def use_session(self, **options):
+        session = UpstreamSession(**{'timeout': (1, 5), 'retries': 3, 'backoff': 0.01, 'max_backoff': 2.0, **options})
+        previous = NBAStatsHTTP.get_session()
+        NBAStatsHTTP.set_session(session)
+        self.addCleanup(NBAStatsHTTP.set_session, previous)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.circuit = CircuitBreaker('stub', window=30, min_calls=3, error_rate=0.5, cooldown=30)
+        limiter = TokenBucket(f"{directory.name}/ratelimit.sqlite3", rate=1000, capacity=100)
+        for name, replacement in (('nba_circuit', self.circuit), ('nba_rate_limiter', limiter)):
+            patcher = mock.patch(f'h2hapi.upstream.{name}', replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def stub_requests(self):
+        return self.stub_log.getvalue().count('"GET ')
+
+    def test_retries_until_the_stub_answers(self):
+        self.start_stub(fail_first=2)
+        self.use_session()
+        gamelog = fetch_gamelog(203999, '2024-25')
+        self.assertEqual(len(gamelog), 5)
+        self.assertEqual(self.stub_requests(), 3)
+        self.assertEqual(self.circuit.state, CircuitBreaker.CLOSED)
+
+    def test_gives_up_after_the_configured_retries(self):
+        self.start_stub(fail_rate=1)
+        self.use_session(retries=2)
+        with self.assertRaises(Exception):
+            fetch_gamelog(203999, '2024-25')
+        self.assertEqual(self.stub_requests(), 3)
+
+    def test_waits_as_long_as_retry_after_says(self):
+        self.start_stub(fail_first=1, fail_status=429, retry_after=1)
+        self.use_session()
+        started = time.monotonic()
+        fetch_gamelog(203999, '2024-25')
+        self.assertGreaterEqual(time.monotonic() - started, 1.0)
+        self.assertEqual(self.stub_requests(), 2)
+
+    def test_retry_after_is_capped_by_max_backoff(self):
+        self.start_stub(fail_first=1, fail_status=429, retry_after=30)
+        self.use_session(max_backoff=0.1)
+        started = time.monotonic()
+        fetch_gamelog(203999, '2024-25')
+        self.assertLess(time.monotonic() - started, 5)
+
+    def test_breaker_opens_at_the_configured_error_rate(self):
+        self.start_stub(fail_rate=1)
+        self.use_session(retries=0)
+        for _ in range(3):
+            with self.assertRaises(Exception):
+                fetch_gamelog(203999, '2024-25')
+        self.assertEqual(self.circuit.state, CircuitBreaker.OPEN)
+        # Open: fails fast without calling the stub
+        with self.assertRaises(CircuitOpenError):
+            fetch_gamelog(203999, '2024-25')
+        self.assertEqual(self.stub_requests(), 3)
+
+
+class BatchCompareTests(CompareViewTestCase):
+
+    GAMES = {
+        1: {1: 10, 2: 20, 3: 30},
+        2: {1: 15, 2: 25, 4: 35}, # Met player 1 in games 1 and 2
+        3: {3: 40, 5: 50}, # Met player 1 in game 3, never player 2
+    }
+
+    def batch(self, params, error=None):
+        fetch_season_stats = {'side_effect': error} if error else {'return_value': SEASON_STATS}
+        self.fetch_gamelog = mock.Mock(side_effect=lambda player_id, season: make_gamelog(player_id, season, self.GAMES[player_id]))
+        futures = []
+        def submit(fn, *args, **kwargs):
+            futures.append(concurrency.submit(fn, *args, **kwargs))
+            return futures[-1]
+        with mock.patch.object(ComparePlayersView, 'fetch_season_stats', **fetch_season_stats), \
+                mock.patch('h2hapi.views.fetch_gamelog', self.fetch_gamelog), \
+                mock.patch('h2hapi.views.submit', submit):
+            response = Client().get('/api/compare/batch/', {'season': '2019-20', **params})
+            if response.streaming:
+                # Consumed inside the patches, the stream fetches as it goes
+                body = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+            else:
+                body = response.json()
+            # A failed batch doesn't wait for its gamelogs, which must not outlive
+            # the patches (or be joined by a later test's fetch)
+            wait(futures, timeout=5)
+        return response, body
+
+    def test_stream_sends_players_then_pairs(self):
+        response, lines = self.batch({'player_id': 1, 'opponent_ids': '2,3', 'stream': 'true'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([line['player_id'] for line in lines[:3]], [1, 2, 3])
+        self.assertEqual(lines[0]['player']['team_abbreviation'], 'DEN')
+        pairs = {(line['player_a_id'], line['player_b_id']): line['h2h_stats'] for line in lines[3:]}
+        self.assertEqual(set(pairs), {(1, 2), (1, 3)})
+        self.assertEqual(pairs[(1, 2)]['player_a']['total_stats']['PTS'], 30)
+        self.assertEqual(pairs[(1, 2)]['player_b']['total_stats']['PTS'], 40)
+        self.assertEqual(pairs[(1, 3)]['player_a']['game_count'], 1)
+        # Each player's gamelog is fetched once, however many pairs it's in
+        self.assertEqual(self.fetch_gamelog.call_count, 3)
+
+    def test_every_pair_of_a_list(self):
+        response, body = self.batch({'player_ids': '1,2,3'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(body['players']), {'1', '2', '3'})
+        results = {(result['player_a_id'], result['player_b_id']): result['h2h_stats'] for result in body['results']}
+        self.assertEqual(set(results), {(1, 2), (1, 3), (2, 3)})
+        self.assertEqual(results[(2, 3)]['player_a'], {"game_count": 0, "error": "No H2H Games Found."})
+        self.assertEqual(self.fetch_gamelog.call_count, 3)
+
+    def test_error_after_the_headers_becomes_the_last_line(self):
+        _, lines = self.batch(
+            {'player_ids': '1,2', 'stream': 'true'}, error=ConnectionError("Read timed out"),
+        )
+        self.assertEqual(lines, [{"error": "An error occurred while fetching data: Read timed out"}])
+
+    def test_anchor_needs_another_opponent(self):
+        response, body = self.batch({'player_id': 1, 'opponent_ids': '1'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", body)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class HeadToHeadMatrixTests(TestCase):
+    season = '2019-20'
+
+    def setUp(self):
+        upstream_cache.shared.clear()
+        upstream_cache.clear_local()
+        self.addCleanup(upstream_cache.clear_local)
+        # 1 and 2 meet in games 1 and 2, 3 only plays game 5, 4 is never ingested
+        store_gamelog(2, self.season, make_gamelog(2, self.season, {1: 10, 2: 5, 3: 7}))
+        store_gamelog(1, self.season, make_gamelog(1, self.season, {1: 30, 2: 20}))
+        store_gamelog(3, self.season, make_gamelog(3, self.season, {5: 12}))
+
+    def live(self, player_a_id, player_b_id):
+        return compute_h2h(load_gamelog(player_a_id, self.season), load_gamelog(player_b_id, self.season))
+
+    def test_pair_totals(self):
+        totals = pair_totals(season_frame(self.season))
+        self.assertEqual(sorted(totals.index), [(1, 2), (2, 1)])
+        self.assertEqual(totals.loc[(1, 2), 'game_count'], 2)
+        self.assertEqual(totals.loc[(1, 2), 'PTS'], 50)
+        self.assertEqual(totals.loc[(2, 1), 'PTS'], 15)
+
+    def test_each_pair_is_stored_once(self):
+        self.assertEqual(build_h2h_matrix(self.season), 1)
+        row = HeadToHead.objects.get(season=self.season)
+        self.assertEqual((row.player_a_id, row.player_b_id, row.game_count), (1, 2, 2))
+        self.assertEqual(HeadToHeadBuild.objects.get(season=self.season).player_ids, [1, 2, 3])
+
+    def test_matches_the_live_h2h_either_way_round(self):
+        build_h2h_matrix(self.season)
+        self.assertEqual(load_h2h(1, 2, self.season), self.live(1, 2))
+        swapped = load_h2h(2, 1, self.season)
+        self.assertEqual(swapped, self.live(2, 1))
+        self.assertEqual(swapped["player_a"]["total_stats"]["PTS"], 15)
+        self.assertEqual(list(swapped["player_a"]["total_stats"]), list(self.live(2, 1)["player_a"]["total_stats"]))
+
+    def test_blank_percentages_match_the_live_h2h(self):
+        gamelog = make_gamelog(1, self.season, {1: 30, 2: 20})
+        gamelog['FG3_PCT'] = None
+        store_gamelog(1, self.season, gamelog)
+        build_h2h_matrix(self.season)
+        self.assertEqual(load_h2h(1, 2, self.season), self.live(1, 2))
+
+    def test_pairs_who_never_met(self):
+        build_h2h_matrix(self.season)
+        no_games = {"game_count": 0, "error": "No H2H Games Found."}
+        self.assertEqual(load_h2h(3, 1, self.season), {"player_a": no_games, "player_b": no_games})
+        self.assertEqual(load_h2h(3, 1, self.season), self.live(3, 1))
+        # Without 4's gamelog the matrix can't say, so the view computes it live
+        self.assertIsNone(load_h2h(1, 4, self.season))
+
+    def test_unbuilt_season_is_computed_live(self):
+        self.assertIsNone(load_h2h(1, 2, self.season))
+
+    def test_compare_skips_the_gamelogs_for_pairs_who_never_met(self):
+        build_h2h_matrix(self.season)
+        with mock.patch.object(ComparePlayersView, 'fetch_season_stats', return_value=SEASON_STATS), \
+             mock.patch.object(ComparePlayersView, 'get_player_gamelog') as get_player_gamelog:
+            payload = ComparePlayersView().build_comparison(1, 3, self.season)
+        get_player_gamelog.assert_not_called()
+        self.assertEqual(payload["h2h_stats"]["player_a"]["game_count"], 0)
+
+
+class SeasonStatsSnapshotTests(TestCase):
+    season = '2019-20'
+
+    def league_stats(self, **changes):
+        # One LeagueDashPlayerStats (Totals) row per player ID in changes
+        rows = []
+        for player_id, row in changes.items():
+            record = {column: 10 for column in SNAPSHOT_COLUMNS}
+            record.update(PLAYER_ID=int(player_id[1:]), TEAM_ID=1610612743, TEAM_ABBREVIATION='DEN', GP=5, FG_PCT=0.5)
+            record.update(row)
+            rows.append(record)
+        return pd.DataFrame(rows, columns=list(SNAPSHOT_COLUMNS))
+
+    def career_stats(self, season):
+        # The PlayerCareerStats table for the same player, with the same totals
+        league_row = self.league_stats(p1={}).iloc[0]
+        row = {career_column: league_row[column] for column, career_column in SNAPSHOT_COLUMNS.items()}
+        return pd.DataFrame([{'SEASON_ID': season, 'LEAGUE_ID': '00', **row}])
+
+    def test_rows_are_keyed_like_a_career_season(self):
+        self.assertEqual(store_season_stats(self.season, self.league_stats(p1={'AGE': 24}, p2={'FG3_PCT': float('nan')})), 2)
+        totals = load_season_stats(1, self.season)
+        self.assertEqual(totals['SEASON_ID'], self.season)
+        self.assertEqual(totals['PLAYER_AGE'], 24)
+        self.assertEqual(totals['TEAM_ABBREVIATION'], 'DEN')
+        self.assertIsNone(load_season_stats(2, self.season)['FG3_PCT'])
+        self.assertIsNone(load_season_stats(3, self.season))
+
+    def test_storing_replaces_the_season(self):
+        store_season_stats(self.season, self.league_stats(p1={}, p2={}))
+        store_season_stats(self.season, self.league_stats(p1={'GP': 6}))
+        self.assertEqual(list(SeasonStats.objects.values_list('player_id', 'games_played')), [(1, 6)])
+
+    def test_stale_current_season_falls_back(self):
+        store_season_stats(CURRENT_SEASON, self.league_stats(p1={}))
+        self.assertIsNotNone(load_season_stats(1, CURRENT_SEASON))
+        SeasonStats.objects.update(fetched_at=timezone.now() - CURRENT_SEASON_MAX_AGE - timedelta(minutes=1))
+        self.assertIsNone(load_season_stats(1, CURRENT_SEASON))
+
+    def test_compare_uses_the_snapshot_instead_of_the_career_call(self):
+        view = ComparePlayersView()
+        with mock.patch('h2hapi.views.playercareerstats.PlayerCareerStats') as career:
+            career.return_value.get_data_frames.return_value = [self.career_stats(self.season)]
+            from_career = view.fetch_season_stats(1, self.season)
+            store_season_stats(self.season, self.league_stats(p1={}))
+            from_snapshot = view.fetch_season_stats(1, self.season)
+        self.assertEqual(career.call_count, 1)
+        self.assertEqual(from_snapshot["avg_stats"], from_career["avg_stats"])
+        self.assertEqual(from_snapshot["advanced_stats"], from_career["advanced_stats"])
+        self.assertEqual(
+            (from_snapshot["game_count"], from_snapshot["team_id"], from_snapshot["team_abbreviation"]),
+            (5, 1610612743, 'DEN'),
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PopulatePlayersTests(TestCase):
+
+    def setUp(self):
+        Player.objects.bulk_create([
+            Player(api_id=1, first_name='Nikola', last_name='Jokic'),
+            Player(api_id=2, first_name='Jamal', last_name='Murray'),
+            Player(api_id=3, first_name='Retired', last_name='Player'),
+        ])
+
+    def populate(self, *args):
+        # nba_api's static list: 1 unchanged, 2 renamed, 3 retired, 4 new, 5 never active
+        static_players = [
+            {'id': 1, 'first_name': 'Nikola', 'last_name': 'Jokic', 'is_active': True},
+            {'id': 2, 'first_name': 'Jamal', 'last_name': 'Murray Jr.', 'is_active': True},
+            {'id': 3, 'first_name': 'Retired', 'last_name': 'Player', 'is_active': False},
+            {'id': 4, 'first_name': 'Christian', 'last_name': 'Braun', 'is_active': True},
+            {'id': 5, 'first_name': 'Old', 'last_name': 'Timer', 'is_active': False},
+        ]
+        out = StringIO()
+        with mock.patch('h2hapi.management.commands.populate_players.players.get_players', return_value=static_players):
+            call_command('populate_players', *args, stdout=out)
+        return out.getvalue()
+
+    def test_only_changes_are_written(self):
+        version = get_roster_version()
+        output = self.populate()
+        for line in ("Players Added: 1", "Players Updated: 1", "Players Removed: 1", "Players Unchanged: 1"):
+            self.assertIn(line, output)
+        self.assertEqual(
+            list(Player.objects.order_by('api_id').values_list('api_id', 'last_name')),
+            [(1, 'Jokic'), (2, 'Murray Jr.'), (4, 'Braun')],
+        )
+        self.assertNotEqual(get_roster_version(), version)
+
+    def test_unchanged_roster_keeps_its_version(self):
+        self.populate()
+        version = get_roster_version()
+        output = self.populate()
+        for line in ("Players Added: 0", "Players Updated: 0", "Players Removed: 0", "Players Unchanged: 3"):
+            self.assertIn(line, output)
+        self.assertEqual(get_roster_version(), version)
+
+    def test_keep_retired(self):
+        self.assertIn("Players Removed: 0", self.populate('--keep-retired'))
+        self.assertTrue(Player.objects.filter(api_id=3).exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PlayerSearchTests(TestCase):
+
+    def setUp(self):
+        # Check the roster version on every search, not once a second
+        interval = mock.patch('h2hapi.search.VERSION_CHECK_INTERVAL', 0)
+        interval.start()
+        self.addCleanup(interval.stop)
+        Player.objects.bulk_create([
+            Player(api_id=1, first_name='Nikola', last_name='Jokić'),
+            Player(api_id=2, first_name='Jamal', last_name='Murray'),
+            Player(api_id=3, first_name='Nickeil', last_name='Alexander-Walker'),
+            Player(api_id=4, first_name='Shai', last_name='Gilgeous-Alexander'),
+        ])
+        bump_roster_version() # Bulk writes don't send post_save
+
+    def names(self, query, limit=10):
+        return [player['last_name'] for player in search_players(query, limit)]
+
+    def test_normalize(self):
+        self.assertEqual(normalize('  Nikola JOKIĆ '), 'nikola jokic')
+        self.assertEqual(normalize('Gilgeous-Alexander'), 'gilgeous alexander')
+
+    def test_prefixes_of_any_name(self):
+        self.assertEqual(self.names('jok'), ['Jokić'])
+        self.assertEqual(self.names('Nik'), ['Jokić'])
+        self.assertEqual(self.names('nikola jo'), ['Jokić'])
+        self.assertEqual(self.names('jok nik'), ['Jokić'])
+        self.assertEqual(self.names('ni'), ['Alexander-Walker', 'Jokić']) # Roster (last name) order
+        self.assertEqual(self.names('alex'), ['Alexander-Walker', 'Gilgeous-Alexander'])
+        self.assertEqual(self.names('alex', limit=1), ['Alexander-Walker'])
+        self.assertEqual(self.names('zzz'), [])
+        self.assertEqual(self.names(' - '), [])
+
+    def test_roster_changes_are_picked_up(self):
+        self.assertEqual(self.names('braun'), [])
+        Player.objects.create(api_id=5, first_name='Christian', last_name='Braun')
+        self.assertEqual(self.names('braun'), ['Braun'])
+
+    def test_view(self):
+        response = Client().get('/api/players/search/', {'q': 'jok', 'limit': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{'api_id': 1, 'first_name': 'Nikola', 'last_name': 'Jokić'}])
+        self.assertEqual(Client().get('/api/players/search/', {'q': 'jok', 'limit': 0}).status_code, 400)
+        self.assertEqual(Client().get('/api/players/search/').status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PlayerListTests(TestCase):
+
+    def setUp(self):
+        upstream_cache.shared.clear()
+        upstream_cache.clear_local()
+        self.addCleanup(upstream_cache.clear_local)
+        Player.objects.bulk_create([
+            Player(api_id=2, first_name='Jamal', last_name='Murray'),
+            Player(api_id=1, first_name='Nikola', last_name='Jokic'),
+        ])
+        bump_roster_version() # Bulk writes don't send post_save
+        self.client = Client()
+
+    def get(self, **headers):
+        return self.client.get('/api/players/', HTTP_ACCEPT='application/json', headers=headers)
+
+    def test_roster_bytes(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([player['api_id'] for player in json.loads(response.content)], [1, 2])
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response.has_header('Last-Modified'))
+
+    def test_gzip_has_its_own_etag(self):
+        plain = self.get()
+        compressed = self.get(accept_encoding='gzip, deflate')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertEqual(compressed['ETag'], plain['ETag'][:-1] + '-gzip"')
+
+    def test_not_modified(self):
+        plain, compressed = self.get(), self.get(accept_encoding='gzip')
+        for etag in (plain['ETag'], compressed['ETag']):
+            response = self.get(if_none_match=etag, accept_encoding='gzip')
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+            self.assertEqual(response['ETag'], compressed['ETag'])
+        self.assertEqual(self.get(if_modified_since=plain['Last-Modified']).status_code, 304)
+        # ETags win over dates when both are sent
+        self.assertEqual(self.get(if_none_match='"other"', if_modified_since=plain['Last-Modified']).status_code, 200)
+
+    def test_roster_changes_invalidate_the_etag(self):
+        etag = self.get()['ETag']
+        Player.objects.create(api_id=3, first_name='Christian', last_name='Braun')
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual([player['api_id'] for player in json.loads(response.content)], [3, 1, 2])
+
+
+class AggregationTests(SimpleTestCase):
+    # The numpy engine must give what the pandas merge/isin/loop code gave
+
+    def assert_same_h2h(self, legacy, engine, gamelog_a, gamelog_b):
+        for side, gamelog in (('player_a', gamelog_a), ('player_b', gamelog_b)):
+            self.assertEqual(engine[side], legacy[side])
+            for block in ('avg_stats', 'advanced_stats', 'total_stats'):
+                self.assertEqual(list(engine[side][block]), list(legacy[side][block]))
+            # Each total keeps its column's type, as the column's own sum() does
+            for column, value in engine[side]['total_stats'].items():
+                self.assertIs(type(value), type(gamelog[column].sum().item()), column)
+            for value in [*engine[side]['avg_stats'].values(), *engine[side]['advanced_stats'].values()]:
+                self.assertIs(type(value), float)
+
+    def test_matches_the_pandas_implementation(self):
+        rng = np.random.default_rng(0)
+        for _ in range(5):
+            gamelog_a, gamelog_b = synthetic_gamelog(1, rng, season_games=120), synthetic_gamelog(2, rng, season_games=120)
+            self.assert_same_h2h(legacy_h2h(gamelog_a, gamelog_b), compute_h2h(gamelog_a, gamelog_b), gamelog_a, gamelog_b)
+
+    def test_pairs_match_single_compares(self):
+        rng = np.random.default_rng(1)
+        gamelogs = {player_id: synthetic_gamelog(player_id, rng, season_games=120) for player_id in (1, 2, 3)}
+        pairs = [(1, 2), (1, 3), (2, 3)]
+        results = compute_pairs({player_id: GamelogArrays(frame) for player_id, frame in gamelogs.items()}, pairs)
+        for a, b in pairs:
+            self.assert_same_h2h(legacy_h2h(gamelogs[a], gamelogs[b]), results[(a, b)], gamelogs[a], gamelogs[b])
+
+    def test_integer_totals_serialize_as_integers(self):
+        rng = np.random.default_rng(3)
+        gamelog = synthetic_gamelog(1, rng, games=10, season_games=20)
+        total_stats = compute_h2h(gamelog, gamelog)['player_a']['total_stats']
+        self.assertEqual(json.dumps(total_stats['PTS']), str(gamelog['PTS'].sum()))
+
+    def test_no_shared_games(self):
+        rng = np.random.default_rng(2)
+        gamelog_a = synthetic_gamelog(1, rng, games=10, season_games=20)
+        gamelog_b = gamelog_a.assign(Game_ID=gamelog_a['Game_ID'] + 'x', Player_ID=2)
+        self.assertEqual(compute_h2h(gamelog_a, gamelog_b)['player_a']['game_count'], 0)
+
+
+class MultiSeasonCompareTests(CompareViewTestCase):
+
+    # (player, season) -> games. 1 and 2 meet twice in 2018-19, once in 2019-20
+    # and never in 2020-21
+    GAMES = {
+        (1, '2018-19'): {1: 10, 2: 20, 3: 30},
+        (2, '2018-19'): {1: 5, 2: 15},
+        (1, '2019-20'): {4: 40},
+        (2, '2019-20'): {4: 25, 5: 35},
+        (1, '2020-21'): {6: 10},
+        (2, '2020-21'): {7: 10},
+    }
+
+    def compare(self, params, career_seasons=None, **headers):
+        self.fetch_gamelog = mock.Mock(
+            side_effect=lambda player_id, season: make_gamelog(player_id, season, self.GAMES.get((player_id, season), {}))
+        )
+        with mock.patch.object(ComparePlayersView, 'fetch_season_stats', return_value=SEASON_STATS), \
+                mock.patch.object(ComparePlayersView, 'fetch_career_seasons', side_effect=career_seasons), \
+                mock.patch('h2hapi.views.fetch_gamelog', self.fetch_gamelog):
+            return Client().get('/api/compare/', {'player_a_id': 1, 'player_b_id': 2, **params}, headers=headers)
+
+    def test_season_range(self):
+        response = self.compare({'seasons': '2018-19..2020-21'})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['seasons'], ['2018-19', '2019-20', '2020-21'])
+        self.assertEqual(body['h2h_stats']['player_a']['game_count'], 3)
+        self.assertEqual(body['h2h_stats']['player_a']['total_stats']['PTS'], 70)
+        self.assertEqual(body['h2h_stats']['player_b']['total_stats']['PTS'], 45)
+        by_season = {entry['season']: entry['h2h_stats'] for entry in body['by_season']}
+        self.assertEqual([by_season[season]['player_a']['game_count'] for season in body['seasons']], [2, 1, 0])
+        self.assertEqual(by_season['2019-20']['player_b']['total_stats']['PTS'], 25)
+        # Every (player, season) gamelog is fetched once
+        self.assertEqual(self.fetch_gamelog.call_count, 6)
+
+    def test_career_uses_the_shared_seasons(self):
+        careers = {1: ['2018-19', '2019-20'], 2: ['2019-20', '2020-21']}
+        response = self.compare({'career': 'true'}, career_seasons=lambda player_id: careers[player_id])
+        body = response.json()
+        self.assertEqual(body['seasons'], ['2019-20'])
+        self.assertEqual(body['h2h_stats']['player_a']['game_count'], 1)
+        self.assertEqual(self.fetch_gamelog.call_count, 2)
+
+    def test_overlapping_gamelogs_count_each_game_once(self):
+        view = ComparePlayersView()
+        gamelog = make_gamelog(1, '2018-19', {1: 10, 2: 20})
+        joined = view.join_gamelogs([gamelog, gamelog.iloc[:1], pd.DataFrame()])
+        self.assertEqual(sorted(joined['Game_ID']), sorted(gamelog['Game_ID']))
+        self.assertTrue(view.join_gamelogs([pd.DataFrame()]).empty)
+
+    def test_not_modified(self):
+        etag = self.compare({'seasons': '2018-19..2019-20'})['ETag']
+        self.assertEqual(self.compare({'seasons': '2018-19..2019-20'}, if_none_match=etag).status_code, 304)
+        self.assertNotEqual(self.compare({'seasons': '2018-19..2020-21'})['ETag'], etag)
+
+    def test_invalid_ranges(self):
+        self.assertEqual(self.compare({'seasons': '2020-21..2018-19'}).status_code, 400)
+        self.assertEqual(self.compare({'seasons': '1990-91..2020-21'}).status_code, 400)
+        self.assertEqual(self.compare({'seasons': '2018-19'}).status_code, 400)
+
+
+class JobClaimTests(TestCase):
+
+    def job(self, **fields):
+        return CompareJob.objects.create(player_a_id=1, player_b_id=2, season='2024-25', **fields)
+
+    def test_claims_the_oldest_pending_job_once(self):
+        first, second = self.job(), self.job()
+        claimed = claim_next()
+        self.assertEqual(claimed.id, first.id)
+        self.assertEqual((claimed.status, claimed.attempts), (CompareJob.RUNNING, 1))
+        self.assertEqual(claim_next().id, second.id)
+        self.assertIsNone(claim_next())
+
+    def test_claim_loses_to_a_job_claimed_meanwhile(self):
+        job = self.job()
+        # Another worker's UPDATE lands between our SELECT and our UPDATE
+        update = QuerySet.update
+
+        def claimed_first(queryset, **fields):
+            update(CompareJob.objects.filter(id=job.id), status=CompareJob.RUNNING, started_at=timezone.now())
+            return update(queryset, **fields)
+
+        with mock.patch.object(QuerySet, 'update', claimed_first):
+            self.assertIsNone(claim_next())
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 0)
+
+    @override_settings(H2H_JOB_TIMEOUT=60)
+    def test_reclaims_jobs_abandoned_by_a_dead_worker(self):
+        running = self.job(status=CompareJob.RUNNING, attempts=1, started_at=timezone.now())
+        self.assertIsNone(claim_next())
+        CompareJob.objects.filter(id=running.id).update(started_at=timezone.now() - timedelta(seconds=61))
+        claimed = claim_next()
+        self.assertEqual((claimed.id, claimed.attempts), (running.id, 2))
+
+    def test_either_order_shares_one_job(self):
+        job = enqueue(2, 1, '2024-25')
+        self.assertEqual((job.player_a_id, job.player_b_id), (1, 2))
+        self.assertEqual(enqueue(1, 2, '2024-25').id, job.id)
+        self.assertEqual(CompareJob.objects.count(), 1)
+
+    def test_workers_are_opt_in(self):
+        with mock.patch('h2hapi.jobs.threading.Thread') as thread:
+            enqueue(1, 2, '2024-25')
+        thread.assert_not_called()
+
+
+class CompareJobTests(CompareViewTestCase):
+
+    def test_job_answers_in_the_order_asked(self):
+        params = {'player_a_id': 2, 'player_b_id': 1, 'season': '2019-20'}
+        queued = Client().get('/api/compare/', {**params, 'mode': 'async'})
+        self.assertEqual(queued.status_code, 202)
+        self.assertTrue(queued['Location'].endswith('?mirrored=1'))
+        swapped = Client().get('/api/compare/', {**params, 'mode': 'async', 'player_a_id': 1, 'player_b_id': 2})
+        self.assertEqual(swapped.json()['job_id'], queued.json()['job_id'])
+        self.assertEqual(Client().get(queued['Location']).status_code, 202)
+
+        games = {1: {1: 10, 2: 20}, 2: {1: 5}}
+        with mock.patch.object(ComparePlayersView, 'fetch_season_stats', return_value=SEASON_STATS), \
+                mock.patch('h2hapi.views.fetch_gamelog', side_effect=lambda player_id, season: make_gamelog(player_id, season, games[player_id])):
+            run_job(claim_next())
+
+        body = Client().get(queued['Location']).json()
+        self.assertEqual((body['player_a_id'], body['player_b_id']), (2, 1))
+        self.assertEqual(body['h2h_stats']['player_a']['total_stats']['PTS'], 5)
+        self.assertEqual(Client().get(queued['Location'].split('?')[0]).json()['player_a_id'], 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TeamUpdaterTests(TestCase):
+
+    def setUp(self):
+        # Check the roster version on every record, not once a second
+        interval = mock.patch('h2hapi.teams.VERSION_CHECK_INTERVAL', 0)
+        interval.start()
+        self.addCleanup(interval.stop)
+        Player.objects.bulk_create([
+            Player(api_id=1, first_name='Nikola', last_name='Jokic', team_api_id=1610612743, team_abbreviation='DEN'),
+            Player(api_id=2, first_name='Jamal', last_name='Murray', team_api_id=1610612743, team_abbreviation='DEN'),
+        ])
+        bump_roster_version() # Bulk writes don't send post_save
+        self.updater = TeamUpdater(flush_delay=2.0)
+
+    def teams(self):
+        return dict(Player.objects.values_list('api_id', 'team_abbreviation'))
+
+    def test_unchanged_teams_are_not_written(self):
+        self.assertFalse(self.updater.record(1, 1610612743, 'DEN', flush=False))
+        self.assertFalse(self.updater.record(2, None, '', flush=False)) # Missing values keep what's stored
+        self.assertFalse(self.updater.record(99, 1610612747, 'LAL', flush=False)) # Not an active player
+        self.assertEqual(self.updater.skipped, 2)
+        self.assertEqual(self.updater.flush(), 0)
+
+    def test_changes_are_written_together(self):
+        with mock.patch('h2hapi.teams.threading.Timer') as timer:
+            self.assertTrue(self.updater.record(1, 1610612747, 'LAL'))
+            self.assertTrue(self.updater.record(2, 1610612738, 'BOS'))
+        # One timer for every change queued before it fires
+        timer.assert_called_once_with(2.0, self.updater._flush_later)
+        self.assertEqual(self.teams(), {1: 'DEN', 2: 'DEN'})
+        with self.assertNumQueries(3): # One UPDATE inside its savepoint
+            self.assertEqual(self.updater.flush(), 2)
+        self.assertEqual(self.teams(), {1: 'LAL', 2: 'BOS'})
+        self.assertEqual(self.updater.writes, 2)
+        # The snapshot already has the new teams
+        self.assertFalse(self.updater.record(1, 1610612747, 'LAL', flush=False))
+
+    def test_failed_flush_keeps_the_changes(self):
+        self.updater.record(1, 1610612747, 'LAL', flush=False)
+        with mock.patch.object(Player.objects, 'bulk_update', side_effect=RuntimeError("database is locked")):
+            with self.assertRaises(RuntimeError):
+                self.updater.flush()
+        self.assertEqual(self.updater.flush(), 1)
+        self.assertEqual(self.teams()[1], 'LAL')
+
+    def test_roster_changes_reload_the_snapshot(self):
+        self.assertFalse(self.updater.record(3, 1610612743, 'DEN', flush=False))
+        Player.objects.create(api_id=3, first_name='Christian', last_name='Braun')
+        self.assertTrue(self.updater.record(3, 1610612743, 'DEN', flush=False))
+
+    def test_apply_season_teams(self):
+        store_season_stats('2019-20', pd.DataFrame([
+            {'PLAYER_ID': 1, 'TEAM_ID': 1610612743, 'TEAM_ABBREVIATION': 'DEN', 'GP': 70},
+            {'PLAYER_ID': 2, 'TEAM_ID': 1610612738, 'TEAM_ABBREVIATION': 'BOS', 'GP': 70},
+        ]))
+        with mock.patch('h2hapi.teams.team_updater', self.updater):
+            self.assertEqual(apply_season_teams('2019-20'), 1)
+        self.assertEqual(self.teams(), {1: 'DEN', 2: 'BOS'})
+
+
+class SqlitePragmaTests(TestCase):
+
+    def test_new_connections_get_the_pragmas(self):
+        with override_settings(H2H_SQLITE_PRAGMAS={'cache_size': -4096, 'temp_store': 'memory', 'busy_timeout': 1234}):
+            connection = connections.create_connection('default')
+            self.addCleanup(connection.close)
+            with connection.cursor() as cursor:
+                pragmas = [cursor.execute(f"PRAGMA {name}").fetchone()[0] for name in ('cache_size', 'temp_store', 'busy_timeout')]
+        self.assertEqual(pragmas, [-4096, 2, 1234])
+
+    def test_statements(self):
+        self.assertEqual(pragma_statement('journal_mode', 'wal'), "PRAGMA journal_mode = WAL")
+        self.assertEqual(pragma_statement('mmap_size', 268435456), "PRAGMA mmap_size = 268435456")
+
+    def test_only_known_pragmas_and_values(self):
+        for name, value in [
+            ('key', 'secret'), # Not a pragma we set
+            ('journal_mode', 'WAL; DROP TABLE h2hapi_player'),
+            ('synchronous', 'SOMETIMES'),
+            ('busy_timeout', '20000; VACUUM'),
+            ('busy_timeout', True),
+            ('cache_size', 1.5),
+        ]:
+            with self.assertRaises(ImproperlyConfigured, msg=f"{name}={value!r}"):
+                pragma_statement(name, value)
+
+
+class RendererTests(SimpleTestCase):
+    DATA = {'count': np.int64(3), 'pct': np.float64('nan'), 'values': np.array([1.5, np.inf]), 1: np.float32(-np.inf)}
+
+    def test_numpy_and_nan(self):
+        expected = b'{"count":3,"pct":null,"values":[1.5,null],"1":null}'
+        self.assertEqual(dumps(self.DATA), expected)
+        with mock.patch('h2hapi.renderers.orjson', None):
+            self.assertEqual(dumps(self.DATA), expected)
+
+    def test_indented_output(self):
+        rendered = FastJSONRenderer().render(self.DATA, 'application/json; indent=2')
+        self.assertIn(b'\n  ', rendered)
+        self.assertEqual(json.loads(rendered), {'count': 3, 'pct': None, 'values': [1.5, None], '1': None})
+
+    def test_only_the_h2h_views_use_it(self):
+        self.assertEqual(api_settings.DEFAULT_RENDERER_CLASSES[0], JSONRenderer)
+        self.assertIs(ComparePlayersView.renderer_classes[0], FastJSONRenderer)
+
+    def test_select_fields(self):
+        stats = {"game_count": 1, "avg_stats": {}, "advanced_stats": {}, "total_stats": {}}
+        payload = {"player_a_id": 1, "season": "2019-20", "h2h_stats": {"player_a": stats}, "season_stats": {"player_a": stats}}
+        self.assertIs(select_fields(payload), payload)
+        self.assertEqual(
+            select_fields(payload, {'h2h_stats', 'avg_stats'}),
+            {"player_a_id": 1, "season": "2019-20", "h2h_stats": {"player_a": {"game_count": 1, "avg_stats": {}}}},
+        )
+        compact = select_fields(payload, compact=True)
+        self.assertEqual(set(compact["season_stats"]["player_a"]), {"game_count", "avg_stats", "advanced_stats"})
+
+
+class FieldSelectionTests(CompareViewTestCase):
+
+    def compare(self, **params):
+        with mock.patch.object(ComparePlayersView, 'fetch_season_stats', return_value=SEASON_STATS), \
+                mock.patch('h2hapi.views.fetch_gamelog', side_effect=lambda player_id, season: make_gamelog(player_id, season, {1: 10})):
+            return Client().get('/api/compare/', {'player_a_id': 1, 'player_b_id': 2, 'season': '2019-20', **params})
+
+    def test_fields(self):
+        response = self.compare(fields='h2h_stats,avg_stats')
+        body = response.json()
+        self.assertEqual(set(body), {'player_a_id', 'player_b_id', 'season', 'h2h_stats'})
+        self.assertEqual(set(body['h2h_stats']['player_a']), {'game_count', 'avg_stats'})
+        self.assertNotEqual(response['ETag'], self.compare()['ETag'])
+
+    def test_compact(self):
+        response = self.compare(compact='1')
+        self.assertNotIn(b'total_stats', response.content)
+        self.assertIn('season_stats', response.json())
+        self.assertIn(b'total_stats', self.compare().content)
+
+    def test_unknown_field(self):
+        response = self.compare(fields='h2h_stats,shoe_size')
+        self.assertEqual(response.status_code, 400)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def breaker(self, **options):
+        return CircuitBreaker('test', **{'window': 30, 'min_calls': 4, 'error_rate': 0.5, 'cooldown': 0.05, **options})
+
+    def fail(self, breaker, count):
+        for _ in range(count):
+            breaker.before_call()
+            breaker.record(False)
+
+    def test_too_few_calls_never_open_it(self):
+        breaker = self.breaker()
+        self.fail(breaker, 3)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_opens_at_the_error_rate(self):
+        breaker = self.breaker()
+        for ok in (True, True, False):
+            breaker.record(ok)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.record(False) # 2 of 4 failed
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        self.assertEqual(breaker.stats(), {"open": 1, "opened_total": 1, "rejected_total": 1})
+
+    def test_one_trial_call_after_the_cooldown(self):
+        breaker = self.breaker()
+        self.fail(breaker, 4)
+        time.sleep(0.06)
+        breaker.before_call()
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call() # Only one trial at a time
+        breaker.record(True)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_trial_reopens_it(self):
+        breaker = self.breaker()
+        self.fail(breaker, 4)
+        time.sleep(0.06)
+        breaker.before_call()
+        breaker.record(False)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(breaker.opened, 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class StaleWhileRevalidateTests(SimpleTestCase):
+
+    def setUp(self):
+        upstream_cache.shared.clear()
+        upstream_cache.clear_local()
+        self.addCleanup(upstream_cache.clear_local)
+        self.refreshes = upstream_cache.stats()["refreshes"]
+        self.refresh_failures = upstream_cache.stats()["refresh_failures"]
+
+    def wait_for_refresh(self):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            stats = upstream_cache.stats()
+            if stats["refreshes"] + stats["refresh_failures"] > self.refreshes + self.refresh_failures:
+                return
+            time.sleep(0.01)
+
+    def test_fresh_entries_are_not_refetched(self):
+        upstream_cache.set('swr:fresh', 'cached', 60, 60)
+        fetch = mock.Mock(return_value='new')
+        self.assertEqual(upstream_cache.get_or_set('swr:fresh', fetch, 60), 'cached')
+        fetch.assert_not_called()
+
+    def test_stale_entry_is_served_then_refreshed(self):
+        upstream_cache.set('swr:stale', 'old', 0, 60)
+        stale_keys = []
+        value = upstream_cache.get_or_set('swr:stale', lambda: 'new', 60, on_stale=stale_keys.append)
+        self.assertEqual(value, 'old')
+        self.assertEqual(stale_keys, ['swr:stale'])
+        self.wait_for_refresh()
+        self.assertEqual(upstream_cache.lookup('swr:stale'), ('new', False))
+
+    def test_failed_refresh_keeps_the_stale_entry(self):
+        upstream_cache.set('swr:failing', 'old', 0, 60)
+        upstream_cache.get_or_set('swr:failing', lambda: {'error': 'down'}, 60, cache_if=lambda value: 'error' not in value)
+        self.wait_for_refresh()
+        self.assertEqual(upstream_cache.stats()["refresh_failures"], self.refresh_failures + 1)
+        self.assertEqual(upstream_cache.lookup('swr:failing'), ('old', True))
+
+    def test_results_cache_if_rejects_are_returned_but_not_stored(self):
+        value = upstream_cache.get_or_set('swr:error', lambda: {'error': 'down'}, 60, cache_if=lambda value: 'error' not in value)
+        self.assertEqual(value, {'error': 'down'})
+        self.assertIs(upstream_cache.get('swr:error'), MISSING)
+
+
+class H2HTimelineTests(SimpleTestCase):
+    season = '2019-20'
+
+    def setUp(self):
+        # Five meetings, three in October (games 1-3) and two in November (12, 13).
+        # Player A is away in games 2 and 12 and loses 3 and 13. Game 5 isn't shared
+        self.gamelog_a = make_gamelog(1, self.season, {1: 10, 2: 20, 3: 30, 5: 99, 12: 40, 13: 50})
+        self.gamelog_b = make_gamelog(2, self.season, {1: 1, 2: 2, 3: 3, 12: 4, 13: 5})
+        by_game = self.gamelog_a['Game_ID'].str[-2:].astype(int)
+        self.gamelog_a.loc[by_game.isin([2, 12]), 'MATCHUP'] = 'DEN @ SAS'
+        self.gamelog_a.loc[by_game.isin([3, 13]), 'WL'] = 'L'
+        self.timeline = H2HTimeline(self.gamelog_a, self.gamelog_b)
+        self.pts_a = self.timeline.columns_a.index('PTS')
+        self.pts_b = self.timeline.columns_b.index('PTS')
+
+    def points(self, totals):
+        counts, totals_a, totals_b = totals
+        return np.asarray(counts).tolist(), totals_a[..., self.pts_a].tolist(), totals_b[..., self.pts_b].tolist()
+
+    def test_meetings_are_in_date_order(self):
+        self.assertEqual(self.timeline.count, 5)
+        self.assertEqual(self.timeline.values_a[:, self.pts_a].tolist(), [10, 20, 30, 40, 50])
+
+    def test_range_totals(self):
+        self.assertEqual(self.points(self.timeline.totals(0, 5)), (5, 150, 15))
+        self.assertEqual(self.points(self.timeline.totals(1, 3)), (2, 50, 5))
+        self.assertEqual(self.points(self.timeline.totals(2, 2)), (0, 0, 0))
+        self.assertEqual(self.points(self.timeline.totals(np.array([0, 3]), np.array([3, 5]))), ([3, 2], [60, 90], [6, 9]))
+
+    def test_splits(self):
+        self.assertEqual(self.points(self.timeline.totals(0, 5, 'home')), (3, 90, 9))
+        self.assertEqual(self.points(self.timeline.totals(0, 5, 'away')), (2, 60, 6))
+        self.assertEqual(self.points(self.timeline.totals(0, 5, 'wins')), (3, 70, 7))
+        self.assertEqual(self.points(self.timeline.totals(0, 5, 'losses')), (2, 80, 8))
+        self.assertEqual(self.points(self.timeline.totals(3, 5, 'away')), (1, 40, 4))
+
+    def test_rolling_windows(self):
+        self.assertEqual(self.points(self.timeline.rolling(2)), ([1, 2, 2, 2, 2], [10, 30, 50, 70, 90], [1, 3, 5, 7, 9]))
+        self.assertEqual(self.points(self.timeline.rolling(1))[1], [10, 20, 30, 40, 50])
+        # A window longer than the meetings covers every game so far
+        self.assertEqual(self.points(self.timeline.rolling(10))[1], [10, 30, 60, 100, 150])
+
+    def test_month_bounds(self):
+        months, starts, ends = self.timeline.month_bounds()
+        self.assertEqual((months, starts.tolist(), ends.tolist()), (['2019-10', '2019-11'], [0, 3], [3, 5]))
+
+    def test_to_dict(self):
+        timeline = self.timeline.to_dict(window=2)
+        self.assertEqual((timeline['meetings'], timeline['window']), (5, 2))
+        self.assertEqual([game['game_date'] for game in timeline['games']][:2], ['2019-10-21', '2019-10-22'])
+        self.assertEqual(timeline['games'][1]['matchup'], 'DEN @ SAS')
+        self.assertEqual(timeline['games'][4]['rolling']['player_a']['total_stats']['PTS'], 90)
+        self.assertEqual(timeline['last']['player_a']['game_count'], 2)
+        self.assertEqual(timeline['last']['player_b']['total_stats']['PTS'], 9)
+        self.assertEqual(timeline['splits']['home']['player_a']['total_stats']['PTS'], 90)
+        self.assertEqual(timeline['splits']['by_month']['2019-11']['player_a']['avg_stats']['PTS'], 45.0)
+        october = timeline['splits']['by_month']['2019-10']
+        self.assertEqual(october['player_a'], compute_h2h(self.gamelog_a.iloc[-3:], self.gamelog_b)['player_a'])
+        self.assertEqual(october['player_b'], compute_h2h(self.gamelog_b.iloc[-3:], self.gamelog_a)['player_a'])
+
+    def test_empty_split(self):
+        gamelog_a = make_gamelog(1, self.season, {1: 10})
+        splits = H2HTimeline(gamelog_a, make_gamelog(2, self.season, {1: 1})).to_dict()['splits']
+        no_games = {"game_count": 0, "error": "No H2H Games Found."}
+        self.assertEqual(splits['losses'], {"player_a": no_games, "player_b": no_games})
+        self.assertEqual(splits['wins']['player_a']['total_stats']['PTS'], 10)
+
+    def test_no_meetings(self):
+        expected = {"meetings": 0, "error": "No H2H Games Found."}
+        self.assertEqual(H2HTimeline(self.gamelog_a, make_gamelog(2, self.season, {7: 1})).to_dict(), expected)
+        self.assertEqual(H2HTimeline(self.gamelog_a, pd.DataFrame()).to_dict(), expected)
+
+
+class H2HTimelineViewTests(CompareViewTestCase):
+
+    def compare(self, **params):
+        games = {1: {1: 10, 2: 20, 3: 30}, 2: {1: 1, 2: 2, 3: 3}}
+        with mock.patch.object(ComparePlayersView, 'fetch_season_stats', return_value=SEASON_STATS), \
+                mock.patch('h2hapi.views.fetch_gamelog', side_effect=lambda player_id, season: make_gamelog(player_id, season, games[player_id])):
+            return Client().get('/api/compare/', {'player_a_id': 1, 'player_b_id': 2, 'season': '2019-20', **params})
+
+    def test_timeline(self):
+        self.assertNotIn('h2h_timeline', self.compare().json())
+        timeline = self.compare(timeline='1', window=2).json()['h2h_timeline']
+        self.assertEqual((timeline['meetings'], timeline['window']), (3, 2))
+        self.assertEqual(timeline['last']['player_a']['total_stats']['PTS'], 50)
+        self.assertEqual(self.compare(timeline='1', window=0).status_code, 400)
@@ -0,0 +1,120 @@
+from contextlib import contextmanager
+from django.conf import settings
+from email.utils import parsedate_to_datetime
+from nba_api.stats.library.http import NBAStatsHTTP
+from requests.adapters import HTTPAdapter
+import random
+import requests
+import time
+
+from .circuit import nba_circuit
+from .metrics import span, upstream_call, upstream_retries
+from .ratelimit import nba_rate_limiter
+
+# Responses worth another try: throttling and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def retry_after(response):
+    # Seconds the server asked us to wait, 0 when it didn't say
+    value = response.headers.get('Retry-After')
+    if not value:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class UpstreamSession(requests.Session):
+    # Pooled keep-alive session for stats.nba.com with our own timeouts and
+    # jittered exponential backoff. Retries are done here instead of by urllib3
+    # so that every retry waits its turn on the shared rate limiter too
+
+    def __init__(self, timeout=(3.05, 20), retries=3, backoff=0.5, max_backoff=8.0, pool_size=8):
+        super().__init__()
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+        self.headers.update({'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+
+    def backoff_delay(self, attempt):
+        # "Full jitter": anywhere from 0 to the exponential cap, so clients that
+        # failed together don't all retry together
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def request(self, method, url, **kwargs):
+        # nba_api endpoints always pass their own 30s timeout, which is far too
+        # long to hold a request thread, so ours wins
+        kwargs['timeout'] = self.timeout
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                response = super().request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last_attempt:
+                    raise
+                reason = type(e).__name__
+                delay = self.backoff_delay(attempt)
+            else:
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    return response
+                reason = str(response.status_code)
+                delay = min(self.max_backoff, max(self.backoff_delay(attempt), retry_after(response)))
+                response.close()
+
+            print(f"Retrying {url} after {reason} in {delay:.2f}s ({attempt + 1}/{self.retries})")
+            upstream_retries.inc(reason)
+            time.sleep(delay)
+            with span('ratelimit'):
+                nba_rate_limiter.acquire()
+
+
+@contextmanager
+def upstream_request(endpoint):
+    # Wraps every stats.nba.com call: fails fast with CircuitOpenError while
+    # the circuit is open, otherwise waits for a rate limiter token, then times
+    # and counts the call and feeds its outcome back to the circuit breaker.
+    # The wait is its own "ratelimit" stage of the request making the call
+    nba_circuit.before_call()
+    ok = False
+    try:
+        with span('ratelimit'):
+            nba_rate_limiter.acquire()
+        with upstream_call(endpoint):
+            yield
+        ok = True
+    finally:
+        nba_circuit.record(ok)
+
+
+def build_session():
+    return UpstreamSession(
+        timeout=(
+            getattr(settings, 'H2H_UPSTREAM_CONNECT_TIMEOUT', 3.05),
+            getattr(settings, 'H2H_UPSTREAM_READ_TIMEOUT', 20),
+        ),
+        retries=getattr(settings, 'H2H_UPSTREAM_RETRIES', 3),
+        backoff=getattr(settings, 'H2H_UPSTREAM_BACKOFF', 0.5),
+        max_backoff=getattr(settings, 'H2H_UPSTREAM_MAX_BACKOFF', 8.0),
+        pool_size=getattr(settings, 'H2H_FETCH_WORKERS', 8),
+    )
+
+
+def install_session():
+    # Every nba_api stats endpoint shares NBAStatsHTTP's session, so this one
+    # call covers PlayerCareerStats, PlayerGameLog and the league endpoints
+    NBAStatsHTTP.set_session(build_session())
+    base_url = getattr(settings, 'H2H_NBA_STATS_URL', None)
+    if base_url:
+        # Points every endpoint somewhere else, e.g. the run_stub_upstream server
+        NBAStatsHTTP.base_url = base_url.rstrip('/') + '/{endpoint}'
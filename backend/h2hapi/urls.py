@@ -3,5 +3,9 @@ from . import views
 
 urlpatterns = [
     path('players/', views.PlayerListView.as_view(), name='player-list'),
+    path('players/search/', views.PlayerSearchView.as_view(), name='player-search'),
     path('compare/', views.ComparePlayersView.as_view(), name='player-compare'),
+    path('compare/jobs/<uuid:job_id>/', views.CompareJobView.as_view(), name='player-compare-job'),
+    path('compare/batch/', views.BatchCompareView.as_view(), name='player-compare-batch'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
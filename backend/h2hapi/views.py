@@ -1,35 +1,164 @@
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404, render
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import http_date
 from rest_framework.generics import ListAPIView
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticatedOrReadOnly
 from rest_framework.authentication import SessionAuthentication, BasicAuthentication
-from .models import Player
-from .serializers import PlayerSerializer, ComparisonRequestSerializer
-import time
+from .models import CompareJob, Player
+from .serializers import (
+    PlayerSerializer, PlayerSearchRequestSerializer,
+    ComparisonRequestSerializer, BatchComparisonRequestSerializer, JobPollSerializer,
+)
+from .gamelogs import fetch_gamelog, gamelog_failed, load_gamelog, store_gamelog
+from .headtohead import load_h2h
+from .columnar import H2H_COLUMNS, read_gamelog, write_gamelog
+from .aggregation import GamelogArrays, H2HTimeline, aggregate_gamelog, compute_h2h, compute_pairs
+from .seasonstats import load_season_stats
+from .requestlog import record_request
+from .search import search_players
+from .cache import MISSING, upstream_cache, season_timeout
+from .jobs import enqueue
+from .concurrency import submit
+from .metrics import Timings, render_metrics, span
+from .renderers import RENDERER_CLASSES, FastJSONRenderer, dumps
+from .responses import (
+    etag_matches, mirror_comparison, not_modified_since, payload_etag,
+    season_cache_control, select_fields, selection_suffix,
+)
+from .signals import get_roster_version
+from .teams import team_updater
+from .upstream import upstream_request
+from .seasons import CURRENT_SEASON, format_season
+from concurrent.futures import as_completed
+from itertools import combinations
+import gzip
+import hashlib
 import pandas as pd
-import json
-import requests
 
 # Create your views here.
-from nba_api.stats.endpoints import leaguedashplayerstats
-from nba_api.stats.endpoints import playergamelog
 from nba_api.stats.endpoints import playercareerstats
 
-CURRENT_SEASON = "2025-26"
-
 class PlayerListView(ListAPIView):
     # Lists all active players for the search box
     
     permission_classes = [IsAuthenticatedOrReadOnly]
+    renderer_classes = RENDERER_CLASSES
     
     queryset = Player.objects.all().order_by('last_name') # Gets all players from the database
     serializer_class = PlayerSerializer
+    
+    def list(self, request, *args, **kwargs):
+        # The browsable API still goes through DRF, JSON clients get the cached bytes
+        if request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        
+        # The roster only changes when populate_players runs, so serialize it once per version
+        version = get_roster_version()
+        entry = upstream_cache.get_or_set(
+            upstream_cache.make_key("players", version),
+            lambda: self.build_roster_entry(version),
+        )
+        
+        # Each encoding gets its own strong ETag, either one revalidates
+        use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+        headers = {
+            "ETag": entry["gzip_etag"] if use_gzip else entry["etag"],
+            "Last-Modified": entry["last_modified"],
+            "Cache-Control": "public, max-age=0, must-revalidate",
+            "Vary": "Accept-Encoding",
+        }
+        if (etag_matches(request, entry["etag"]) or etag_matches(request, entry["gzip_etag"])
+                or not_modified_since(request, entry["modified_at"])):
+            response = HttpResponseNotModified()
+        elif use_gzip:
+            response = HttpResponse(entry["gzip"], content_type="application/json")
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(entry["body"], content_type="application/json")
+        
+        for name, value in headers.items():
+            response[name] = value
+        return response
+    
+    def build_roster_entry(self, version):
+        body = FastJSONRenderer().render(self.get_serializer(self.get_queryset(), many=True).data)
+        modified_at = int(version) // 1_000_000_000 # Versions are time.time_ns() stamps
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        return {
+            "body": body,
+            "gzip": gzip.compress(body),
+            "etag": f'"{digest}"',
+            "gzip_etag": f'"{digest}-gzip"',
+            "modified_at": modified_at,
+            "last_modified": http_date(modified_at),
+        }
+
+class PlayerSearchView(APIView):
+    # Typeahead search over active players, served from the in-memory prefix index
+    
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    renderer_classes = RENDERER_CLASSES
+    
+    def get(self, request, *args, **kwargs):
+        
+        serializer = PlayerSearchRequestSerializer(data=request.query_params)
+        
+        if not serializer.is_valid():
+            return Response({"error": serializer.errors}, status=400)
+        
+        validated_data = serializer.validated_data
+        return Response(search_players(validated_data['q'], validated_data['limit']), status=200)
 
 class ComparePlayersView(APIView):
     
     authentication_classes = [SessionAuthentication, BasicAuthentication]
     permission_classes = [AllowAny]
+    renderer_classes = RENDERER_CLASSES
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # DRF builds a view instance per request, so spans are per request too
+        self.timings = Timings()
+        self.timings_token = None
+        self.fields = None # ?fields= and ?compact=1, see select_fields
+        self.compact = False
+        self.timeline_window = None # ?timeline=1, see H2HTimeline
+        self.stale_keys = [] # Cache entries served past their TTL, see mark_stale
+    
+    def set_selection(self, validated_data):
+        self.fields = validated_data.get('fields')
+        self.compact = validated_data.get('compact', False)
+        self.timeline_window = validated_data['window'] if validated_data.get('timeline') else None
+    
+    def select(self, payload):
+        return select_fields(payload, self.fields, self.compact)
+    
+    def mark_stale(self, key):
+        # Called by the cache when it answered with an entry that's being refreshed
+        self.stale_keys.append(key)
+    
+    def stale_response(self, response_data, headers):
+        # Stale answers say so and shouldn't be kept by clients
+        headers["Cache-Control"] = "no-cache"
+        return {**response_data, "stale": True}
+    
+    def initial(self, request, *args, **kwargs):
+        # Spans from here on, including the fetch pool's, are this request's
+        self.timings_token = self.timings.activate()
+        super().initial(request, *args, **kwargs)
+    
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.timings_token is not None:
+            # A streamed body and background refreshes run after this, outside the request
+            self.timings.deactivate(self.timings_token)
+            self.timings_token = None
+        response['Server-Timing'] = self.timings.server_timing()
+        self.timings.log(type(self).__name__, request.path, response.status_code)
+        return response
     
     def get(self, request, *args, **kwargs):
         
@@ -42,91 +171,314 @@ class ComparePlayersView(APIView):
         player_a_id = validated_data['player_a_id']
         player_b_id = validated_data['player_b_id']
         raw_season = validated_data['season']
+        self.set_selection(validated_data)
+        
+        if 'seasons' in validated_data or validated_data['career']:
+            return self.get_multi_season(request, validated_data)
         
         
         # Format the season
-        if len(raw_season) == 9 and raw_season[4] =='-':
-            formatted_season = raw_season[:5] + raw_season[-2:] # Format the season from 2024-2025 to 2024-25
-        else:
-            formatted_season = raw_season
+        formatted_season = format_season(raw_season)
         
         print(f"Comparing {player_a_id} vs {player_b_id} for {formatted_season}")
+        record_request(player_a_id, player_b_id, formatted_season)
+        
+        # Job mode: anything not cached yet is handed to the job workers so this
+        # web worker is free again right away
+        if validated_data['mode'] == 'async':
+            key = self.comparison_key(player_a_id, player_b_id, formatted_season)
+            entry, stale = upstream_cache.lookup(key)
+            if entry is MISSING:
+                return self.queue_comparison(player_a_id, player_b_id, formatted_season)
+            if stale:
+                # Answer now, a job worker refreshes it
+                self.mark_stale(key)
+                enqueue(player_a_id, player_b_id, formatted_season)
+            return self.comparison_response(request, entry, player_a_id, player_b_id, formatted_season)
         
         try:
+            entry = self.get_comparison(player_a_id, player_b_id, formatted_season)
+        except Exception as e:
+            # general error handler
+            print(f"Error in 'get' method: {e}")
+            return Response(
+                {"error": f"An error occurred while fetching data: {str(e)}"},
+                status=500
+            )
+        
+        return self.comparison_response(request, entry, player_a_id, player_b_id, formatted_season)
+    
+    def comparison_response(self, request, entry, player_a_id, player_b_id, formatted_season):
+        # Cached payloads are stored lower ID first, flip them back if needed
+        response_data = entry["payload"]
+        etag = entry["etag"]
+        if player_a_id > player_b_id:
+            response_data = mirror_comparison(response_data)
+            etag = f'{etag}-ba'
+        if self.timeline_window:
+            # Built per request in the requested order, so it's never mirrored
+            timeline = self.get_timeline(player_a_id, player_b_id, formatted_season)
+            response_data = {**response_data, "h2h_timeline": timeline}
+            etag = f'{etag}-{payload_etag(timeline)[:8]}'
+        response_data = self.select(response_data)
+        stale = entry.get("stale") or self.stale_keys
+        etag = f'"{etag}{selection_suffix(self.fields, self.compact)}{"-stale" if stale else ""}"'
+        
+        headers = {
+            "ETag": etag,
+            "Cache-Control": season_cache_control(formatted_season),
+        }
+        if stale:
+            response_data = self.stale_response(response_data, headers)
+        if etag_matches(request, etag):
+            return Response(status=304, headers=headers)
+        
+        return Response(response_data, status=200, headers=headers)
+    
+    def get_multi_season(self, request, validated_data):
+        # H2H across a range of seasons (or both careers), plus a per-season breakdown
+        player_a_id = validated_data['player_a_id']
+        player_b_id = validated_data['player_b_id']
+        
+        try:
+            if validated_data['career']:
+                seasons = self.get_shared_seasons(player_a_id, player_b_id)
+            else:
+                seasons = validated_data['seasons']
             
-           # Get Season Stats
-            print(f"Fetching season stats for Player A ({player_a_id})...")
-            season_stats_a = self.get_season_stats(player_a_id, formatted_season)
-            
-            print(f"Fetching season stats for Player B ({player_b_id})...")
-            season_stats_b = self.get_season_stats(player_b_id, formatted_season)
+            print(f"Comparing {player_a_id} vs {player_b_id} across {len(seasons)} seasons")
+            response_data = self.build_multi_season_comparison(player_a_id, player_b_id, seasons)
+        except Exception as e:
+            print(f"Error in 'get_multi_season' method: {e}")
+            return Response(
+                {"error": f"An error occurred while fetching data: {str(e)}"},
+                status=500
+            )
+        
+        response_data = self.select(response_data)
+        etag = f'"{payload_etag(response_data)}"'
+        headers = {
+            "ETag": etag,
+            # Only the latest season in the range can still change
+            "Cache-Control": season_cache_control(seasons[-1] if seasons else CURRENT_SEASON),
+        }
+        if self.stale_keys:
+            response_data = self.stale_response(response_data, headers)
+        if etag_matches(request, etag):
+            return Response(status=304, headers=headers)
+        
+        return Response(response_data, status=200, headers=headers)
+    
+    def build_multi_season_comparison(self, player_a_id, player_b_id, seasons):
+        # Every (player, season) gamelog is fetched in parallel on the shared pool.
+        # Each fetch still waits on the rate limiter, and finished seasons come
+        # from the cache or the local stores, so only the current season goes upstream
+        futures = {
+            (player_id, season): submit(self.get_player_gamelog, player_id, season)
+            for season in seasons
+            for player_id in (player_a_id, player_b_id)
+        }
+        gamelogs = {key: future.result() for key, future in futures.items()}
+        
+        with span("compute_h2h"):
+            arrays = {key: GamelogArrays(gamelog) for key, gamelog in gamelogs.items()}
+            pairs = [((player_a_id, season), (player_b_id, season)) for season in seasons]
+            by_season = compute_pairs(arrays, pairs)
             
+            # Game IDs are unique across seasons, so one H2H over the joined gamelogs
+            # covers every shared game in the range
+            gamelog_a = self.join_gamelogs([gamelogs[(player_a_id, season)] for season in seasons])
+            gamelog_b = self.join_gamelogs([gamelogs[(player_b_id, season)] for season in seasons])
+            h2h_stats = self.compute_h2h_stats(gamelog_a, gamelog_b)
+        
+        with span("player_details"):
+            details_a = self.get_player_details(player_a_id)
+            details_b = self.get_player_details(player_b_id)
+        
+        response_data = {
+            "player_a_id": player_a_id,
+            "player_b_id": player_b_id,
+            "seasons": seasons,
+            "player_a_details": details_a,
+            "player_b_details": details_b,
+            "h2h_stats": h2h_stats,
+            "by_season": [
+                {"season": season, "h2h_stats": by_season[pair]}
+                for season, pair in zip(seasons, pairs)
+            ],
+        }
+        if self.timeline_window:
+            with span("h2h_timeline"):
+                response_data["h2h_timeline"] = H2HTimeline(gamelog_a, gamelog_b).to_dict(self.timeline_window)
+        return response_data
+    
+    def join_gamelogs(self, gamelogs):
+        gamelogs = [gamelog for gamelog in gamelogs if not gamelog.empty]
+        if not gamelogs:
+            return pd.DataFrame()
+        # A game can only count once, even if two seasons' stores overlap
+        return pd.concat(gamelogs, ignore_index=True).drop_duplicates('Game_ID')
+    
+    def get_timeline(self, player_a_id, player_b_id, season):
+        # Every shared game with rolling and split aggregates. The gamelogs are
+        # cached, so this is one pass over them even when the compare was too
+        gamelog_a_future = submit(self.get_player_gamelog, player_a_id, season)
+        gamelog_b_future = submit(self.get_player_gamelog, player_b_id, season)
+        gamelog_a = gamelog_a_future.result()
+        gamelog_b = gamelog_b_future.result()
+        
+        with span("h2h_timeline"):
+            return H2HTimeline(gamelog_a, gamelog_b).to_dict(self.timeline_window)
+    
+    def get_shared_seasons(self, player_a_id, player_b_id):
+        # Seasons both players appeared in, oldest first
+        seasons_a_future = submit(self.get_career_seasons, player_a_id)
+        seasons_b_future = submit(self.get_career_seasons, player_b_id)
+        return sorted(set(seasons_a_future.result()) & set(seasons_b_future.result()))
+    
+    def get_career_seasons(self, player_id):
+        # A career only grows when the current season does, so it shares its TTL
+        return upstream_cache.get_or_set(
+            upstream_cache.make_key("career_seasons", player_id),
+            lambda: self.fetch_career_seasons(player_id),
+            timeout=season_timeout(CURRENT_SEASON),
+            cache_if=lambda seasons: bool(seasons),
+            on_stale=self.mark_stale,
+        )
+    
+    def fetch_career_seasons(self, player_id):
+        print(f"Fetching career seasons for {player_id}...")
+        
+        try:
+            with upstream_request('PlayerCareerStats'):
+                stats_df = playercareerstats.PlayerCareerStats(player_id=player_id).get_data_frames()[0]
+        except Exception as e:
+            print(f"Error fetching career seasons for {player_id}: {e}")
+            return []
+        
+        if stats_df.empty:
+            return []
+        # Traded players have one row per team plus a TOT row, each season counts once
+        return sorted(set(stats_df['SEASON_ID']))
+    
+    def queue_comparison(self, player_a_id, player_b_id, season):
+        job = enqueue(player_a_id, player_b_id, season)
+        status_url = reverse('player-compare-job', args=[job.id])
+        if (player_a_id, player_b_id) != (job.player_a_id, job.player_b_id):
+            status_url += '?mirrored=1' # The job is kept lower ID first
+        return Response(
+            {"job_id": str(job.id), "status": job.status, "status_url": status_url},
+            status=202,
+            headers={"Location": status_url, "Retry-After": "1"},
+        )
+    
+    def comparison_key(self, player_a_id, player_b_id, season):
+        # A-vs-B and B-vs-A share one cache entry, keyed lower player ID first
+        low_id, high_id = sorted((player_a_id, player_b_id))
+        return upstream_cache.make_key("compare", low_id, high_id, season)
+    
+    def get_comparison(self, player_a_id, player_b_id, season):
+        low_id, high_id = sorted((player_a_id, player_b_id))
+        return upstream_cache.get_or_set(
+            self.comparison_key(low_id, high_id, season),
+            lambda: self.build_comparison_entry(low_id, high_id, season),
+            timeout=season_timeout(season),
+            # Don't keep payloads built while upstream was failing, or from stale parts
+            cache_if=lambda entry: entry["complete"] and not entry["stale"],
+            on_stale=self.mark_stale,
+        )
+    
+    def build_comparison_entry(self, player_a_id, player_b_id, season):
+        # Its own stale and failure lists, a background refresh must not see the request's
+        stale_keys = []
+        failed = []
+        payload = self.build_comparison(
+            player_a_id, player_b_id, season, on_stale=stale_keys.append, on_failure=failed.append,
+        )
+        season_stats = payload["season_stats"]
+        return {
+            "payload": payload,
+            "etag": payload_etag(payload),
+            # A failed gamelog fetch looks like "No H2H Games Found.", which finished
+            # seasons would otherwise cache forever
+            "complete": not failed and "error" not in season_stats["player_a"] and "error" not in season_stats["player_b"],
+            "stale": bool(stale_keys),
+        }
+    
+    def build_comparison(self, player_a_id, player_b_id, formatted_season, on_stale=None, on_failure=None):
+        # Fetches everything for one compare and assembles the response payload
+        
+        # Start the upstream fetches at once, they don't depend on each other
+        print(f"Fetching season stats for {player_a_id} and {player_b_id}...")
+        season_stats_a_future = submit(self.get_season_stats, player_a_id, formatted_season, on_stale)
+        season_stats_b_future = submit(self.get_season_stats, player_b_id, formatted_season, on_stale)
+        
+        # Precomputed H2H stats skip the gamelogs entirely
+        with span("h2h_matrix"):
+            h2h_stats = load_h2h(player_a_id, player_b_id, formatted_season)
+        if h2h_stats is None:
+            print(f"Fetching full gamelogs for {player_a_id} and {player_b_id}...")
+            gamelog_a_future = submit(self.get_player_gamelog, player_a_id, formatted_season, on_stale)
+            gamelog_b_future = submit(self.get_player_gamelog, player_b_id, formatted_season, on_stale)
+        
+        # Get Season Stats
+        season_stats_a = season_stats_a_future.result()
+        season_stats_b = season_stats_b_future.result()
+        
+        if h2h_stats is None:
             # Get Gamelogs
-            print(f"Fetching full gamelog for Player A ({player_a_id})...")
-            gamelog_a = self.get_player_gamelog(player_a_id, formatted_season)
-            
-            print(f"Fetching full gamelog for Player B ({player_b_id})...")
-            gamelog_b = self.get_player_gamelog(player_b_id, formatted_season)
+            gamelog_a = gamelog_a_future.result()
+            gamelog_b = gamelog_b_future.result()
+            if on_failure is not None:
+                for player_id, gamelog in ((player_a_id, gamelog_a), (player_b_id, gamelog_b)):
+                    if gamelog_failed(gamelog):
+                        on_failure(player_id)
             
             # Compute H2H Stats
             print("Computing H2H stats...")
-            h2h_stats = self.compute_h2h_stats(gamelog_a, gamelog_b)
+            with span("compute_h2h"):
+                h2h_stats = self.compute_h2h_stats(gamelog_a, gamelog_b)
 
-            # Get player details
+        # Get player details
+        with span("player_details"):
             details_a = self.get_player_details(player_a_id)
             details_b = self.get_player_details(player_b_id)
+    
+        # Build Response
+        response_data = {
+            "player_a_id": player_a_id,
+            "player_b_id": player_b_id,
+            "season": formatted_season,
+            "player_a_details": {
+                **details_a, 
+                "team_id": season_stats_a.get("team_id"),
+                "team_abbreviation": season_stats_a.get("team_abbreviation"),
+            },
+            "player_b_details": {
+                **details_b,
+                "team_id": season_stats_b.get("team_id"),
+                "team_abbreviation": season_stats_b.get("team_abbreviation"),
+            },
+            "season_stats": {
+                "player_a": season_stats_a,
+                "player_b": season_stats_b,
+            }, 
+            "h2h_stats": h2h_stats # We will do H2H next
+        }
         
-            # Build Response
-            response_data = {
-                "player_a_id": player_a_id,
-                "player_b_id": player_b_id,
-                "season": formatted_season,
-                "player_a_details": {
-                    **details_a, 
-                    "team_id": season_stats_a.get("team_id"),
-                    "team_abbreviation": season_stats_a.get("team_abbreviation"),
-                },
-                "player_b_details": {
-                    **details_b,
-                    "team_id": season_stats_b.get("team_id"),
-                    "team_abbreviation": season_stats_b.get("team_abbreviation"),
-                },
-                "season_stats": {
-                    "player_a": season_stats_a,
-                    "player_b": season_stats_b,
-                }, 
-                "h2h_stats": h2h_stats # We will do H2H next
-            }
-            
-            # Update Dictionary for Player A
-            update_data_a = {}
-            if season_stats_a.get("team_id"):
-                update_data_a['team_api_id'] = season_stats_a.get("team_id")
-            if season_stats_a.get("team_abbreviation"):
-                update_data_a['team_abbreviation'] = season_stats_a.get("team_abbreviation")
-            # Only update if there's new data
-            if update_data_a:
-                Player.objects.filter(api_id=player_a_id).update(**update_data_a)
-             
-            # Update Dictionary for Player B   
-            update_data_b = {}
-            if season_stats_b.get("team_id"):
-                update_data_b['team_api_id'] = season_stats_b.get("team_id")
-            if season_stats_b.get("team_abbreviation"):
-                update_data_b['team_abbreviation'] = season_stats_b.get("team_abbreviation")
-
-            if update_data_b:
-                Player.objects.filter(api_id=player_b_id).update(**update_data_b)
-            
-            print("All data fetched successfully")
-            return Response(response_data, status=200)
-        except Exception as e:
-            # general error handler
-            print(f"Error in 'get' method: {e}")
-            return Response(
-                {"error": f"An error occurred while fetching data: {str(e)}"},
-                status=500
-            )
+        with span("player_update"):
+            self.update_player_teams(player_a_id, player_b_id, formatted_season, season_stats_a, season_stats_b)
+        
+        print("All data fetched successfully")
+        return response_data
+    
+    def update_player_teams(self, player_a_id, player_b_id, season, season_stats_a, season_stats_b):
+        # Player holds the current team, so older seasons never touch it. Unchanged
+        # teams are answered from memory and changes are written behind the request
+        if season != CURRENT_SEASON:
+            return
+        team_updater.record(player_a_id, season_stats_a.get("team_id"), season_stats_a.get("team_abbreviation"))
+        team_updater.record(player_b_id, season_stats_b.get("team_id"), season_stats_b.get("team_abbreviation"))
             
     def get_player_details(self, player_id):
         # gets players' names and teams
@@ -139,18 +491,38 @@ class ComparePlayersView(APIView):
         except Player.DoesNotExist:
             return {"error": "Player not found in local DB"}
     
-    def get_season_stats(self, player_id, season):
+    def get_season_stats(self, player_id, season, on_stale=None):
+        # Season stats go through the tiered cache, errors are never cached.
+        # Timed here on the pool thread, so the span is the fetch itself
+        with span("season_stats"):
+            return upstream_cache.get_or_set(
+                upstream_cache.make_key("season_stats", player_id, season),
+                lambda: self.fetch_season_stats(player_id, season),
+                timeout=season_timeout(season),
+                cache_if=lambda stats: "error" not in stats,
+                on_stale=on_stale or self.mark_stale,
+            )
+    
+    def fetch_season_stats(self, player_id, season):
         
-        print(f"Fetching Fetching PlayerCareerStats for {player_id} in {season}...")
-        time.sleep(1.1) 
+        # The league-wide snapshot answers without an upstream call
+        try:
+            total_stats = load_season_stats(player_id, season)
+            if total_stats is not None:
+                return self.summarize_season_stats(total_stats)
+        except Exception as e:
+            print(f"Error reading season stats snapshot for {player_id}: {e}")
         
+        # Fall back to the player's career table
+        print(f"Fetching PlayerCareerStats for {player_id} in {season}...")
         try:
-            # API Call
-            career_stats_endpoint = playercareerstats.PlayerCareerStats(
-                player_id=player_id,
-            )
-            
-            stats_df = career_stats_endpoint.get_data_frames()[0]
+            # API Call, waits only when the shared upstream budget is used up
+            with upstream_request('PlayerCareerStats'):
+                career_stats_endpoint = playercareerstats.PlayerCareerStats(
+                    player_id=player_id,
+                )
+                
+                stats_df = career_stats_endpoint.get_data_frames()[0]
             
             if stats_df.empty:
                 return {"game_count": 0, "error": "No career stats found for player."}
@@ -164,101 +536,15 @@ class ComparePlayersView(APIView):
             # Get the first (and only) row for that season
             total_stats = season_stats_series.iloc[0]
 
-            # Calculate Advanced Stats
-            try:
-                efg_pct = (total_stats['FGM'] + 0.5 * total_stats['FG3M']) / total_stats['FGA']
-            except ZeroDivisionError:
-                efg_pct = 0
-                
-            try:
-                tsp_pct = total_stats['PTS'] / (2 * (total_stats['FGA'] + 0.44 * total_stats['FTA']))
-            except ZeroDivisionError:
-                tsp_pct = 0
-            
-            game_count = total_stats['GP'] # Get Game Count
-
-            # Calculate Averages
-            avg_cols = [
-                'MIN', 'FGM', 'FGA', 'FG3M', 'FG3A', 'FTM', 
-                'FTA', 'OREB', 'DREB', 'REB', 'AST', 'STL', 
-                'BLK', 'TOV', 'PF', 'PTS'
-            ]
-            avg_stats = {}
-            for col in avg_cols:
-                # Ensure data is numeric before dividing
-                total = pd.to_numeric(total_stats[col])
-                if game_count == 0:
-                    avg = 0
-                else:
-                    avg = total / game_count
-                avg_stats[col] = round(avg, 1)
-
-            # Return the data
-            return {
-                "game_count": int(game_count),
-                "team_id": int(total_stats['TEAM_ID']),
-                "team_abbreviation": total_stats['TEAM_ABBREVIATION'],
-                "avg_stats": avg_stats,
-                "advanced_stats": {
-                    "efg_pct": round(efg_pct, 3),
-                    "tsp_pct": round(tsp_pct, 3),
-                },
-                "total_stats": total_stats.to_dict()
-            }
+            return self.summarize_season_stats(total_stats)
 
         except Exception as e:
             print(f"Error in get_season_stats for {player_id}: {e}")
             # This could be a 'resultSet' error
             return {"game_count": 0, "error": str(e)}
         
-    def get_player_gamelog(self, player_id, season):
-        # Fetches full gamelog for a player in a given season
-        print(f"Fetching GameLog for {player_id} in {season}...")
-        time.sleep(1.1)
-        
-        try:
-            gamelog_endpoint = playergamelog.PlayerGameLog(
-                player_id=player_id,
-                season=season,
-                season_type_all_star="Regular Season"
-            )
-            
-            return gamelog_endpoint.get_data_frames()[0]
-        except Exception as e:
-            print(f"Error fetching gamelog for {player_id}: {e}")
-            return pd.DataFrame()
-        
-    def compute_h2h_stats(self, gamelog_a, gamelog_b):
-        # Calculates H2H Stats by finding common games within 2 provided gamelogs
-        
-        empty_stats = {"game_count": 0, "error": "No H2H Games Found."}
-        
-        if gamelog_a.empty or gamelog_b.empty:
-            return {"player:a": empty_stats, "player_b": empty_stats}
-        
-        # Find Common Game_ID's
-        common_game_ids = pd.merge(gamelog_a, gamelog_b, on='Game_ID', suffixes=('_a', '_b'))['Game_ID']
-        
-        if common_game_ids.empty:
-            return {"player_a": empty_stats, "player_b": empty_stats}
-        
-        # Filter Gamelogs for just the H2H Games
-        h2h_games_a = gamelog_a[gamelog_a['Game_ID'].isin(common_game_ids)]
-        h2h_games_b = gamelog_b[gamelog_b['Game_ID'].isin(common_game_ids)]
-        
-        # Aggregate stats for each player
-        stats_a = self.aggregate_stats_from_df(h2h_games_a)
-        stats_b = self.aggregate_stats_from_df(h2h_games_b)
-        
-        return {"player_a": stats_a, "player_b": stats_b}
-    
-    def aggregate_stats_from_df(self, stats_df):
-        
-        if stats_df.empty:
-            return {"game_count": 0, "error": "No games to aggregate."}
-        
-        game_count = len(stats_df)
-        total_stats = stats_df.sum(numeric_only=True)
+    def summarize_season_stats(self, total_stats):
+        # Builds the season stats block from one season's totals row
         
         # Calculate Advanced Stats
         try:
@@ -270,7 +556,9 @@ class ComparePlayersView(APIView):
             tsp_pct = total_stats['PTS'] / (2 * (total_stats['FGA'] + 0.44 * total_stats['FTA']))
         except ZeroDivisionError:
             tsp_pct = 0
-            
+        
+        game_count = total_stats['GP'] # Get Game Count
+
         # Calculate Averages
         avg_cols = [
             'MIN', 'FGM', 'FGA', 'FG3M', 'FG3A', 'FTM', 
@@ -279,19 +567,209 @@ class ComparePlayersView(APIView):
         ]
         avg_stats = {}
         for col in avg_cols:
+            # Ensure data is numeric before dividing
             total = pd.to_numeric(total_stats[col])
             if game_count == 0:
                 avg = 0
             else:
                 avg = total / game_count
             avg_stats[col] = round(avg, 1)
-            
+
+        # Return the data
         return {
             "game_count": int(game_count),
+            "team_id": int(total_stats['TEAM_ID']),
+            "team_abbreviation": total_stats['TEAM_ABBREVIATION'],
             "avg_stats": avg_stats,
             "advanced_stats": {
                 "efg_pct": round(efg_pct, 3),
                 "tsp_pct": round(tsp_pct, 3),
             },
             "total_stats": total_stats.to_dict()
-        }
\ No newline at end of file
+        }
+        
+    def get_player_gamelog(self, player_id, season, on_stale=None):
+        # Gamelogs go through the tiered cache, failed (empty) fetches are never cached
+        with span("gamelog"):
+            return upstream_cache.get_or_set(
+                upstream_cache.make_key("gamelog", player_id, season),
+                lambda: self.fetch_player_gamelog(player_id, season),
+                timeout=season_timeout(season),
+                cache_if=lambda gamelog: not gamelog.empty,
+                on_stale=on_stale or self.mark_stale,
+            )
+    
+    def fetch_player_gamelog(self, player_id, season):
+        # Fetches full gamelog for a player in a given season
+        
+        # Cheapest first: the memory-mapped column files, then the GameLog table
+        gamelog = read_gamelog(player_id, season, H2H_COLUMNS)
+        if gamelog is not None:
+            return gamelog
+        
+        gamelog = load_gamelog(player_id, season)
+        if gamelog is not None:
+            print(f"Using stored GameLog for {player_id} in {season}")
+            self.write_columnar(player_id, season, gamelog)
+            return gamelog
+        
+        print(f"Fetching GameLog for {player_id} in {season}...")
+        
+        try:
+            gamelog = fetch_gamelog(player_id, season)
+        except Exception as e:
+            print(f"Error fetching gamelog for {player_id}: {e}")
+            return pd.DataFrame() # Bare, see gamelog_failed
+        
+        # Keep it so the next compare doesn't go upstream
+        try:
+            store_gamelog(player_id, season, gamelog)
+        except Exception as e:
+            print(f"Error storing gamelog for {player_id}: {e}")
+        self.write_columnar(player_id, season, gamelog)
+        
+        return gamelog
+    
+    def write_columnar(self, player_id, season, gamelog):
+        # Lets a cold worker answer from disk next time, without the DB or upstream
+        try:
+            write_gamelog(player_id, season, gamelog)
+        except Exception as e:
+            print(f"Error writing columnar gamelog for {player_id}: {e}")
+        
+    def compute_h2h_stats(self, gamelog_a, gamelog_b):
+        # Calculates H2H Stats by finding common games within 2 provided gamelogs
+        return compute_h2h(gamelog_a, gamelog_b)
+    
+    def aggregate_stats_from_df(self, stats_df):
+        return aggregate_gamelog(stats_df)
+
+class BatchCompareView(ComparePlayersView):
+    # Compares one player against many opponents (or every pair in a list) while
+    # fetching each player's season stats and gamelog exactly once
+    
+    def get(self, request, *args, **kwargs):
+        
+        serializer = BatchComparisonRequestSerializer(data=request.query_params)
+        
+        if not serializer.is_valid():
+            return Response({"error": serializer.errors}, status=400)
+        
+        validated_data = serializer.validated_data
+        player_ids = validated_data['all_ids']
+        formatted_season = format_season(validated_data['season'])
+        self.set_selection(validated_data)
+        
+        if 'opponent_ids' in validated_data:
+            anchor_id = validated_data['player_id']
+            pairs = [(anchor_id, opponent_id) for opponent_id in validated_data['opponent_ids']]
+        else:
+            pairs = list(combinations(player_ids, 2))
+        
+        print(f"Batch comparing {len(player_ids)} players ({len(pairs)} pairs) for {formatted_season}")
+        
+        if validated_data['stream']:
+            return StreamingHttpResponse(
+                self.stream_batch(player_ids, pairs, formatted_season),
+                content_type="application/x-ndjson"
+            )
+        
+        try:
+            response_data = {"season": formatted_season, "players": {}, "results": []}
+            for item in self.iter_batch(player_ids, pairs, formatted_season):
+                item = self.select(item)
+                if "player_id" in item:
+                    if "player" in item:
+                        response_data["players"][item["player_id"]] = item["player"]
+                else:
+                    response_data["results"].append(item)
+            if self.stale_keys:
+                response_data["stale"] = True
+        except Exception as e:
+            print(f"Error in batch 'get' method: {e}")
+            return Response(
+                {"error": f"An error occurred while fetching data: {str(e)}"},
+                status=500
+            )
+        
+        return Response(response_data, status=200)
+    
+    def stream_batch(self, player_ids, pairs, season):
+        # Newline-delimited JSON, errors after the headers are sent become a final line
+        try:
+            for item in self.iter_batch(player_ids, pairs, season):
+                yield dumps(self.select(item)) + b"\n"
+        except Exception as e:
+            print(f"Error in batch stream: {e}")
+            yield dumps({"error": f"An error occurred while fetching data: {str(e)}"}) + b"\n"
+    
+    def iter_batch(self, player_ids, pairs, season):
+        # Yields each player's details and season stats, then every pair's H2H
+        # stats as soon as both of its gamelogs have arrived
+        season_futures = {player_id: submit(self.get_season_stats, player_id, season) for player_id in player_ids}
+        gamelog_futures = {submit(self.get_player_gamelog, player_id, season): player_id for player_id in player_ids}
+        
+        for player_id, future in season_futures.items():
+            season_stats = future.result()
+            yield {
+                "player_id": player_id,
+                "player": {
+                    **self.get_player_details(player_id),
+                    "team_id": season_stats.get("team_id"),
+                    "team_abbreviation": season_stats.get("team_abbreviation"),
+                    "season_stats": season_stats,
+                },
+            }
+        
+        # Each gamelog is turned into arrays once and shared by all of its pairs
+        arrays = {}
+        remaining = list(pairs)
+        for future in as_completed(gamelog_futures):
+            arrays[gamelog_futures[future]] = GamelogArrays(future.result())
+            
+            ready = [pair for pair in remaining if pair[0] in arrays and pair[1] in arrays]
+            remaining = [pair for pair in remaining if pair not in ready]
+            for (player_a_id, player_b_id), h2h_stats in compute_pairs(arrays, ready).items():
+                yield {
+                    "player_a_id": player_a_id,
+                    "player_b_id": player_b_id,
+                    "h2h_stats": h2h_stats,
+                }
+
+class CompareJobView(ComparePlayersView):
+    # Polling endpoint for compares queued with mode=async
+    
+    def get(self, request, job_id, *args, **kwargs):
+        job = get_object_or_404(CompareJob, id=job_id)
+        
+        serializer = JobPollSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response({"error": serializer.errors}, status=400)
+        self.set_selection(serializer.validated_data)
+        
+        if job.status == CompareJob.DONE:
+            player_a_id, player_b_id = job.player_a_id, job.player_b_id
+            if serializer.validated_data['mirrored']:
+                player_a_id, player_b_id = player_b_id, player_a_id
+            return self.comparison_response(request, job.result, player_a_id, player_b_id, job.season)
+        
+        if job.status == CompareJob.FAILED:
+            return Response(
+                {"job_id": str(job.id), "status": job.status,
+                 "error": f"An error occurred while fetching data: {job.error}"},
+                status=500
+            )
+        
+        return Response(
+            {"job_id": str(job.id), "status": job.status},
+            status=202,
+            headers={"Retry-After": "1"},
+        )
+
+class MetricsView(APIView):
+    # Prometheus scrape target: stage and upstream histograms, cache and rate limiter totals
+    
+    permission_classes = [AllowAny]
+    
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")